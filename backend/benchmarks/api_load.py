@@ -0,0 +1,171 @@
+"""
+API load benchmark - concurrent requests against /status, /history and /download
+
+Seeds completed records into the configured database and measures
+requests/sec and latency percentiles against a running API server:
+
+    uvicorn main:app --workers 1 &
+    python -m benchmarks.api_load --url http://localhost:8000 --concurrency 64 --seed 200
+
+The script only measures whatever server it points at. To get the sync
+database baseline, check out the commit before the async session layer
+("Serve /status, /history and /download from an async session") in a
+separate worktree and start that server on another port:
+
+    git worktree add ../baseline <async-session-commit>^
+    (cd ../baseline/backend && uvicorn main:app --workers 1 --port 8001 &)
+    DATABASE_URL=sqlite:///../baseline/backend/transcriptions.db \\
+        python -m benchmarks.api_load --url http://localhost:8001 --concurrency 64 --seed 200
+
+The baseline's models.py ignores DATABASE_URL and always opens
+./transcriptions.db, so seed that file as above. Run this script from the
+current tree for both servers with the same flags, on a database of the
+same size. Both servers need Redis reachable for /status.
+"""
+import argparse
+import asyncio
+import json
+import statistics
+import time
+import uuid
+from datetime import datetime
+from typing import Dict, List, Tuple
+
+import httpx
+
+from models import init_db, get_session, TranscriptionRecord, TaskStatus
+
+
+def seed_records(count: int, text_size: int) -> List[Tuple[int, str]]:
+    """
+    Insert completed records for the benchmark
+
+    Args:
+        count: Number of records
+        text_size: Characters of transcription text per record
+
+    Returns:
+        (id, task_id) pairs of the seeded records
+    """
+    init_db()
+    session = get_session()
+    try:
+        records = [
+            TranscriptionRecord(
+                filename=f"bench_{i}.wav",
+                original_filename=f"bench_{i}.wav",
+                transcription_text="あ" * text_size,
+                task_id=str(uuid.uuid4()),
+                status=TaskStatus.COMPLETED,
+                completed_at=datetime.now(),
+                file_size=1024,
+                duration=60.0
+            )
+            for i in range(count)
+        ]
+        session.add_all(records)
+        session.commit()
+        return [(record.id, record.task_id) for record in records]
+    finally:
+        session.close()
+
+
+async def worker(
+    client: httpx.AsyncClient,
+    paths: List[str],
+    deadline: float,
+    latencies: Dict[str, List[float]],
+    errors: Dict[str, int],
+    offset: int
+) -> None:
+    """Issue requests round-robin until the deadline"""
+    i = offset
+    while time.perf_counter() < deadline:
+        path = paths[i % len(paths)]
+        endpoint = path.split("/")[1]
+        started = time.perf_counter()
+        try:
+            response = await client.get(path)
+            if response.status_code >= 400:
+                errors[endpoint] = errors.get(endpoint, 0) + 1
+        except httpx.HTTPError:
+            errors[endpoint] = errors.get(endpoint, 0) + 1
+        latencies.setdefault(endpoint, []).append(time.perf_counter() - started)
+        i += 1
+
+
+def percentile(values: List[float], pct: float) -> float:
+    """Percentile of a list of latencies"""
+    if not values:
+        return 0.0
+    ordered = sorted(values)
+    index = min(len(ordered) - 1, int(round(pct / 100 * (len(ordered) - 1))))
+    return ordered[index]
+
+
+async def run(url: str, concurrency: int, duration: float, paths: List[str]) -> dict:
+    """Run the load test and summarize the results"""
+    latencies: Dict[str, List[float]] = {}
+    errors: Dict[str, int] = {}
+    limits = httpx.Limits(max_connections=concurrency, max_keepalive_connections=concurrency)
+
+    async with httpx.AsyncClient(base_url=url, limits=limits, timeout=60) as client:
+        deadline = time.perf_counter() + duration
+        await asyncio.gather(*[
+            worker(client, paths, deadline, latencies, errors, offset)
+            for offset in range(concurrency)
+        ])
+
+    total = sum(len(values) for values in latencies.values())
+    return {
+        "concurrency": concurrency,
+        "duration": duration,
+        "requests": total,
+        "requests_per_second": total / duration,
+        "endpoints": {
+            endpoint: {
+                "requests": len(values),
+                "errors": errors.get(endpoint, 0),
+                "mean_ms": statistics.mean(values) * 1000,
+                "p50_ms": percentile(values, 50) * 1000,
+                "p95_ms": percentile(values, 95) * 1000,
+                "p99_ms": percentile(values, 99) * 1000,
+            }
+            for endpoint, values in sorted(latencies.items())
+        },
+    }
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--url", default="http://localhost:8000")
+    parser.add_argument("--concurrency", type=int, default=32)
+    parser.add_argument("--duration", type=float, default=20.0)
+    parser.add_argument("--seed", type=int, default=100, help="records to insert first")
+    parser.add_argument("--text-size", type=int, default=20000)
+    parser.add_argument("--json", action="store_true", help="print raw JSON")
+    args = parser.parse_args()
+
+    records = seed_records(args.seed, args.text_size)
+    paths = ["/history?limit=20&preview_chars=100"]
+    for record_id, task_id in records:
+        paths.append(f"/status/{task_id}")
+        paths.append(f"/download/{record_id}")
+
+    result = asyncio.run(run(args.url, args.concurrency, args.duration, paths))
+
+    if args.json:
+        print(json.dumps(result, indent=2))
+        return
+
+    print(f"{result['requests']} requests in {result['duration']:.0f}s "
+          f"at concurrency {result['concurrency']}: "
+          f"{result['requests_per_second']:.1f} req/s")
+    for endpoint, stats in result["endpoints"].items():
+        print(f"  /{endpoint:<10} n={stats['requests']:<6} err={stats['errors']:<4} "
+              f"p50={stats['p50_ms']:.1f}ms p95={stats['p95_ms']:.1f}ms "
+              f"p99={stats['p99_ms']:.1f}ms")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,458 @@
+"""
+Pipeline benchmark - /upload through transcription to the DB with a fake transcription API
+
+Generates synthetic audio/video fixtures with ffmpeg's lavfi sources, starts
+an in-process HTTP server that mimics the OpenAI transcription endpoint, and
+runs each fixture through /upload with Celery in eager mode, so the whole job
+(probe, FFmpeg, API calls, finalize, DB writes) runs inside this process.
+Reports per-stage wall time, peak RSS, peak temp-disk bytes and jobs/minute
+for each worker concurrency, and optionally compares against a saved baseline:
+
+    python -m benchmarks.pipeline --durations 30,300 --formats wav,mp3,mp4 \
+        --concurrency 1,4 --save-baseline bench_baseline.json
+    python -m benchmarks.pipeline --durations 30,300 --formats wav,mp3,mp4 \
+        --concurrency 1,4 --baseline bench_baseline.json
+"""
+import argparse
+import functools
+import json
+import os
+import resource
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Callable, Dict, List, Optional, Tuple
+
+# Isolate the run from the real database, upload directory and API before the
+# application modules read their settings
+WORK_ROOT = tempfile.mkdtemp(prefix="transcribe_bench_")
+os.environ.setdefault("DATABASE_URL", f"sqlite:///{os.path.join(WORK_ROOT, 'bench.db')}")
+os.environ.setdefault("OPENAI_API_KEY", "bench")
+os.environ["UPLOAD_DIR"] = os.path.join(WORK_ROOT, "uploads")
+os.environ["CHECKPOINT_DIR"] = os.path.join(WORK_ROOT, "jobs")
+
+# ffmpeg encoder arguments for each fixture format
+FIXTURE_FORMATS = {
+    "wav": (".wav", ["-c:a", "pcm_s16le"]),
+    "mp3": (".mp3", ["-c:a", "libmp3lame", "-b:a", "128k"]),
+    "m4a": (".m4a", ["-c:a", "aac", "-b:a", "128k"]),
+    "mp4": (".mp4", ["-c:v", "mpeg4", "-q:v", "10", "-c:a", "aac", "-b:a", "128k"]),
+    "mkv": (".mkv", ["-c:v", "mpeg4", "-q:v", "10", "-c:a", "libopus", "-b:a", "64k"]),
+}
+VIDEO_FORMATS = {"mp4", "mkv"}
+
+# Tone bursts with a 1-second pause every 5 seconds so silence detection has work to do
+AUDIO_SOURCE = "aevalsrc='0.3*sin(2*PI*(220+20*mod(floor(t),7))*t)*gte(mod(t,5),1)':s=44100:d={duration}"
+VIDEO_SOURCE = "testsrc=size=320x240:rate=15:d={duration}"
+
+FAKE_TEXT_PER_SECOND = "テスト"
+
+
+def generate_fixture(directory: str, fmt: str, duration: int) -> str:
+    """Create (or reuse) a synthetic fixture of the given format and length"""
+    extension, codec_args = FIXTURE_FORMATS[fmt]
+    path = os.path.join(directory, f"fixture_{duration}s_{fmt}{extension}")
+    if os.path.exists(path):
+        return path
+
+    command = ["ffmpeg", "-y", "-loglevel", "error",
+               "-f", "lavfi", "-i", AUDIO_SOURCE.format(duration=duration)]
+    if fmt in VIDEO_FORMATS:
+        command += ["-f", "lavfi", "-i", VIDEO_SOURCE.format(duration=duration),
+                    "-map", "1:v", "-map", "0:a"]
+    command += codec_args + ["-t", str(duration), path]
+    subprocess.run(command, check=True)
+    return path
+
+
+class FakeTranscriptionServer:
+    """
+    In-process stand-in for POST /v1/audio/transcriptions
+
+    Latency is base_latency plus real_time_factor seconds per second of audio;
+    the audio length is estimated from the request size and the segment codec.
+    """
+
+    def __init__(self, base_latency: float, real_time_factor: float, bytes_per_second: float):
+        self.base_latency = base_latency
+        self.real_time_factor = real_time_factor
+        self.bytes_per_second = bytes_per_second
+        self.requests = 0
+        self._lock = threading.Lock()
+        self._server = ThreadingHTTPServer(("127.0.0.1", 0), self._handler())
+        self._thread = threading.Thread(target=self._server.serve_forever, daemon=True)
+
+    @property
+    def base_url(self) -> str:
+        return f"http://127.0.0.1:{self._server.server_address[1]}/v1"
+
+    def _handler(self):
+        server = self
+
+        class Handler(BaseHTTPRequestHandler):
+            protocol_version = "HTTP/1.1"
+
+            def do_POST(self):
+                body = self.rfile.read(int(self.headers.get("Content-Length", 0)))
+                duration = max(1.0, len(body) / server.bytes_per_second)
+                with server._lock:
+                    server.requests += 1
+                time.sleep(server.base_latency + duration * server.real_time_factor)
+
+                segments = [
+                    {
+                        "id": i, "seek": 0, "start": float(start),
+                        "end": float(min(start + 5, duration)),
+                        "text": FAKE_TEXT_PER_SECOND * 5, "tokens": [], "temperature": 0.0,
+                        "avg_logprob": -0.1, "compression_ratio": 1.0, "no_speech_prob": 0.0,
+                    }
+                    for i, start in enumerate(range(0, int(duration), 5))
+                ]
+                payload = json.dumps({
+                    "task": "transcribe",
+                    "language": "japanese",
+                    "duration": duration,
+                    "text": "".join(segment["text"] for segment in segments),
+                    "segments": segments,
+                }).encode("utf-8")
+                self.send_response(200)
+                self.send_header("Content-Type", "application/json")
+                self.send_header("Content-Length", str(len(payload)))
+                self.end_headers()
+                self.wfile.write(payload)
+
+            def log_message(self, *args):
+                pass
+
+        return Handler
+
+    def start(self) -> None:
+        self._thread.start()
+
+    def stop(self) -> None:
+        self._server.shutdown()
+
+
+class StageTimer:
+    """Thread-safe wall-time totals for named pipeline stages"""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.samples: Dict[str, List[float]] = {}
+
+    def record(self, stage: str, elapsed: float) -> None:
+        with self._lock:
+            self.samples.setdefault(stage, []).append(elapsed)
+
+    def reset(self) -> None:
+        with self._lock:
+            self.samples = {}
+
+    def wrap(self, stage: str, func: Callable) -> Callable:
+        if getattr(func, "_bench_stage", None):
+            return func
+
+        @functools.wraps(func)
+        def timed(*args, **kwargs):
+            started = time.perf_counter()
+            try:
+                return func(*args, **kwargs)
+            finally:
+                self.record(stage, time.perf_counter() - started)
+
+        timed._bench_stage = stage
+        return timed
+
+    def wrap_async(self, stage: str, func: Callable) -> Callable:
+        @functools.wraps(func)
+        async def timed(*args, **kwargs):
+            started = time.perf_counter()
+            try:
+                return await func(*args, **kwargs)
+            finally:
+                self.record(stage, time.perf_counter() - started)
+
+        return timed
+
+    def summary(self, jobs: int) -> Dict[str, dict]:
+        with self._lock:
+            return {
+                stage: {
+                    "calls": len(values),
+                    "total_s": sum(values),
+                    "per_job_s": sum(values) / jobs if jobs else 0.0,
+                    "max_s": max(values),
+                }
+                for stage, values in sorted(self.samples.items())
+            }
+
+
+class DiskSampler:
+    """Polls the size of a directory tree and keeps the peak"""
+
+    def __init__(self, path: str, interval: float = 0.05):
+        self.path = path
+        self.interval = interval
+        self.peak = 0
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._run, daemon=True)
+
+    def _size(self) -> int:
+        total = 0
+        for root, _, files in os.walk(self.path):
+            for name in files:
+                try:
+                    total += os.path.getsize(os.path.join(root, name))
+                except OSError:
+                    pass
+        return total
+
+    def _run(self) -> None:
+        while not self._stop.is_set():
+            self.peak = max(self.peak, self._size())
+            self._stop.wait(self.interval)
+
+    def __enter__(self) -> "DiskSampler":
+        self._thread.start()
+        return self
+
+    def __exit__(self, *exc) -> None:
+        self._stop.set()
+        self._thread.join()
+
+
+def instrument(timer: StageTimer) -> None:
+    """Wrap the pipeline's stage functions with wall-time recording"""
+    import main
+    import tasks
+    from services.audio import AudioProcessor
+    from services.transcription import BACKENDS
+
+    main.receive_multipart_upload = timer.wrap_async("upload", main.receive_multipart_upload)
+    main.estimate_duration = timer.wrap("probe", main.estimate_duration)
+    for method, stage in (
+        ("load_or_process", "audio_total"),
+        ("detect_silences", "audio_silencedetect"),
+        ("encode_segments", "audio_encode"),
+        ("convert_and_split", "audio_convert_split"),
+        ("convert_to_wav", "audio_convert"),
+        ("split_audio", "audio_split"),
+        ("stream_audio_file", "audio_stream"),
+        ("copy_and_split", "audio_copy_split"),
+    ):
+        setattr(AudioProcessor, method, timer.wrap(stage, getattr(AudioProcessor, method)))
+    for backend_class in BACKENDS.values():
+        backend_class.transcribe = timer.wrap("transcribe_segment", backend_class.transcribe)
+    tasks.finalize_transcription = timer.wrap("finalize_db", tasks.finalize_transcription)
+
+
+def configure_pipeline(fake_server: FakeTranscriptionServer, use_cache: bool) -> None:
+    """Run Celery eagerly in-process and point the OpenAI client at the fake server"""
+    os.environ["OPENAI_BASE_URL"] = fake_server.base_url
+
+    from config import settings
+    from services.cache import transcription_cache
+    from services.rate_limit import transcription_rate_limiter
+    from tasks import celery_app
+
+    os.makedirs(settings.upload_dir, exist_ok=True)
+    transcription_cache.enabled = use_cache
+    # The fake server has no limits and Redis may not be running
+    transcription_rate_limiter.requests_per_minute = None
+    transcription_rate_limiter.audio_seconds_per_minute = None
+    celery_app.conf.update(
+        task_always_eager=True,
+        result_backend="cache+memory://",
+    )
+
+
+def run_job(client, fixture: str) -> Tuple[float, Optional[str]]:
+    """Upload one fixture and wait for the eager pipeline to finish"""
+    started = time.perf_counter()
+    with open(fixture, "rb") as f:
+        response = client.post("/upload", files={"file": (os.path.basename(fixture), f)})
+    elapsed = time.perf_counter() - started
+    if response.status_code != 200:
+        return elapsed, f"upload {response.status_code}: {response.text[:200]}"
+
+    status = client.get(f"/status/{response.json()['task_id']}").json()
+    if status.get("status") != "completed":
+        return elapsed, status.get("error") or status.get("status")
+    return elapsed, None
+
+
+def run_level(fixtures: List[str], concurrency: int, repeat: int, timer: StageTimer) -> dict:
+    """Run every fixture `repeat` times with `concurrency` parallel workers"""
+    from fastapi.testclient import TestClient
+    from main import app
+
+    jobs = [fixture for fixture in fixtures for _ in range(repeat)]
+    local = threading.local()
+    clients = []
+
+    def job(fixture: str):
+        # One TestClient (and event loop) per worker thread so jobs really overlap
+        if not hasattr(local, "client"):
+            local.client = TestClient(app)
+            local.client.__enter__()
+            clients.append(local.client)
+        return fixture, run_job(local.client, fixture)
+
+    timer.reset()
+    with DiskSampler(WORK_ROOT) as disk:
+        started = time.perf_counter()
+        with ThreadPoolExecutor(max_workers=concurrency) as executor:
+            results = list(executor.map(job, jobs))
+        wall = time.perf_counter() - started
+    for client in clients:
+        client.__exit__(None, None, None)
+
+    errors = [f"{os.path.basename(fixture)}: {error}" for fixture, (_, error) in results if error]
+    per_fixture: Dict[str, List[float]] = {}
+    for fixture, (elapsed, _) in results:
+        per_fixture.setdefault(os.path.basename(fixture), []).append(elapsed)
+
+    return {
+        "concurrency": concurrency,
+        "jobs": len(jobs),
+        "errors": errors,
+        "wall_s": wall,
+        "jobs_per_minute": len(jobs) / wall * 60 if wall else 0.0,
+        "peak_temp_bytes": disk.peak,
+        "stages": timer.summary(len(jobs)),
+        "end_to_end_s": {
+            name: sum(values) / len(values) for name, values in sorted(per_fixture.items())
+        },
+    }
+
+
+def peak_rss() -> dict:
+    """Peak resident set size of this process and of its FFmpeg children (bytes)"""
+    scale = 1 if sys.platform == "darwin" else 1024
+    return {
+        "self": resource.getrusage(resource.RUSAGE_SELF).ru_maxrss * scale,
+        "children": resource.getrusage(resource.RUSAGE_CHILDREN).ru_maxrss * scale,
+    }
+
+
+def compare(result: dict, baseline: dict, tolerance: float) -> List[str]:
+    """List regressions beyond the tolerance (a fraction) against a baseline result"""
+    regressions = []
+    baseline_levels = {level["concurrency"]: level for level in baseline["levels"]}
+    for level in result["levels"]:
+        base = baseline_levels.get(level["concurrency"])
+        if not base:
+            continue
+        if level["jobs_per_minute"] < base["jobs_per_minute"] * (1 - tolerance):
+            regressions.append(
+                f"c={level['concurrency']} jobs/min {base['jobs_per_minute']:.1f} -> "
+                f"{level['jobs_per_minute']:.1f}"
+            )
+        for stage, stats in level["stages"].items():
+            base_stats = base["stages"].get(stage)
+            if base_stats and stats["per_job_s"] > base_stats["per_job_s"] * (1 + tolerance):
+                regressions.append(
+                    f"c={level['concurrency']} {stage} {base_stats['per_job_s']:.3f}s -> "
+                    f"{stats['per_job_s']:.3f}s per job"
+                )
+        if level["peak_temp_bytes"] > base["peak_temp_bytes"] * (1 + tolerance):
+            regressions.append(
+                f"c={level['concurrency']} peak temp disk {base['peak_temp_bytes']} -> "
+                f"{level['peak_temp_bytes']} bytes"
+            )
+    return regressions
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--durations", default="30,300", help="fixture lengths in seconds")
+    parser.add_argument("--formats", default="wav,mp3,mp4", help=",".join(FIXTURE_FORMATS))
+    parser.add_argument("--concurrency", default="1,4", help="worker concurrencies to run")
+    parser.add_argument("--repeat", type=int, default=1, help="jobs per fixture per level")
+    parser.add_argument("--fixtures-dir", default=os.path.join(tempfile.gettempdir(), "transcribe_fixtures"))
+    parser.add_argument("--api-latency", type=float, default=0.2, help="fake API seconds per request")
+    parser.add_argument("--api-rtf", type=float, default=0.01, help="fake API seconds per audio second")
+    parser.add_argument("--cache", action="store_true", help="keep the transcription cache enabled")
+    parser.add_argument("--baseline", help="baseline JSON to compare against")
+    parser.add_argument("--save-baseline", help="write this run's JSON here")
+    parser.add_argument("--tolerance", type=float, default=0.10, help="allowed regression (fraction)")
+    parser.add_argument("--json", action="store_true", help="print raw JSON")
+    args = parser.parse_args()
+
+    from config import settings
+    from services.audio import segment_byte_rate
+
+    os.makedirs(args.fixtures_dir, exist_ok=True)
+    fixtures = [
+        generate_fixture(args.fixtures_dir, fmt, int(duration))
+        for duration in args.durations.split(",")
+        for fmt in args.formats.split(",")
+    ]
+
+    fake_server = FakeTranscriptionServer(
+        args.api_latency,
+        args.api_rtf,
+        segment_byte_rate(settings.segment_codec, settings.segment_bitrate)
+    )
+    fake_server.start()
+    try:
+        configure_pipeline(fake_server, args.cache)
+        timer = StageTimer()
+        instrument(timer)
+        levels = [
+            run_level(fixtures, int(concurrency), args.repeat, timer)
+            for concurrency in args.concurrency.split(",")
+        ]
+    finally:
+        fake_server.stop()
+
+    result = {
+        "fixtures": [os.path.basename(fixture) for fixture in fixtures],
+        "segment_codec": settings.segment_codec,
+        "api_requests": fake_server.requests,
+        "peak_rss_bytes": peak_rss(),
+        "levels": levels,
+    }
+
+    if args.save_baseline:
+        with open(args.save_baseline, "w") as f:
+            json.dump(result, f, indent=2)
+
+    regressions = []
+    if args.baseline:
+        with open(args.baseline) as f:
+            regressions = compare(result, json.load(f), args.tolerance)
+        result["regressions"] = regressions
+
+    if args.json:
+        print(json.dumps(result, indent=2))
+    else:
+        rss = result["peak_rss_bytes"]
+        print(f"{len(fixtures)} fixtures, {fake_server.requests} API requests, "
+              f"peak RSS {rss['self'] / 2**20:.0f}MB (ffmpeg {rss['children'] / 2**20:.0f}MB)")
+        for level in levels:
+            print(f"\nconcurrency {level['concurrency']}: {level['jobs']} jobs in "
+                  f"{level['wall_s']:.1f}s = {level['jobs_per_minute']:.1f} jobs/min, "
+                  f"peak temp disk {level['peak_temp_bytes'] / 2**20:.1f}MB")
+            for stage, stats in level["stages"].items():
+                print(f"  {stage:<20} calls={stats['calls']:<5} per_job={stats['per_job_s']:.3f}s "
+                      f"max={stats['max_s']:.3f}s")
+            for name, elapsed in level["end_to_end_s"].items():
+                print(f"  {name:<28} end_to_end={elapsed:.2f}s")
+            for error in level["errors"]:
+                print(f"  ERROR {error}")
+        if args.baseline:
+            print("\nregressions:" if regressions else "\nno regressions against baseline")
+            for regression in regressions:
+                print(f"  {regression}")
+
+    if regressions:
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -23,21 +23,89 @@ class Settings(BaseSettings):
     # Database settings
     database_url: str = "sqlite:///./transcriptions.db"
     database_echo: bool = False
+    process_type: str = "api"  # api (uvicorn) or worker (Celery)
+    api_db_pool_size: int = 10
+    api_db_max_overflow: int = 20
+    worker_db_pool_size: int = 2
+    worker_db_max_overflow: int = 2
+    db_pool_timeout: float = 30.0  # seconds to wait for a pooled connection
+    db_pool_recycle: int = 300  # seconds
     
     # Redis settings
     redis_url: str = "redis://redis:6379/0"
+    sse_keepalive_seconds: float = 15.0
     
     # OpenAI settings
     openai_api_key: str
     openai_model: str = "whisper-1"
+    transcription_concurrency: int = 4  # parallel segment requests per task
+    rate_limit_requests_per_minute: Optional[int] = 50  # shared by all workers; None disables
+    rate_limit_audio_seconds_per_minute: Optional[float] = None  # audio sent per minute; None disables
+    api_max_retries: int = 5  # retries for rate limits, timeouts and 5xx responses
+    api_backoff_base: float = 1.0  # seconds; doubled on each retry
+    api_backoff_max: float = 60.0  # seconds
+    openai_timeout: float = 600.0  # seconds per request
+    openai_max_connections: int = 20  # pooled connections per worker process
+    openai_keepalive_expiry: float = 60.0  # seconds an idle connection is kept
+    openai_http2: bool = True  # used when the h2 package is installed
+    
+    # Transcription backend settings
+    transcription_backend: str = "openai"  # openai or faster-whisper; can be chosen per job
+    local_whisper_model: str = "small"  # faster-whisper model name or path
+    local_whisper_device: str = "cpu"
+    local_whisper_compute_type: str = "int8"
+    local_whisper_cpu_threads: int = 0  # 0 lets CTranslate2 decide
+    local_whisper_workers: int = 1  # concurrent segments per worker process
+    local_whisper_language: Optional[str] = None  # None detects the language
+    local_whisper_beam_size: int = 5
     
     # File upload settings
     max_file_size: int = 400 * 1024 * 1024  # 400MB
     allowed_extensions: set = {".mp3", ".wav", ".m4a", ".mp4", ".avi", ".mov", ".mkv"}
     upload_dir: str = "/tmp"
+    upload_chunk_size: int = 1024 * 1024  # 1MB
+    download_chunk_chars: int = 64 * 1024  # characters encoded and compressed per response chunk
+    download_compression: bool = True  # gzip, or br when brotli is installed
+    
+    # Object storage settings (direct uploads to an S3-compatible store)
+    object_storage_enabled: bool = False  # enables /uploads/presign and /uploads/complete
+    s3_endpoint_url: Optional[str] = None  # e.g. http://minio:9000; None uses AWS
+    s3_public_endpoint_url: Optional[str] = None  # endpoint clients reach; defaults to s3_endpoint_url
+    s3_bucket: str = "transcribe-uploads"
+    s3_region: str = "us-east-1"
+    s3_access_key_id: Optional[str] = None  # None uses the default AWS credential chain
+    s3_secret_access_key: Optional[str] = None
+    s3_part_size: int = 16 * 1024 * 1024  # bytes per presigned part
+    s3_presign_expiry: int = 60 * 60  # seconds a presigned URL stays valid
     
     # Audio processing settings
-    max_audio_duration: int = 30 * 60  # 30 minutes
+    max_audio_duration: Optional[int] = None  # optional cap on segment length (seconds)
+    audio_single_pass: bool = True  # convert and split in one FFmpeg run
+    audio_streaming: bool = False  # decode through a pipe and trim/split/encode in memory
+    stream_chunk_seconds: float = 1.0  # PCM read from the decoder pipe at a time
+    stream_copy_audio: bool = True  # cut video soundtracks without re-encoding when the API accepts the codec
+    stream_copy_max_bitrate: int = 192 * 1000  # bps; higher-bitrate tracks are re-encoded
+    segment_codec: str = "opus"  # wav, flac, opus/ogg, mp3
+    segment_bitrate: str = "32k"  # used by lossy codecs
+    segment_target_bytes: int = 24 * 1024 * 1024  # stay under the 25MB API limit
+    segment_on_silence: bool = False  # move cut points into nearby silence
+    segment_overlap: float = 0.0  # seconds shared by neighbouring segments
+    silence_threshold_db: float = -35.0
+    silence_min_duration: float = 0.5  # seconds
+    silence_search_window: float = 30.0  # seconds searched before each cut point
+    trim_silence: bool = False  # drop long non-speech regions before transcription
+    trim_min_silence: float = 2.0  # seconds; shorter pauses are kept
+    trim_padding: float = 0.25  # seconds kept at each edge of a removed pause
+    
+    # Transcription cache settings
+    cache_enabled: bool = True
+    cache_max_age_days: int = 30
+    cache_max_bytes: int = 512 * 1024 * 1024  # total transcript bytes kept
+    
+    # Job checkpoint settings
+    checkpoint_dir: str = "/tmp/transcribe_jobs"  # per-task segment files kept until the job ends
+    checkpoint_max_age_hours: int = 24  # abandoned job directories are removed after this
+    task_visibility_timeout: int = 6 * 60 * 60  # seconds before an unacked job is redelivered
     
     # Security settings
     allowed_origins: list = ["http://localhost:3000", "http://frontend:3000"]
@@ -49,6 +117,13 @@ class Settings(BaseSettings):
     # Celery settings
     celery_broker_url: str = "redis://redis:6379/0"
     celery_result_backend: str = "redis://redis:6379/0"
+    queue_short: str = "transcribe_short"
+    queue_long: str = "transcribe_long"
+    queue_segments: str = "transcribe_segments"  # per-segment subtasks, consumed by every pool
+    fanout_min_segments: int = 4  # jobs with this many pending segments fan out as subtasks
+    short_job_max_seconds: float = 10 * 60  # estimated audio length routed to the short queue
+    priority_step_seconds: float = 5 * 60  # each step of audio length lowers priority by one
+    worker_metrics_port: int = 9808  # Prometheus endpoint of each worker; 0 disables
     
     class Config:
         env_file = ".env"
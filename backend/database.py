@@ -1,36 +1,215 @@
 """
 Database configuration and management
 """
+import threading
+import time
 from sqlmodel import SQLModel, create_engine, Session
-from contextlib import contextmanager
-from typing import Generator
+from sqlmodel.ext.asyncio.session import AsyncSession
+from sqlalchemy import inspect, text
+from sqlalchemy.engine import Engine
+from sqlalchemy.exc import TimeoutError as PoolTimeoutError
+from sqlalchemy.ext.asyncio import AsyncEngine, create_async_engine, async_sessionmaker
+from sqlalchemy.pool import QueuePool, AsyncAdaptedQueuePool
+from contextlib import contextmanager, asynccontextmanager
+from typing import AsyncGenerator, Generator, Optional
 
 from config import settings
 from utils.logger import db_logger
 
 
+# Sync driver scheme -> async driver scheme
+ASYNC_DRIVERS = {
+    "sqlite": "sqlite+aiosqlite",
+    "postgresql": "postgresql+asyncpg",
+    "postgresql+psycopg2": "postgresql+asyncpg",
+}
+
+# Process types with their own pool sizing
+API_PROCESS = "api"
+WORKER_PROCESS = "worker"
+
+
+def to_async_url(database_url: str) -> str:
+    """Convert a sync database URL to its async driver equivalent"""
+    scheme, separator, rest = database_url.partition("://")
+    return f"{ASYNC_DRIVERS.get(scheme, scheme)}{separator}{rest}"
+
+
+class PoolMetrics:
+    """Connection pool wait-time counters"""
+    
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.checkouts = 0
+        self.timeouts = 0
+        self.wait_seconds = 0.0
+        self.max_wait_seconds = 0.0
+    
+    def record(self, seconds: float, timed_out: bool = False) -> None:
+        """Record one connection checkout"""
+        with self._lock:
+            self.checkouts += 1
+            self.timeouts += int(timed_out)
+            self.wait_seconds += seconds
+            self.max_wait_seconds = max(self.max_wait_seconds, seconds)
+    
+    def snapshot(self) -> dict:
+        """Current counter values"""
+        with self._lock:
+            return {
+                "checkouts": self.checkouts,
+                "timeouts": self.timeouts,
+                "wait_seconds_total": self.wait_seconds,
+                "wait_seconds_max": self.max_wait_seconds,
+                "wait_seconds_avg": self.wait_seconds / self.checkouts if self.checkouts else 0.0,
+            }
+
+
+class _TimedPoolMixin:
+    """Measure how long callers wait for a pooled connection"""
+    
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.metrics = PoolMetrics()
+    
+    def _do_get(self):
+        started = time.perf_counter()
+        try:
+            connection = super()._do_get()
+        except PoolTimeoutError:
+            self.metrics.record(time.perf_counter() - started, timed_out=True)
+            raise
+        self.metrics.record(time.perf_counter() - started)
+        return connection
+    
+    def recreate(self):
+        # Keep counters across engine.dispose()
+        pool = super().recreate()
+        pool.metrics = self.metrics
+        return pool
+
+
+class TimedQueuePool(_TimedPoolMixin, QueuePool):
+    """QueuePool with checkout wait-time metrics"""
+
+
+class TimedAsyncQueuePool(_TimedPoolMixin, AsyncAdaptedQueuePool):
+    """AsyncAdaptedQueuePool with checkout wait-time metrics"""
+
+
+def engine_options(process_type: str) -> dict:
+    """
+    Engine keyword arguments for a process type
+    
+    Args:
+        process_type: "api" (uvicorn worker) or "worker" (Celery prefork child)
+        
+    Returns:
+        Keyword arguments for create_engine / create_async_engine
+    """
+    options = {
+        "echo": settings.database_echo,
+        "pool_pre_ping": True,
+        "pool_recycle": settings.db_pool_recycle,
+    }
+    # In-memory SQLite cannot share a connection pool
+    if ":memory:" in settings.database_url:
+        return options
+    
+    if process_type == WORKER_PROCESS:
+        options["pool_size"] = settings.worker_db_pool_size
+        options["max_overflow"] = settings.worker_db_max_overflow
+    else:
+        options["pool_size"] = settings.api_db_pool_size
+        options["max_overflow"] = settings.api_db_max_overflow
+    options["pool_timeout"] = settings.db_pool_timeout
+    return options
+
+
+def create_db_engine(process_type: str = API_PROCESS) -> Engine:
+    """Create the pooled sync engine for a process type"""
+    options = engine_options(process_type)
+    if "pool_size" in options:
+        options["poolclass"] = TimedQueuePool
+    return create_engine(settings.database_url, **options)
+
+
+def create_async_db_engine(process_type: str = API_PROCESS) -> AsyncEngine:
+    """Create the pooled async engine for a process type"""
+    options = engine_options(process_type)
+    if "pool_size" in options:
+        options["poolclass"] = TimedAsyncQueuePool
+    return create_async_engine(to_async_url(settings.database_url), **options)
+
+
 class DatabaseManager:
     """Database connection manager"""
     
-    def __init__(self):
-        self.engine = create_engine(
-            settings.database_url,
-            echo=settings.database_echo,
-            # PostgreSQL specific settings
-            pool_pre_ping=True,
-            pool_recycle=300,
+    def __init__(self, process_type: str = API_PROCESS):
+        self.process_type = process_type
+        self.engine: Optional[Engine] = None
+        self.async_engine: Optional[AsyncEngine] = None
+        self.configure(process_type)
+    
+    def configure(self, process_type: str) -> None:
+        """
+        (Re)build the engines with the pool settings for a process type
+        
+        Celery prefork children call this after fork so they never reuse
+        connections inherited from the parent process.
+        """
+        if self.engine is not None:
+            self.engine.dispose(close=False)
+        if self.async_engine is not None:
+            self.async_engine.sync_engine.dispose(close=False)
+        
+        self.process_type = process_type
+        self.engine = create_db_engine(process_type)
+        self.async_engine = create_async_db_engine(process_type)
+        self.async_session_factory = async_sessionmaker(
+            self.async_engine,
+            class_=AsyncSession,
+            expire_on_commit=False,
+        )
+        db_logger.info(
+            f"Database initialized: {self.engine.url!r} (process_type={process_type})"
         )
-        db_logger.info(f"Database initialized: {settings.database_url}")
     
     def init_db(self) -> None:
         """Initialize database tables"""
         try:
             SQLModel.metadata.create_all(self.engine)
+            self._add_missing_columns()
+            # create_all skips indexes added to tables that already exist
+            for table in SQLModel.metadata.sorted_tables:
+                for index in table.indexes:
+                    index.create(self.engine, checkfirst=True)
             db_logger.info("Database tables created successfully")
         except Exception as e:
             db_logger.error(f"Failed to create database tables: {e}")
             raise
     
+    def _add_missing_columns(self) -> None:
+        """Add nullable columns that were added to tables that already exist (create_all skips them)"""
+        inspector = inspect(self.engine)
+        preparer = self.engine.dialect.identifier_preparer
+        for table in SQLModel.metadata.sorted_tables:
+            existing = {column['name'] for column in inspector.get_columns(table.name)}
+            missing = [
+                column for column in table.columns
+                if column.name not in existing and column.nullable
+            ]
+            if not missing:
+                continue
+            with self.engine.begin() as connection:
+                for column in missing:
+                    connection.execute(text(
+                        f"ALTER TABLE {preparer.format_table(table)} "
+                        f"ADD COLUMN {preparer.format_column(column)} "
+                        f"{column.type.compile(dialect=self.engine.dialect)}"
+                    ))
+                    db_logger.info(f"Column added: {table.name}.{column.name}")
+    
     @contextmanager
     def get_session(self) -> Generator[Session, None, None]:
         """Get database session with automatic cleanup"""
@@ -48,10 +227,46 @@ class DatabaseManager:
     def get_session_sync(self) -> Session:
         """Get database session (non-context manager)"""
         return Session(self.engine)
+    
+    @asynccontextmanager
+    async def get_async_session(self) -> AsyncGenerator[AsyncSession, None]:
+        """Get async database session for use on the event loop"""
+        async with self.async_session_factory() as session:
+            try:
+                yield session
+                await session.commit()
+            except Exception as e:
+                await session.rollback()
+                db_logger.error(f"Async database session error: {e}")
+                raise
+    
+    def pool_metrics(self) -> dict:
+        """Connection pool usage for the sync and async engines"""
+        return {
+            "process_type": self.process_type,
+            "sync": _pool_status(self.engine.pool),
+            "async": _pool_status(self.async_engine.sync_engine.pool),
+        }
+
+
+def _pool_status(pool) -> dict:
+    """Checked-out/idle connections and wait times of a pool"""
+    status = {"pool": type(pool).__name__}
+    if isinstance(pool, QueuePool):
+        status.update({
+            "size": pool.size(),
+            "checked_out": pool.checkedout(),
+            "checked_in": pool.checkedin(),
+            "overflow": pool.overflow(),
+        })
+    metrics = getattr(pool, "metrics", None)
+    if metrics is not None:
+        status.update(metrics.snapshot())
+    return status
 
 
 # Global database manager
-db_manager = DatabaseManager()
+db_manager = DatabaseManager(settings.process_type)
 
 # Convenience functions
 def init_db() -> None:
@@ -66,4 +281,10 @@ def get_session() -> Session:
 def get_db_session() -> Generator[Session, None, None]:
     """Get database session with context manager"""
     with db_manager.get_session() as session:
-        yield session
\ No newline at end of file
+        yield session
+
+@asynccontextmanager
+async def get_async_db_session() -> AsyncGenerator[AsyncSession, None]:
+    """Get async database session with context manager"""
+    async with db_manager.get_async_session() as session:
+        yield session
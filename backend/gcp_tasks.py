@@ -6,17 +6,19 @@ from google.cloud import tasks_v2
 from google.cloud import secretmanager
 import json
 import os
-from typing import Dict, Any
+from functools import lru_cache
+from typing import Dict, Any, Optional
 
-from openai import OpenAI
 from services.audio import AudioProcessor
+from services.transcription import OpenAIBackend, get_backend
 from database import get_db_session
 from models import TranscriptionRecord, TaskStatus
 from utils.logger import celery_logger
 
 
+@lru_cache(maxsize=None)
 def get_secret(secret_name: str) -> str:
-    """Get secret from Secret Manager"""
+    """Get secret from Secret Manager (cached for the lifetime of the instance)"""
     client = secretmanager.SecretManagerServiceClient()
     project_id = os.environ.get('GOOGLE_CLOUD_PROJECT')
     name = f"projects/{project_id}/secrets/{secret_name}/versions/latest"
@@ -36,10 +38,13 @@ def transcribe_audio_function(request):
         task_id = request_json.get('task_id')
         original_filename = request_json.get('original_filename')
         file_size = request_json.get('file_size')
+        engine = request_json.get('engine')
         
-        # Initialize OpenAI client
-        openai_api_key = get_secret('openai-api-key')
-        openai_client = OpenAI(api_key=openai_api_key)
+        # The OpenAI key comes from Secret Manager; there is no shared Redis limiter here
+        if (engine or OpenAIBackend.name) == OpenAIBackend.name:
+            backend = OpenAIBackend(api_key=get_secret('openai-api-key'), rate_limiter=None)
+        else:
+            backend = get_backend(engine)
         
         # Process audio
         audio_processor = AudioProcessor()
@@ -67,14 +72,8 @@ def transcribe_audio_function(request):
             
             # Transcribe segments
             transcriptions = []
-            for segment_path in segments:
-                with open(segment_path, 'rb') as audio_file:
-                    transcript = openai_client.audio.transcriptions.create(
-                        model="whisper-1",
-                        file=audio_file,
-                        response_format="text"
-                    )
-                    transcriptions.append(transcript)
+            for segment in segments:
+                transcriptions.append(backend.transcribe(segment.path, segment.duration).text)
             
             # Update record with results
             full_transcription = "\n".join(transcriptions)
@@ -100,7 +99,13 @@ def transcribe_audio_function(request):
         return {'error': str(e)}, 500
 
 
-def create_transcription_task(file_path: str, task_id: str, original_filename: str, file_size: int):
+def create_transcription_task(
+    file_path: str,
+    task_id: str,
+    original_filename: str,
+    file_size: int,
+    engine: Optional[str] = None
+):
     """
     Create a Cloud Task for transcription
     """
@@ -121,7 +126,8 @@ def create_transcription_task(file_path: str, task_id: str, original_filename: s
                 'file_path': file_path,
                 'task_id': task_id,
                 'original_filename': original_filename,
-                'file_size': file_size
+                'file_size': file_size,
+                'engine': engine
             }).encode()
         }
     }
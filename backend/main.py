@@ -2,17 +2,50 @@
 FastAPI メインアプリケーション
 """
 import os
+import time
 import uuid
-import tempfile
+import base64
 from typing import List, Optional
-from fastapi import FastAPI, File, UploadFile, HTTPException, BackgroundTasks
-from fastapi.responses import FileResponse, PlainTextResponse
+from fastapi import FastAPI, HTTPException, Request, Query
+from fastapi.responses import Response, JSONResponse, StreamingResponse
 from fastapi.middleware.cors import CORSMiddleware
+from fastapi.concurrency import run_in_threadpool
 from pydantic import BaseModel
+from botocore.exceptions import BotoCoreError, ClientError
 from datetime import datetime
 
+from sqlmodel import select, func, or_, and_
+from sqlalchemy import update
+
+from config import settings
+from database import db_manager, get_async_db_session
 from models import init_db, get_session, TranscriptionRecord, TaskStatus
 from tasks import transcribe_audio_task, celery_app
+from services.cache import transcription_cache
+from services.export import (
+    transcript_etag,
+    etag_matches,
+    parse_range,
+    negotiate_encoding,
+    content_disposition,
+    load_transcript_info,
+    load_transcript_range,
+    iter_transcript,
+    load_segments,
+    format_subtitles,
+    SUBTITLE_FORMATS,
+)
+from services.search import search_index
+from services.storage import (
+    object_storage, object_uri, remove_input, resolve_input, upload_key
+)
+from services.transcription import BACKENDS, get_backend, store_timeline, timeline_from_json
+from services.metrics import HTTP_REQUEST_SECONDS, render_metrics
+from services.progress import publish_progress, stream_progress
+from services.scheduling import estimate_duration, route_job
+from services.upload import UploadStats, receive_multipart_upload
+from utils.exceptions import FileProcessingError, FileSizeError, RangeNotSatisfiableError
+from utils.logger import api_logger
 
 # FastAPIアプリケーション初期化
 app = FastAPI(title="Transcribe App API", version="1.0.0")
@@ -26,10 +59,53 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
+# アップロードサイズの事前チェック
+@app.middleware("http")
+async def reject_oversized_uploads(request: Request, call_next):
+    """Content-Lengthが上限を超えるアップロードをボディ受信前に拒否"""
+    if request.method == "POST" and request.url.path == "/upload":
+        content_length = request.headers.get("content-length")
+        # multipartのヘッダー分の余裕を持たせる
+        if content_length and content_length.isdigit() \
+                and int(content_length) > settings.max_file_size + 1024 * 1024:
+            return JSONResponse(
+                status_code=413,
+                content={
+                    "detail": f"File too large. Maximum size is "
+                              f"{settings.max_file_size // (1024 * 1024)}MB"
+                }
+            )
+    return await call_next(request)
+
+# APIレイテンシの計測（外側のミドルウェアとして413の応答も含める）
+@app.middleware("http")
+async def record_request_latency(request: Request, call_next):
+    """エンドポイントごとのレスポンス開始までの時間を記録"""
+    started = time.perf_counter()
+    status = 500
+    try:
+        response = await call_next(request)
+        status = response.status_code
+        return response
+    finally:
+        # パスパラメータで系列が増えないようルートのテンプレートで集計
+        route = request.scope.get('route')
+        HTTP_REQUEST_SECONDS.labels(
+            method=request.method,
+            route=route.path if route else 'unmatched',
+            status=str(status)
+        ).observe(time.perf_counter() - started)
+
 # データベース初期化
 @app.on_event("startup")
 async def startup_event():
     init_db()
+    search_index.ensure(db_manager.engine)
+    if settings.object_storage_enabled:
+        try:
+            object_storage.ensure_bucket()
+        except (BotoCoreError, ClientError) as e:
+            api_logger.warning(f"Object storage not ready: {e}")
 
 # レスポンスモデル
 class TaskStatusResponse(BaseModel):
@@ -52,10 +128,58 @@ class HistoryResponse(BaseModel):
     duration: Optional[float]
     file_size: int
 
+class HistoryItem(BaseModel):
+    id: int
+    original_filename: str
+    created_at: datetime
+    completed_at: Optional[datetime]
+    status: str
+    duration: Optional[float]
+    file_size: int
+    preview: Optional[str] = None
+
+class HistoryPage(BaseModel):
+    items: List[HistoryItem]
+    next_cursor: Optional[str] = None
+
+class SearchResult(BaseModel):
+    id: int
+    original_filename: str
+    created_at: datetime
+    snippet: str
+    rank: float
+
 class UploadResponse(BaseModel):
     task_id: str
     message: str
 
+class PresignUploadRequest(BaseModel):
+    filename: str
+    size: int
+    content_type: Optional[str] = None
+    engine: Optional[str] = None
+
+class PresignedPart(BaseModel):
+    part_number: int
+    url: str
+
+class PresignUploadResponse(BaseModel):
+    task_id: str
+    upload_id: str
+    part_size: int
+    parts: List[PresignedPart]
+
+class CompletedPart(BaseModel):
+    part_number: int
+    etag: str
+
+class CompleteUploadRequest(BaseModel):
+    task_id: str
+    upload_id: str
+    filename: str
+    parts: List[CompletedPart]
+    engine: Optional[str] = None
+
 
 @app.get("/")
 async def root():
@@ -63,20 +187,19 @@ async def root():
     return {"message": "Transcribe App API"}
 
 
-@app.post("/upload", response_model=UploadResponse)
-async def upload_audio(file: UploadFile = File(...)):
+def validate_upload_request(filename: str, engine: Optional[str]) -> str:
     """
-    音声ファイルアップロード
+    ファイル形式とエンジン名をチェック
     
     Args:
-        file: アップロードファイル
+        filename: ファイル名
+        engine: 文字起こしエンジン名
         
     Returns:
-        UploadResponse: タスクID
+        str: 拡張子（小文字）
     """
-    # ファイル形式チェック
     allowed_extensions = {'.mp3', '.wav', '.m4a', '.mp4', '.avi', '.mov', '.mkv'}
-    file_extension = os.path.splitext(file.filename)[1].lower()
+    file_extension = os.path.splitext(filename)[1].lower()
     
     if file_extension not in allowed_extensions:
         raise HTTPException(
@@ -84,52 +207,386 @@ async def upload_audio(file: UploadFile = File(...)):
             detail="Unsupported file format. Supported formats: mp3, wav, m4a, mp4, avi, mov, mkv"
         )
     
-    # ファイルサイズチェック (400MB制限)
-    file_size = 0
-    content = await file.read()
-    file_size = len(content)
-    
-    if file_size > 400 * 1024 * 1024:  # 400MB
+    if engine and engine not in BACKENDS:
         raise HTTPException(
-            status_code=413,
-            detail="File too large. Maximum size is 400MB"
+            status_code=400,
+            detail=f"Unsupported engine. Supported engines: {', '.join(BACKENDS)}"
         )
+    return file_extension
+
+
+async def enqueue_transcription(
+    path: str,
+    task_id: str,
+    original_filename: str,
+    size: int,
+    content_hash: Optional[str],
+    engine: Optional[str]
+) -> UploadResponse:
+    """
+    推定時間で短時間/長時間キューと優先度を決めて文字起こしタスクを投入
     
-    # 一時ファイルに保存
-    task_id = str(uuid.uuid4())
-    temp_file = tempfile.NamedTemporaryFile(
-        delete=False,
-        suffix=file_extension,
-        prefix=f"upload_{task_id}_"
+    Args:
+        path: ローカルファイルパスまたは s3:// URI
+        task_id: タスクID
+        original_filename: 元のファイル名
+        size: ファイルサイズ
+        content_hash: ファイルのSHA-256（不明な場合はNone）
+        engine: 文字起こしエンジン名
+        
+    Returns:
+        UploadResponse: タスクID
+    """
+    route = route_job(await run_in_threadpool(estimate_duration, resolve_input(path), size))
+    
+    # Celeryタスクを開始（/status で進捗を引けるようCeleryのIDもtask_idに揃える）
+    transcribe_audio_task.apply_async(
+        args=(path, task_id, original_filename, size, content_hash, engine),
+        kwargs={'enqueued_at': time.time()},
+        task_id=task_id,
+        queue=route.queue,
+        priority=route.priority
+    )
+    api_logger.info(
+        f"Job queued: task_id={task_id} queue={route.queue} priority={route.priority} "
+        f"estimated_duration={route.estimated_duration}"
     )
     
-    try:
-        temp_file.write(content)
-        temp_file.flush()
+    return UploadResponse(
+        task_id=task_id,
+        message="File uploaded successfully. Processing started."
+    )
+
+
+def complete_from_cache(
+    upload: UploadStats,
+    task_id: str,
+    filename: str,
+    engine: Optional[str]
+) -> bool:
+    """
+    キャッシュに同じ内容・同じ処理条件の結果があれば完了済みのレコードを作成
+    
+    同期のDBセッションとRedisを使うため、スレッドプールで実行する。
+    
+    Args:
+        upload: 受信したファイル
+        task_id: タスクID
+        filename: 元のファイル名
+        engine: 文字起こしエンジン名
         
-        # Celeryタスクを開始
-        transcribe_audio_task.delay(
-            temp_file.name,
-            task_id,
-            file.filename,
-            file_size
+    Returns:
+        bool: キャッシュから完了した場合はTrue（一時ファイルは削除済み）
+    """
+    cache_key = transcription_cache.transcript_key(upload.sha256, get_backend(engine).model_id)
+    session = get_session()
+    try:
+        cached = transcription_cache.get(session, cache_key)
+        if not cached:
+            return False
+        record = TranscriptionRecord(
+            filename=os.path.basename(upload.path),
+            original_filename=filename,
+            transcription_text=cached.transcription_text,
+            task_id=task_id,
+            status=TaskStatus.COMPLETED,
+            completed_at=datetime.now(),
+            file_size=upload.size,
+            duration=cached.duration
         )
+        session.add(record)
+        session.flush()
+        search_index.index_record(session, record)
+        store_timeline(session, record.id, timeline_from_json(cached.segments_json))
+        session.commit()
+        os.unlink(upload.path)
+        publish_progress(task_id, {
+            'status': 'completed',
+            'message': 'Transcription completed successfully',
+            'duration': record.duration,
+            'record_id': record.id
+        })
+        api_logger.info(f"Cache hit: task_id={task_id} key={cache_key}")
+        return True
+    finally:
+        session.close()
+
+
+@app.post("/upload", response_model=UploadResponse)
+async def upload_audio(request: Request):
+    """
+    音声ファイルアップロード（multipart/form-data の file と engine）
+    
+    Args:
+        request: リクエスト（file: アップロードファイル、engine: 文字起こしエンジン
+            （openai / faster-whisper、省略時は設定の既定値））
         
+    Returns:
+        UploadResponse: タスクID
+    """
+    # 受信しながらディスクへ保存（拡張子はボディ受信前、サイズ上限は受信中にチェック）
+    task_id = str(uuid.uuid4())
+    try:
+        received = await receive_multipart_upload(
+            request,
+            file_field='file',
+            on_file=lambda filename: validate_upload_request(filename, None),
+            prefix=f"upload_{task_id}_",
+            max_size=settings.max_file_size,
+            chunk_size=settings.upload_chunk_size,
+            directory=settings.upload_dir
+        )
+    except FileSizeError as e:
+        raise HTTPException(status_code=e.status_code, detail=e.message)
+    except FileProcessingError as e:
+        raise HTTPException(status_code=400, detail=e.message)
+    
+    upload = received.file
+    filename = received.filename
+    engine = received.fields.get('engine') or None
+    try:
+        validate_upload_request(filename, engine)
+    except HTTPException:
+        await run_in_threadpool(os.unlink, upload.path)
+        raise
+    
+    api_logger.info(
+        f"Upload received: task_id={task_id} size={upload.size} "
+        f"chunks={upload.chunks} elapsed={upload.elapsed:.3f}s "
+        f"throughput={upload.throughput / (1024 * 1024):.2f}MB/s"
+    )
+    
+    # 同じ内容・同じ処理条件の結果があればキャッシュから即時完了（DB・Redis・ファイル操作はスレッドプールで）
+    if await run_in_threadpool(complete_from_cache, upload, task_id, filename, engine):
         return UploadResponse(
             task_id=task_id,
-            message="File uploaded successfully. Processing started."
+            message="File uploaded successfully. Transcription served from cache."
+        )
+    
+    try:
+        return await enqueue_transcription(
+            upload.path, task_id, filename, upload.size, upload.sha256, engine
         )
         
     except Exception as e:
         # エラー時は一時ファイルを削除
         try:
-            os.unlink(temp_file.name)
+            os.unlink(upload.path)
         except:
             pass
         raise HTTPException(status_code=500, detail=str(e))
+
+
+def require_object_storage() -> None:
+    """直接アップロードが無効な場合は404"""
+    if not settings.object_storage_enabled:
+        raise HTTPException(status_code=404, detail="Direct uploads are not enabled")
+
+
+@app.post("/uploads/presign", response_model=PresignUploadResponse)
+async def presign_upload(request: PresignUploadRequest):
+    """
+    オブジェクトストレージへの直接アップロードを開始（署名付きURLの発行）
     
-    finally:
-        temp_file.close()
+    クライアントは各パートを対応するURLへPUTし、レスポンスのETagを
+    /uploads/complete に渡す。ファイルのバイトはAPIを経由しない。
+    
+    Args:
+        request: ファイル名、サイズ、エンジン
+        
+    Returns:
+        PresignUploadResponse: タスクID、アップロードID、パートごとのURL
+    """
+    require_object_storage()
+    file_extension = validate_upload_request(request.filename, request.engine)
+    if request.size <= 0:
+        raise HTTPException(status_code=400, detail="File is empty")
+    if request.size > settings.max_file_size:
+        raise HTTPException(
+            status_code=413,
+            detail=f"File too large. Maximum size is {settings.max_file_size // (1024 * 1024)}MB"
+        )
+    
+    task_id = str(uuid.uuid4())
+    try:
+        upload = await run_in_threadpool(
+            object_storage.create_upload,
+            upload_key(task_id, file_extension),
+            request.size,
+            request.content_type
+        )
+    except (BotoCoreError, ClientError) as e:
+        api_logger.error(f"Presign failed: task_id={task_id} error={e}")
+        raise HTTPException(status_code=502, detail="Object storage unavailable")
+    
+    # 完了時に照合するアップロードIDを持った待機中のレコード
+    key = upload_key(task_id, file_extension)
+    try:
+        async with get_async_db_session() as session:
+            session.add(TranscriptionRecord(
+                filename=os.path.basename(key),
+                original_filename=request.filename,
+                transcription_text="",
+                task_id=task_id,
+                status=TaskStatus.PENDING,
+                file_size=request.size,
+                upload_id=upload['upload_id']
+            ))
+    except Exception as e:
+        await run_in_threadpool(object_storage.abort_upload, key, upload['upload_id'])
+        raise HTTPException(status_code=500, detail=str(e))
+    
+    api_logger.info(
+        f"Direct upload started: task_id={task_id} size={request.size} parts={len(upload['parts'])}"
+    )
+    return PresignUploadResponse(task_id=task_id, **upload)
+
+
+async def load_upload_record(task_id: str, upload_id: str) -> TranscriptionRecord:
+    """
+    直接アップロードのレコードを取得（アップロードIDが一致しない場合は404）
+    
+    Args:
+        task_id: タスクID
+        upload_id: アップロードID
+        
+    Returns:
+        TranscriptionRecord: レコード
+    """
+    async with get_async_db_session() as session:
+        result = await session.exec(
+            select(TranscriptionRecord).where(
+                TranscriptionRecord.task_id == task_id,
+                TranscriptionRecord.upload_id == upload_id
+            )
+        )
+        record = result.first()
+    if not record:
+        raise HTTPException(status_code=404, detail="Upload not found")
+    return record
+
+
+async def transition_upload(
+    task_id: str,
+    upload_id: str,
+    from_status: TaskStatus,
+    to_status: TaskStatus,
+    **values
+) -> bool:
+    """
+    直接アップロードのレコードの状態を条件付きで更新（同時に届いた完了リクエストのうち1件だけが成功する）
+    
+    Args:
+        task_id: タスクID
+        upload_id: アップロードID
+        from_status: 現在の状態（一致する場合のみ更新）
+        to_status: 更新後の状態
+        **values: 同時に更新する列
+        
+    Returns:
+        bool: 更新した場合はTrue
+    """
+    async with get_async_db_session() as session:
+        result = await session.execute(
+            update(TranscriptionRecord)
+            .where(
+                TranscriptionRecord.task_id == task_id,
+                TranscriptionRecord.upload_id == upload_id,
+                TranscriptionRecord.status == from_status
+            )
+            .values(status=to_status, **values)
+        )
+        return result.rowcount == 1
+
+
+def completed_upload_response(record: TranscriptionRecord) -> UploadResponse:
+    """完了済みの直接アップロードに対する再送への応答（最初の応答と同じ結果を返す）"""
+    if record.status == TaskStatus.FAILED:
+        raise HTTPException(status_code=409, detail=record.error_message or "Upload failed")
+    return UploadResponse(
+        task_id=record.task_id,
+        message="File uploaded successfully. Processing started."
+    )
+
+
+@app.post("/uploads/complete", response_model=UploadResponse)
+async def complete_upload(request: CompleteUploadRequest):
+    """
+    直接アップロードを完了して文字起こしを開始
+    
+    ワーカーはオブジェクトを署名付きURLで直接読むため、APIとワーカーで
+    ファイルシステムを共有する必要はない。
+    再送や二重送信ではタスクを再投入せず、最初のリクエストと同じ結果を返す。
+    
+    Args:
+        request: タスクID、アップロードID、パートごとのETag
+        
+    Returns:
+        UploadResponse: タスクID
+    """
+    require_object_storage()
+    validate_upload_request(request.filename, request.engine)
+    try:
+        task_id = str(uuid.UUID(request.task_id))
+    except ValueError:
+        raise HTTPException(status_code=400, detail="Invalid task_id")
+    
+    # presign で作成した待機中のレコードのみ受け付け、再送には既存の結果を返す
+    record = await load_upload_record(task_id, request.upload_id)
+    if record.status != TaskStatus.PENDING:
+        return completed_upload_response(record)
+    
+    key = upload_key(task_id, os.path.splitext(record.filename)[1])
+    try:
+        size = await run_in_threadpool(
+            object_storage.complete_upload,
+            key,
+            request.upload_id,
+            [part.model_dump() for part in request.parts]
+        )
+    except ClientError as e:
+        # 同時に届いた完了リクエストが先に完了させた場合（NoSuchUpload）
+        record = await load_upload_record(task_id, request.upload_id)
+        if record.status != TaskStatus.PENDING:
+            return completed_upload_response(record)
+        api_logger.warning(f"Upload completion failed: task_id={task_id} error={e}")
+        raise HTTPException(status_code=400, detail="Upload could not be completed")
+    except BotoCoreError as e:
+        api_logger.error(f"Upload completion failed: task_id={task_id} error={e}")
+        raise HTTPException(status_code=502, detail="Object storage unavailable")
+    
+    # 申告と異なるサイズのファイルがアップロードされた場合
+    if size > settings.max_file_size:
+        detail = f"File too large. Maximum size is {settings.max_file_size // (1024 * 1024)}MB"
+        if await transition_upload(
+            task_id, request.upload_id, TaskStatus.PENDING, TaskStatus.FAILED,
+            error_message=detail, file_size=size
+        ):
+            await run_in_threadpool(object_storage.delete, key)
+        raise HTTPException(status_code=413, detail=detail)
+    
+    # 待機中から処理中への更新に成功したリクエストだけがタスクを投入する
+    if not await transition_upload(
+        task_id, request.upload_id, TaskStatus.PENDING, TaskStatus.PROCESSING, file_size=size
+    ):
+        return completed_upload_response(await load_upload_record(task_id, request.upload_id))
+    
+    api_logger.info(f"Direct upload completed: task_id={task_id} size={size}")
+    
+    # 内容のハッシュはAPIで計算できないため、ファイル単位のキャッシュは使わない
+    # （セグメント単位のキャッシュはワーカーで有効）
+    path = object_uri(key)
+    try:
+        return await enqueue_transcription(
+            path, task_id, record.original_filename, size, None, request.engine
+        )
+    except Exception as e:
+        await transition_upload(
+            task_id, request.upload_id, TaskStatus.PROCESSING, TaskStatus.FAILED,
+            error_message=str(e)
+        )
+        await run_in_threadpool(remove_input, path)
+        raise HTTPException(status_code=500, detail=str(e))
 
 
 @app.get("/status/{task_id}", response_model=TaskStatusResponse)
@@ -143,158 +600,389 @@ async def get_task_status(task_id: str):
     Returns:
         TaskStatusResponse: タスクステータス
     """
-    # データベースからレコード取得
-    session = get_session()
-    try:
-        record = session.query(TranscriptionRecord)\
-            .filter(TranscriptionRecord.task_id == task_id)\
-            .first()
-        
-        if not record:
-            # Celeryタスクステータス取得
-            task = celery_app.AsyncResult(task_id)
-            
-            if task.state == 'PENDING':
-                return TaskStatusResponse(
-                    task_id=task_id,
-                    status='pending',
-                    message='Task is waiting to be processed'
-                )
-            else:
-                return TaskStatusResponse(
-                    task_id=task_id,
-                    status='failed',
-                    error='Task not found',
-                    message='Task not found'
-                )
+    # データベースからレコード取得（イベントループをブロックしない非同期セッション）
+    async with get_async_db_session() as session:
+        result = await session.exec(
+            select(TranscriptionRecord)
+            .where(TranscriptionRecord.task_id == task_id)
+        )
+        record = result.first()
+    
+    if not record:
+        # Celeryタスクステータス取得
+        task = celery_app.AsyncResult(task_id)
         
-        # データベースレコードのステータスを確認
-        if record.status == TaskStatus.COMPLETED:
+        if task.state == 'PENDING':
             return TaskStatusResponse(
                 task_id=task_id,
-                status='completed',
-                transcription=record.transcription_text,
-                duration=record.duration,
-                record_id=record.id,
-                message='Transcription completed successfully'
-            )
-        elif record.status == TaskStatus.FAILED:
-            return TaskStatusResponse(
-                task_id=task_id,
-                status='failed',
-                error=record.error_message,
-                message='Transcription failed'
+                status='pending',
+                message='Task is waiting to be processed'
             )
         else:
-            # 進行中の場合、Celeryタスクの進捗を取得
-            task = celery_app.AsyncResult(task_id)
-            progress = 0
-            message = 'Processing'
-            
-            if task.state == 'PROCESSING' and task.info:
-                progress = task.info.get('progress', 0)
-                message = task.info.get('status', 'Processing')
-            
             return TaskStatusResponse(
                 task_id=task_id,
-                status='processing',
-                progress=progress,
-                message=message
+                status='failed',
+                error='Task not found',
+                message='Task not found'
             )
     
-    finally:
-        session.close()
+    # データベースレコードのステータスを確認
+    if record.status == TaskStatus.COMPLETED:
+        return TaskStatusResponse(
+            task_id=task_id,
+            status='completed',
+            transcription=record.transcription_text,
+            duration=record.duration,
+            record_id=record.id,
+            message='Transcription completed successfully'
+        )
+    elif record.status == TaskStatus.FAILED:
+        return TaskStatusResponse(
+            task_id=task_id,
+            status='failed',
+            error=record.error_message,
+            message='Transcription failed'
+        )
+    elif record.status == TaskStatus.PENDING:
+        # 直接アップロードの完了待ち
+        return TaskStatusResponse(
+            task_id=task_id,
+            status='pending',
+            message='Waiting for the upload to complete'
+        )
+    else:
+        # 進行中の場合、Celeryタスクの進捗を取得
+        task = celery_app.AsyncResult(task_id)
+        progress = 0
+        message = 'Processing'
+        
+        if task.state == 'PROCESSING' and task.info:
+            progress = task.info.get('progress', 0)
+            message = task.info.get('status', 'Processing')
+        
+        return TaskStatusResponse(
+            task_id=task_id,
+            status='processing',
+            progress=progress,
+            message=message
+        )
 
 
-@app.get("/history", response_model=List[HistoryResponse])
-async def get_history(limit: int = 100):
+@app.get("/events/{task_id}")
+async def stream_task_events(task_id: str, request: Request):
     """
-    文字起こし履歴取得
+    タスク進捗のServer-Sent Events
+    
+    接続時に現在の状態を1回送信し、以降はRedis pub/subで受け取った進捗を
+    完了または失敗までプッシュする。
     
     Args:
-        limit: 取得件数制限
+        task_id: タスクID
         
     Returns:
-        List[HistoryResponse]: 履歴リスト
+        StreamingResponse: text/event-stream
     """
-    session = get_session()
+    async def snapshot() -> dict:
+        status = await get_task_status(task_id)
+        return status.dict(exclude_none=True)
+    
+    return StreamingResponse(
+        stream_progress(task_id, snapshot, request.is_disconnected),
+        media_type="text/event-stream",
+        headers={
+            "Cache-Control": "no-cache",
+            "X-Accel-Buffering": "no",
+        }
+    )
+
+
+def encode_history_cursor(created_at: datetime, record_id: int) -> str:
+    """履歴ページングのカーソル（最後の行の created_at と id）を作成"""
+    raw = f"{created_at.isoformat()}|{record_id}".encode('utf-8')
+    return base64.urlsafe_b64encode(raw).decode('ascii')
+
+
+def decode_history_cursor(cursor: str) -> tuple:
+    """履歴ページングのカーソルを (created_at, id) に戻す"""
     try:
-        records = session.query(TranscriptionRecord)\
-            .order_by(TranscriptionRecord.created_at.desc())\
-            .limit(limit)\
-            .all()
+        raw = base64.urlsafe_b64decode(cursor.encode('ascii')).decode('utf-8')
+        created_at, record_id = raw.split('|')
+        return datetime.fromisoformat(created_at), int(record_id)
+    except (ValueError, UnicodeDecodeError):
+        raise HTTPException(status_code=400, detail="Invalid cursor")
+
+
+@app.get("/history", response_model=HistoryPage)
+async def get_history(
+    limit: int = Query(50, ge=1, le=200),
+    cursor: Optional[str] = None,
+    preview_chars: int = Query(0, ge=0, le=1000)
+):
+    """
+    文字起こし履歴取得（キーセットページング）
+    
+    一覧表示に必要な列のみを取得し、全文は /history/{record_id} で取得する。
+    
+    Args:
+        limit: 取得件数制限
+        cursor: 前のページの next_cursor
+        preview_chars: 文字起こし結果の先頭を何文字含めるか（0で含めない）
         
-        return [
-            HistoryResponse(
-                id=record.id,
-                original_filename=record.original_filename,
-                transcription_text=record.transcription_text,
-                created_at=record.created_at,
-                completed_at=record.completed_at,
-                status=record.status.value,
-                duration=record.duration,
-                file_size=record.file_size
+    Returns:
+        HistoryPage: 履歴リストと次ページのカーソル
+    """
+    columns = [
+        TranscriptionRecord.id,
+        TranscriptionRecord.original_filename,
+        TranscriptionRecord.created_at,
+        TranscriptionRecord.completed_at,
+        TranscriptionRecord.status,
+        TranscriptionRecord.duration,
+        TranscriptionRecord.file_size,
+    ]
+    if preview_chars:
+        columns.append(
+            func.substr(TranscriptionRecord.transcription_text, 1, preview_chars).label('preview')
+        )
+    
+    # (created_at, id) の降順で、カーソル位置より後ろの行を取得
+    query = select(*columns).order_by(
+        TranscriptionRecord.created_at.desc(),
+        TranscriptionRecord.id.desc()
+    )
+    if cursor:
+        created_at, record_id = decode_history_cursor(cursor)
+        query = query.where(or_(
+            TranscriptionRecord.created_at < created_at,
+            and_(
+                TranscriptionRecord.created_at == created_at,
+                TranscriptionRecord.id < record_id
             )
-            for record in records
-        ]
-    finally:
-        session.close()
+        ))
+    
+    async with get_async_db_session() as session:
+        result = await session.exec(query.limit(limit + 1))
+        rows = result.all()
+    
+    items = [
+        HistoryItem(
+            id=row.id,
+            original_filename=row.original_filename,
+            created_at=row.created_at,
+            completed_at=row.completed_at,
+            status=row.status.value,
+            duration=row.duration,
+            file_size=row.file_size,
+            preview=row.preview if preview_chars else None
+        )
+        for row in rows[:limit]
+    ]
+    
+    next_cursor = None
+    if len(rows) > limit:
+        last = rows[limit - 1]
+        next_cursor = encode_history_cursor(last.created_at, last.id)
+    
+    return HistoryPage(items=items, next_cursor=next_cursor)
 
 
-@app.get("/download/{record_id}")
-async def download_transcription(record_id: int):
+@app.get("/history/{record_id}", response_model=HistoryResponse)
+async def get_history_record(record_id: int):
     """
-    文字起こし結果のテキストファイルダウンロード
+    文字起こし履歴の詳細（全文）取得
     
     Args:
         record_id: レコードID
         
     Returns:
-        FileResponse: テキストファイル
+        HistoryResponse: 文字起こし結果を含む履歴
     """
-    session = get_session()
-    try:
-        record = session.query(TranscriptionRecord)\
-            .filter(TranscriptionRecord.id == record_id)\
-            .first()
-        
-        if not record:
-            raise HTTPException(status_code=404, detail="Record not found")
-        
-        if record.status != TaskStatus.COMPLETED:
-            raise HTTPException(status_code=400, detail="Transcription not completed")
+    async with get_async_db_session() as session:
+        record = await session.get(TranscriptionRecord, record_id)
+    
+    if not record:
+        raise HTTPException(status_code=404, detail="Record not found")
+    
+    return HistoryResponse(
+        id=record.id,
+        original_filename=record.original_filename,
+        transcription_text=record.transcription_text,
+        created_at=record.created_at,
+        completed_at=record.completed_at,
+        status=record.status.value,
+        duration=record.duration,
+        file_size=record.file_size
+    )
+
+
+@app.get("/search", response_model=List[SearchResult])
+async def search_transcriptions(
+    q: str = Query(..., min_length=1, max_length=200),
+    limit: int = Query(20, ge=1, le=100)
+):
+    """
+    文字起こし結果の全文検索
+    
+    Args:
+        q: 検索語
+        limit: 取得件数制限
         
-        # 一時ファイルに書き込み
-        temp_file = tempfile.NamedTemporaryFile(
-            mode='w',
-            delete=False,
-            suffix='.txt',
-            encoding='utf-8'
-        )
+    Returns:
+        List[SearchResult]: 関連度順の検索結果（スニペット付き）
+    """
+    async with get_async_db_session() as session:
+        hits = await search_index.search(session, q, limit)
+    
+    return [SearchResult(**hit.__dict__) for hit in hits]
+
+
+@app.get("/download/{record_id}")
+async def download_transcription(record_id: int, request: Request):
+    """
+    文字起こし結果のテキストファイルダウンロード
+    
+    一時ファイルを作らずDBから直接ストリーミングする。ETag/If-None-Match、
+    単一範囲の Range リクエスト、gzip/br 圧縮に対応。
+    
+    Args:
+        record_id: レコードID
         
+    Returns:
+        Response: テキストファイル
+    """
+    # 本文は読まずにメタデータとバイト数だけ取得
+    record = await load_transcript_info(record_id)
+    
+    if not record:
+        raise HTTPException(status_code=404, detail="Record not found")
+    
+    if record.status != TaskStatus.COMPLETED:
+        raise HTTPException(status_code=400, detail="Transcription not completed")
+    
+    size = record.size or 0
+    filename = f"{os.path.splitext(record.original_filename)[0]}_transcription.txt"
+    range_header = request.headers.get('range')
+    identity_etag = transcript_etag(record_id, record.completed_at, size)
+    
+    encoding = negotiate_encoding(request.headers.get('accept-encoding'))
+    etag = transcript_etag(record_id, record.completed_at, size, encoding)
+    headers = {
+        'ETag': etag,
+        'Accept-Ranges': 'bytes',
+        'Cache-Control': 'private, no-cache',
+        'Vary': 'Accept-Encoding',
+        'Content-Disposition': content_disposition(filename),
+    }
+    
+    if etag_matches(request.headers.get('if-none-match'), etag):
+        return Response(status_code=304, headers={'ETag': etag, 'Vary': 'Accept-Encoding'})
+    
+    # Range リクエスト（If-Range が一致しない場合は全体を返す）
+    if_range = request.headers.get('if-range')
+    if range_header and (not if_range or if_range == identity_etag):
         try:
-            temp_file.write(record.transcription_text)
-            temp_file.flush()
-            
-            filename = f"{os.path.splitext(record.original_filename)[0]}_transcription.txt"
-            
-            return FileResponse(
-                temp_file.name,
+            byte_range = parse_range(range_header, size)
+        except RangeNotSatisfiableError as e:
+            return Response(
+                status_code=e.status_code,
+                headers={'Content-Range': f'bytes */{size}'}
+            )
+        if byte_range:
+            start, end = byte_range
+            return Response(
+                content=await load_transcript_range(record_id, start, end),
+                status_code=206,
                 media_type='text/plain',
-                filename=filename,
-                background=BackgroundTasks()
+                headers={
+                    'ETag': identity_etag,
+                    'Accept-Ranges': 'bytes',
+                    'Content-Range': f'bytes {start}-{end}/{size}',
+                    'Content-Disposition': content_disposition(filename),
+                }
             )
-        finally:
-            temp_file.close()
-            
-    except HTTPException:
-        raise
-    except Exception as e:
-        raise HTTPException(status_code=500, detail=str(e))
+    
+    if encoding:
+        headers['Content-Encoding'] = encoding
+    
+    return StreamingResponse(
+        iter_transcript(record_id, encoding),
+        media_type='text/plain',
+        headers=headers
+    )
+
+
+@app.get("/export/{record_id}")
+async def export_transcription(
+    record_id: int,
+    format: str = Query("srt", pattern="^(srt|vtt|json)$"),
+    start: Optional[float] = Query(None, ge=0),
+    end: Optional[float] = Query(None, gt=0)
+):
+    """
+    タイムスタンプ付きの字幕形式でエクスポート（保存済みのセグメントから生成し、再文字起こしはしない）
+    
+    Args:
+        record_id: レコードID
+        format: 出力形式（srt / vtt / json）
+        start: 出力範囲の開始（秒、元ファイル上）
+        end: 出力範囲の終了（秒、元ファイル上）
+        
+    Returns:
+        Response: 字幕ファイル
+    """
+    if start is not None and end is not None and end <= start:
+        raise HTTPException(status_code=400, detail="end must be greater than start")
+    
+    async with get_async_db_session() as session:
+        result = await session.exec(
+            select(TranscriptionRecord.original_filename, TranscriptionRecord.status)
+            .where(TranscriptionRecord.id == record_id)
+        )
+        record = result.first()
+    
+    if not record:
+        raise HTTPException(status_code=404, detail="Record not found")
+    
+    if record.status != TaskStatus.COMPLETED:
+        raise HTTPException(status_code=400, detail="Transcription not completed")
+    
+    segments = await load_segments(record_id, start, end)
+    if not segments and start is None and end is None:
+        # タイムスタンプ保存前に処理されたレコード
+        raise HTTPException(status_code=404, detail="Timestamps not available for this record")
+    
+    media_type, extension = SUBTITLE_FORMATS[format]
+    filename = f"{os.path.splitext(record.original_filename)[0]}{extension}"
+    return Response(
+        content=format_subtitles(segments, format),
+        media_type=media_type,
+        headers={'Content-Disposition': content_disposition(filename)}
+    )
+
+
+@app.get("/cache/stats")
+async def get_cache_stats():
+    """文字起こしキャッシュの統計情報"""
+    session = get_session()
+    try:
+        return transcription_cache.stats(session)
     finally:
         session.close()
 
 
+@app.get("/db/pool")
+async def get_db_pool_metrics():
+    """DBコネクションプールの使用状況（貸出中の接続数、待ち時間）"""
+    return db_manager.pool_metrics()
+
+
+@app.get("/metrics")
+async def get_metrics():
+    """Prometheus 形式のメトリクス（APIレイテンシ）"""
+    body, content_type = render_metrics()
+    return Response(content=body, media_type=content_type)
+
+
 @app.get("/health")
 async def health_check():
     """ヘルスチェック"""
@@ -3,9 +3,12 @@ SQLModel モデル定義
 """
 from typing import Optional
 from datetime import datetime
-from sqlmodel import SQLModel, Field, create_engine, Session
+from sqlalchemy import Index
+from sqlmodel import SQLModel, Field, Session
 from enum import Enum
 
+import database
+
 
 class TaskStatus(str, Enum):
     """タスクステータス"""
@@ -17,6 +20,11 @@ class TaskStatus(str, Enum):
 
 class TranscriptionRecord(SQLModel, table=True):
     """文字起こし履歴テーブル"""
+    __table_args__ = (
+        # 履歴一覧のキーセットページング用
+        Index("ix_transcriptionrecord_created_at_id", "created_at", "id"),
+    )
+    
     id: Optional[int] = Field(default=None, primary_key=True)
     filename: str = Field(index=True)
     original_filename: str
@@ -28,18 +36,52 @@ class TranscriptionRecord(SQLModel, table=True):
     error_message: Optional[str] = None
     file_size: int  # bytes
     duration: Optional[float] = None  # seconds
+    upload_id: Optional[str] = Field(default=None, index=True)  # 直接アップロードのマルチパートID
+
+
+class TranscriptionCacheEntry(SQLModel, table=True):
+    """文字起こし結果キャッシュテーブル（コンテンツハッシュ + 処理条件がキー）"""
+    key: str = Field(primary_key=True)
+    transcription_text: str
+    segments_json: Optional[str] = None  # タイムスタンプ付きセグメント
+    duration: Optional[float] = None  # seconds
+    size: int = 0  # bytes of transcription_text + segments_json
+    hit_count: int = 0
+    created_at: datetime = Field(default_factory=datetime.now, index=True)
+    last_accessed_at: datetime = Field(default_factory=datetime.now, index=True)
 
 
-# データベース設定
-DATABASE_URL = "sqlite:///./transcriptions.db"
-engine = create_engine(DATABASE_URL)
+class TranscriptSegment(SQLModel, table=True):
+    """タイムスタンプ付きセグメントテーブル（字幕出力用、時刻は元ファイル上のミリ秒）"""
+    __table_args__ = (
+        # 時間範囲での取得用
+        Index("ix_transcriptsegment_record_id_start_ms", "record_id", "start_ms"),
+    )
+
+    id: Optional[int] = Field(default=None, primary_key=True)
+    record_id: int = Field(foreign_key="transcriptionrecord.id")
+    seq: int
+    start_ms: int
+    end_ms: int
+    text: str
+
+
+class SegmentCheckpoint(SQLModel, table=True):
+    """セグメント単位の途中結果テーブル（ワーカー停止後の再実行で完了済みセグメントを省略）"""
+    task_id: str = Field(primary_key=True)
+    segment_index: int = Field(primary_key=True)
+    start: float  # seconds on the processed timeline
+    end: float
+    transcription_text: str
+    segments_json: Optional[str] = None
+    created_at: datetime = Field(default_factory=datetime.now, index=True)
 
 
 def init_db() -> None:
-    """データベース初期化"""
-    SQLModel.metadata.create_all(engine)
+    """データベース初期化（database.DatabaseManager の共通エンジンを使用）"""
+    database.init_db()
 
 
 def get_session() -> Session:
-    """データベースセッション取得"""
-    return Session(engine)
\ No newline at end of file
+    """データベースセッション取得（database.DatabaseManager の共通エンジンを使用）"""
+    return database.get_session()
\ No newline at end of file
@@ -2,20 +2,746 @@
 音声処理サービス - FFmpeg ラッパー
 """
 import os
+import re
+import glob
+import json
+import math
 import ffmpeg
 import tempfile
-from typing import List, Tuple
+import threading
+from bisect import bisect_right
+from collections import deque
+from dataclasses import dataclass, field
+from typing import Callable, Iterable, Iterator, List, Optional, Tuple
 from pathlib import Path
 
+import numpy as np
+
+from config import settings
+from services.metrics import timed_stage
+from utils.logger import celery_logger
+
+
+# 出力サンプルレート / チャンネル数（Whisper推奨の16kHzモノラル）
+SAMPLE_RATE = 16000
+CHANNELS = 1
+
+# セグメントのエンコード形式
+SEGMENT_CODECS = {
+    'wav': {'extension': '.wav', 'acodec': 'pcm_s16le', 'lossy': False},
+    'flac': {'extension': '.flac', 'acodec': 'flac', 'lossy': False},
+    'opus': {'extension': '.ogg', 'acodec': 'libopus', 'lossy': True},
+    'ogg': {'extension': '.ogg', 'acodec': 'libopus', 'lossy': True},
+    'mp3': {'extension': '.mp3', 'acodec': 'libmp3lame', 'lossy': True},
+}
+
+# 同じ入力から毎回同じバイト列を出力するためのオプション（Ogg のストリームシリアル番号や
+# エンコーダーのバージョンタグを固定し、セグメントのハッシュをキャッシュキーに使えるようにする）
+BITEXACT_ARGS = {'fflags': '+bitexact', 'flags': '+bitexact'}
+
+# FLACの圧縮率は内容次第のため、PCMに対して控えめな比率で見積もる
+FLAC_SIZE_RATIO = 0.75
+# 非可逆形式のコンテナ/ヘッダーのオーバーヘッド
+CONTAINER_OVERHEAD = 1.05
+
+# 分割結果の保存ファイル（再実行時に変換・分割を省略するため）
+MANIFEST_FILE = "manifest.json"
+# ffprobe の結果の保存ファイル（ジョブごとに1回だけ probe する）
+PROBE_FILE = "probe.json"
+
+# 再エンコードせずに切り出せる音声コーデック（文字起こしAPIが受け付ける形式）と
+# 出力の (拡張子, segment muxer の出力形式)
+STREAM_COPY_CODECS = {
+    'aac': ('.m4a', 'ipod'),
+    'mp3': ('.mp3', 'mp3'),
+    'opus': ('.ogg', 'ogg'),
+    'vorbis': ('.ogg', 'ogg'),
+    'flac': ('.flac', 'flac'),
+}
+
+
+def parse_bitrate(bitrate: str) -> int:
+    """
+    ビットレート文字列をbpsに変換（例: "32k" -> 32000）
+    
+    Args:
+        bitrate: ビットレート文字列
+        
+    Returns:
+        int: ビットレート（bps）
+    """
+    value = str(bitrate).strip().lower()
+    if value.endswith('k'):
+        return int(float(value[:-1]) * 1000)
+    if value.endswith('m'):
+        return int(float(value[:-1]) * 1000 * 1000)
+    return int(value)
+
+
+def segment_byte_rate(codec: str, bitrate: str) -> float:
+    """
+    セグメント形式ごとの1秒あたりのバイト数を見積もる
+    
+    Args:
+        codec: セグメント形式
+        bitrate: 非可逆形式のビットレート
+        
+    Returns:
+        float: bytes/sec
+    """
+    pcm_rate = SAMPLE_RATE * CHANNELS * 2  # 16bit PCM
+    if codec == 'wav':
+        return float(pcm_rate)
+    if codec == 'flac':
+        return pcm_rate * FLAC_SIZE_RATIO
+    return parse_bitrate(bitrate) / 8 * CONTAINER_OVERHEAD
+
+
+# silencedetect のログ出力
+SILENCE_START_RE = re.compile(r'silence_start:\s*(-?[\d.]+)')
+SILENCE_END_RE = re.compile(r'silence_end:\s*(-?[\d.]+)')
+
+
+@dataclass
+class AudioSegment:
+    """
+    分割されたセグメント
+    
+    時刻は処理後（無音除去後）の音声上の秒。元ファイル上の時刻へは
+    AudioProcessor.timestamp_map で変換する。
+    """
+    index: int
+    path: str
+    start: float
+    end: float
+    
+    @property
+    def duration(self) -> float:
+        return self.end - self.start
+
+
+@dataclass
+class StreamCopyPlan:
+    """動画コンテナの音声トラックを再エンコードせずに切り出す条件"""
+    codec: str
+    extension: str
+    segment_format: str
+    bit_rate: int  # bps
+    duration: float  # seconds
+
+
+def stream_bit_rate(stream: dict) -> Optional[int]:
+    """
+    ffprobe のストリーム情報からビットレートを取得（Matroska はタグの BPS）
+    
+    Args:
+        stream: ffprobe のストリーム情報
+        
+    Returns:
+        Optional[int]: ビットレート（bps）、不明な場合はNone
+    """
+    tags = stream.get('tags') or {}
+    for value in (stream.get('bit_rate'), tags.get('BPS'), tags.get('BPS-eng')):
+        try:
+            if value and int(value) > 0:
+                return int(value)
+        except ValueError:
+            continue
+    return None
+
+
+@dataclass
+class TimestampMap:
+    """
+    無音除去後の時刻と元ファイル上の時刻の対応表
+    
+    spans は残した区間 (元の開始, 元の終了) のリスト。
+    """
+    spans: List[Tuple[float, float]]
+    offsets: List[float] = field(init=False, repr=False)
+    
+    def __post_init__(self):
+        # 各区間の処理後の開始時刻
+        self.offsets = []
+        position = 0.0
+        for start, end in self.spans:
+            self.offsets.append(position)
+            position += end - start
+    
+    @classmethod
+    def identity(cls, total_duration: float) -> 'TimestampMap':
+        """無音除去なしの対応表"""
+        return cls([(0.0, total_duration)])
+    
+    @classmethod
+    def from_silences(
+        cls,
+        silences: List[Tuple[float, float]],
+        total_duration: float,
+        min_silence: float,
+        padding: float
+    ) -> 'TimestampMap':
+        """
+        無音区間から残す区間を求める
+        
+        Args:
+            silences: 無音区間のリスト
+            total_duration: 総時間（秒）
+            min_silence: 除去する無音の最小長（秒）
+            padding: 除去する無音の前後に残す時間（秒）
+            
+        Returns:
+            TimestampMap: 対応表
+        """
+        spans = []
+        position = 0.0
+        for start, end in silences:
+            if end - start < min_silence:
+                continue
+            cut_start = start + padding if start > 0 else 0.0
+            cut_end = end - padding if end < total_duration else total_duration
+            if cut_end <= cut_start:
+                continue
+            if cut_start > position:
+                spans.append((position, cut_start))
+            position = max(position, cut_end)
+        if total_duration > position:
+            spans.append((position, total_duration))
+        return cls(spans)
+    
+    @property
+    def processed_duration(self) -> float:
+        """無音除去後の長さ（秒）"""
+        if not self.spans:
+            return 0.0
+        return self.offsets[-1] + self.spans[-1][1] - self.spans[-1][0]
+    
+    def removed_seconds(self, total_duration: float) -> float:
+        """除去した時間（秒）"""
+        return max(0.0, total_duration - self.processed_duration)
+    
+    def to_original(self, t: float) -> float:
+        """
+        処理後の時刻を元ファイル上の時刻に変換
+        
+        Args:
+            t: 処理後の時刻（秒）
+            
+        Returns:
+            float: 元ファイル上の時刻（秒）
+        """
+        if not self.spans:
+            return t
+        i = max(0, bisect_right(self.offsets, t) - 1)
+        start, end = self.spans[i]
+        return min(start + (t - self.offsets[i]), end)
+    
+    def to_processed(self, t: float) -> float:
+        """
+        元ファイル上の時刻を処理後の時刻に変換（除去区間内は直後の区間の先頭）
+        
+        Args:
+            t: 元ファイル上の時刻（秒）
+            
+        Returns:
+            float: 処理後の時刻（秒）
+        """
+        if not self.spans:
+            return t
+        i = bisect_right([start for start, _ in self.spans], t) - 1
+        if i < 0:
+            return 0.0
+        start, end = self.spans[i]
+        return self.offsets[i] + min(t, end) - start
+    
+    def filter_expression(self) -> str:
+        """残す区間だけを選択して連結するFFmpegフィルタ"""
+        selected = '+'.join(
+            f'between(t,{start:.3f},{end:.3f})' for start, end in self.spans
+        )
+        return f"aselect='{selected}',asetpts=N/SR/TB"
+
+
+def ffmpeg_error_detail(error: ffmpeg.Error) -> str:
+    """FFmpegのエラー出力の末尾（原因が書かれている部分）"""
+    stderr = (error.stderr or b'').decode('utf-8', errors='ignore').strip()
+    return stderr[-500:] or str(error)
+
+
+def parse_silencedetect(log: bytes, total_duration: float) -> List[Tuple[float, float]]:
+    """
+    silencedetect フィルタのログから無音区間を取得
+    
+    Args:
+        log: FFmpegの標準エラー出力
+        total_duration: 総時間（末尾まで続く無音区間の終端に使用）
+        
+    Returns:
+        List[Tuple[float, float]]: (開始, 終了) のリスト
+    """
+    silences = []
+    start = None
+    for line in log.decode('utf-8', errors='ignore').splitlines():
+        match = SILENCE_START_RE.search(line)
+        if match:
+            start = max(0.0, float(match.group(1)))
+            continue
+        match = SILENCE_END_RE.search(line)
+        if match and start is not None:
+            silences.append((start, float(match.group(1))))
+            start = None
+    if start is not None and total_duration > start:
+        silences.append((start, total_duration))
+    return silences
+
+
+def choose_boundaries(
+    total_duration: float,
+    segment_duration: float,
+    silences: List[Tuple[float, float]],
+    search_window: float
+) -> List[float]:
+    """
+    目標の分割位置の直前にある無音区間の中央を分割点として選ぶ
+    
+    無音が見つからない場合は目標位置でそのまま分割する。分割点は目標位置より
+    後ろにならないため、各セグメントはバイト予算を超えない。
+    
+    Args:
+        total_duration: 総時間（秒）
+        segment_duration: セグメントの最大長（秒）
+        silences: 無音区間のリスト
+        search_window: 目標位置から遡って無音を探す範囲（秒）
+        
+    Returns:
+        List[float]: 分割点（秒）のリスト（0と終端は含まない）
+    """
+    boundaries = []
+    position = 0.0
+    while total_duration - position > segment_duration:
+        target = position + segment_duration
+        window_start = max(position + 1.0, target - search_window)
+        candidates = [
+            (start + end) / 2
+            for start, end in silences
+            if window_start <= (start + end) / 2 <= target
+        ]
+        cut = max(candidates) if candidates else target
+        boundaries.append(cut)
+        position = cut
+    return boundaries
+
+
+# パイプ経由のデコード（中間ファイルを作らない）
+SAMPLE_WIDTH = 2  # 16bit PCM
+BYTES_PER_SECOND = SAMPLE_RATE * CHANNELS * SAMPLE_WIDTH
+# 無音判定の単位（30ms）
+VAD_FRAME_SAMPLES = SAMPLE_RATE * 30 // 1000
+VAD_FRAME_BYTES = VAD_FRAME_SAMPLES * CHANNELS * SAMPLE_WIDTH
+# 保留中のPCMをエンコーダーへまとめて書き出す単位
+STREAM_FLUSH_BYTES = BYTES_PER_SECOND
+
+
+def align_bytes(n: float) -> int:
+    """バイト位置をサンプル境界に切り捨て"""
+    step = CHANNELS * SAMPLE_WIDTH
+    return int(n) // step * step
+
+
+def decode_pcm_chunks(input_path: str, chunk_bytes: int) -> Iterator[bytes]:
+    """
+    FFmpeg で16kHzモノラルPCMにデコードし、標準出力から一定サイズずつ読み出す
+    
+    途中でジェネレーターを閉じた場合は FFmpeg を終了させる。
+    
+    Args:
+        input_path: 入力ファイルパス（URLも可）
+        chunk_bytes: 1回に読み出すバイト数
+        
+    Yields:
+        bytes: PCM（s16le）
+        
+    Raises:
+        ffmpeg.Error: デコードに失敗した場合
+    """
+    process = (
+        ffmpeg
+        .input(input_path)
+        .output('pipe:', format='s16le', acodec='pcm_s16le', ac=CHANNELS, ar=str(SAMPLE_RATE))
+        .global_args('-nostats', '-loglevel', 'error')
+        .run_async(pipe_stdout=True, pipe_stderr=True)
+    )
+    # 壊れたファイルでエラー出力が溢れて停止しないよう、別スレッドで読み捨てる（末尾のみ保持）
+    log: deque = deque(maxlen=64)
+    reader = threading.Thread(target=lambda: log.extend(process.stderr), daemon=True)
+    reader.start()
+    completed = False
+    try:
+        while True:
+            chunk = process.stdout.read(chunk_bytes)
+            if not chunk:
+                break
+            yield chunk
+        completed = True
+    finally:
+        if not completed:
+            process.kill()
+        process.stdout.close()
+        returncode = process.wait()
+        reader.join()
+        process.stderr.close()
+    if returncode != 0:
+        raise ffmpeg.Error('ffmpeg', None, b''.join(log))
+
+
+def vad_frames(chunks: Iterable[bytes], threshold_db: float) -> Iterator[Tuple[bytes, bool]]:
+    """
+    PCMを30msのフレームに分け、RMSがしきい値未満かどうか（無音）を付けて返す
+    
+    Args:
+        chunks: PCMチャンク
+        threshold_db: 無音とみなす音量（dBFS）
+        
+    Yields:
+        Tuple[bytes, bool]: (フレーム, 無音か)
+    """
+    threshold = 32768.0 * 10 ** (threshold_db / 20)
+    pending = b''
+    for chunk in chunks:
+        data = pending + chunk
+        whole = len(data) - len(data) % VAD_FRAME_BYTES
+        pending = data[whole:]
+        if not whole:
+            continue
+        samples = np.frombuffer(data[:whole], dtype='<i2').astype(np.float32)
+        rms = np.sqrt(np.mean(np.square(samples.reshape(-1, VAD_FRAME_SAMPLES * CHANNELS)), axis=1))
+        for i, silent in enumerate(rms < threshold):
+            yield data[i * VAD_FRAME_BYTES:(i + 1) * VAD_FRAME_BYTES], bool(silent)
+    if pending:
+        samples = np.frombuffer(pending, dtype='<i2').astype(np.float32)
+        yield pending, bool(np.sqrt(np.mean(np.square(samples))) < threshold)
+
+
+class SilenceTrimmer:
+    """
+    長い無音をフレーム単位で除去（TimestampMap.from_silences と同じ規則）
+    
+    無音が trim_min_silence 続いた時点で除去を確定し、前後の padding だけを残す。
+    保持するのは最大で trim_min_silence 分のフレームのみ。
+    """
+    
+    def __init__(self, min_silence: float, padding: float):
+        frame_seconds = VAD_FRAME_SAMPLES / SAMPLE_RATE
+        self.pad_frames = int(round(padding / frame_seconds))
+        self.min_frames = max(
+            int(math.ceil(min_silence / frame_seconds)), 2 * self.pad_frames + 1
+        )
+        # 残した区間 (元の開始, 元の終了)（秒）
+        self.spans: List[Tuple[float, float]] = []
+        # 入力した総バイト数（元の音声上の位置）
+        self.position = 0
+    
+    def process(self, frames: Iterable[Tuple[bytes, bool]]) -> Iterator[Tuple[bytes, bool]]:
+        """
+        無音除去後のフレームを返す
+        
+        Args:
+            frames: (フレーム, 無音か)
+            
+        Yields:
+            Tuple[bytes, bool]: 残したフレーム
+        """
+        span_start = 0
+        run: List[bytes] = []  # 除去が確定する前の無音フレーム
+        run_start = 0
+        trimming = False
+        tail: deque = deque(maxlen=self.pad_frames or None)
+        for frame, silent in frames:
+            if silent:
+                if trimming:
+                    if self.pad_frames:
+                        tail.append(frame)
+                else:
+                    if not run:
+                        run_start = self.position
+                    run.append(frame)
+                    if len(run) >= self.min_frames:
+                        # 先頭の無音は padding を残さない
+                        keep = run[:self.pad_frames] if run_start > 0 else []
+                        yield from ((kept, True) for kept in keep)
+                        cut_start = run_start + sum(len(kept) for kept in keep)
+                        self._close_span(span_start, cut_start)
+                        tail.clear()
+                        if self.pad_frames:
+                            tail.extend(run[len(run) - self.pad_frames:])
+                        run = []
+                        trimming = True
+            else:
+                if trimming:
+                    span_start = self.position - sum(len(kept) for kept in tail)
+                    yield from ((kept, True) for kept in tail)
+                    tail.clear()
+                    trimming = False
+                elif run:
+                    yield from ((kept, True) for kept in run)
+                    run = []
+                yield frame, False
+            self.position += len(frame)
+        
+        # 末尾の無音は padding を残さない
+        if not trimming:
+            yield from ((kept, True) for kept in run)
+            self._close_span(span_start, self.position)
+    
+    def _close_span(self, start: int, end: int) -> None:
+        if end > start:
+            self.spans.append((start / BYTES_PER_SECOND, end / BYTES_PER_SECOND))
+
+
+class SegmentEncoder:
+    """標準入力のPCMをセグメント形式でファイルへ書き出す FFmpeg プロセス"""
+    
+    def __init__(self, path: str, output_args: dict):
+        self.path = path
+        self._process = (
+            ffmpeg
+            .input('pipe:', format='s16le', ac=CHANNELS, ar=str(SAMPLE_RATE))
+            .output(path, **output_args)
+            .global_args('-nostats', '-loglevel', 'error')
+            .overwrite_output()
+            .run_async(pipe_stdin=True, pipe_stderr=True)
+        )
+        # エラー出力でパイプが埋まって書き込みが止まらないよう、別スレッドで読み捨てる（末尾のみ保持）
+        self._log: deque = deque(maxlen=64)
+        self._reader = threading.Thread(
+            target=lambda: self._log.extend(self._process.stderr), daemon=True
+        )
+        self._reader.start()
+    
+    def write(self, pcm: bytes) -> None:
+        self._process.stdin.write(pcm)
+    
+    def close(self) -> None:
+        """入力を閉じてエンコードの完了を待つ"""
+        self._process.stdin.close()
+        returncode = self._process.wait()
+        self._reader.join()
+        self._process.stderr.close()
+        if returncode != 0:
+            raise ffmpeg.Error('ffmpeg', None, b''.join(self._log))
+    
+    def abort(self) -> None:
+        self._process.kill()
+        self._process.wait()
+        self._reader.join()
+        self._process.stderr.close()
+
+
+class StreamSegmenter:
+    """
+    無音除去後のフレームを受け取り、セグメントごとのエンコーダーへ振り分ける
+    
+    分割位置を無音に合わせる場合は、直近 search_window 分のPCMだけを保留して
+    目標位置の直前にある無音の中央で分割する（choose_boundaries と同じ規則）。
+    重なりがある場合、前のセグメントは分割点から overlap 分だけ書き続けてから閉じる。
+    """
+    
+    def __init__(
+        self,
+        open_encoder: Callable[[int], SegmentEncoder],
+        segment_duration: float,
+        overlap: float,
+        search_window: float,
+        min_silence: float
+    ):
+        self.open_encoder = open_encoder
+        self.max_bytes = max(align_bytes(segment_duration * BYTES_PER_SECOND), BYTES_PER_SECOND)
+        self.overlap_bytes = align_bytes(overlap * BYTES_PER_SECOND)
+        self.window_bytes = align_bytes(search_window * BYTES_PER_SECOND)
+        self.min_silence_bytes = align_bytes(min_silence * BYTES_PER_SECOND)
+        self.segments: List[AudioSegment] = []
+        # 保留中のPCM（committed 以降、エンコーダーへ未送信）
+        self._held = bytearray()
+        self._committed = 0
+        self._position = 0
+        self._segment_start = 0
+        self._silences: List[Tuple[int, int]] = []
+        self._silence_start: Optional[int] = None
+        self._current: Optional[SegmentEncoder] = None
+        # 重なり分を書き終えるまで開いておくエンコーダー (セグメント, エンコーダー, 終端)
+        self._draining: List[Tuple[AudioSegment, SegmentEncoder, int]] = []
+    
+    @property
+    def encoders(self) -> List[SegmentEncoder]:
+        """開いているエンコーダー（異常終了時の後始末用）"""
+        encoders = [encoder for _, encoder, _ in self._draining]
+        return encoders + [self._current] if self._current else encoders
+    
+    def _start_segment(self, start: int) -> None:
+        index = len(self.segments)
+        encoder = self.open_encoder(index)
+        self.segments.append(AudioSegment(
+            index=index, path=encoder.path,
+            start=start / BYTES_PER_SECOND, end=start / BYTES_PER_SECOND
+        ))
+        self._current = encoder
+        self._segment_start = start
+    
+    def _flush(self, upto: int) -> None:
+        """upto までの保留中のPCMを現在と重なり中のエンコーダーへ書き出す"""
+        size = upto - self._committed
+        if size <= 0:
+            return
+        data = bytes(self._held[:size])
+        self._current.write(data)
+        still_draining = []
+        for segment, encoder, until in self._draining:
+            if until > self._committed:
+                encoder.write(data[:until - self._committed])
+            if until > upto:
+                still_draining.append((segment, encoder, until))
+            else:
+                encoder.close()
+        self._draining = still_draining
+        del self._held[:size]
+        self._committed = upto
+        self._silences = [(s, e) for s, e in self._silences if (s + e) // 2 >= upto]
+    
+    def _cut(self) -> None:
+        """目標位置を超えたセグメントを分割"""
+        target = self._segment_start + self.max_bytes
+        window_start = max(
+            self._segment_start + BYTES_PER_SECOND, target - self.window_bytes, self._committed
+        )
+        candidates = [
+            align_bytes((start + end) // 2)
+            for start, end in self._silences
+            if window_start <= (start + end) // 2 <= target
+        ]
+        cut = max(candidates) if candidates else target
+        self._flush(cut)
+        
+        segment = self.segments[-1]
+        if self.overlap_bytes:
+            self._draining.append((segment, self._current, cut + self.overlap_bytes))
+            segment.end = (cut + self.overlap_bytes) / BYTES_PER_SECOND
+        else:
+            self._current.close()
+            segment.end = cut / BYTES_PER_SECOND
+        self._start_segment(cut)
+    
+    def feed(self, frame: bytes, silent: bool) -> None:
+        """
+        フレームを1つ追加
+        
+        Args:
+            frame: PCMフレーム
+            silent: 無音か
+        """
+        if self._current is None:
+            self._start_segment(0)
+        
+        if silent and self._silence_start is None:
+            self._silence_start = self._position
+        elif not silent and self._silence_start is not None:
+            if self._position - self._silence_start >= self.min_silence_bytes:
+                self._silences.append((self._silence_start, self._position))
+            self._silence_start = None
+        
+        self._held += frame
+        self._position += len(frame)
+        
+        while self._position - self._segment_start > self.max_bytes:
+            self._cut()
+        if self._position - self._committed >= self.window_bytes + STREAM_FLUSH_BYTES:
+            self._flush(self._position - self.window_bytes)
+    
+    def finish(self) -> List[AudioSegment]:
+        """
+        残りを書き出して全エンコーダーを閉じる
+        
+        Returns:
+            List[AudioSegment]: 分割されたセグメント
+        """
+        if self._current is None:
+            return []
+        self._flush(self._position)
+        for segment, encoder, until in self._draining:
+            encoder.close()
+            segment.end = min(until, self._position) / BYTES_PER_SECOND
+        self._draining = []
+        self._current.close()
+        self._current = None
+        self.segments[-1].end = self._position / BYTES_PER_SECOND
+        return self.segments
+
 
 class AudioProcessor:
     """音声ファイル処理クラス"""
     
-    MAX_DURATION = 30 * 60  # 30分（秒）
+    def __init__(
+        self,
+        single_pass: Optional[bool] = None,
+        codec: Optional[str] = None,
+        bitrate: Optional[str] = None,
+        work_dir: Optional[str] = None
+    ):
+        # work_dir を指定した場合は分割結果を残し、再実行時に再利用できるようにする
+        if work_dir:
+            os.makedirs(work_dir, exist_ok=True)
+            self.temp_dir = work_dir
+        else:
+            self.temp_dir = tempfile.mkdtemp()
+        self.single_pass = (
+            settings.audio_single_pass if single_pass is None else single_pass
+        )
+        self.codec = (codec or settings.segment_codec).lower()
+        if self.codec not in SEGMENT_CODECS:
+            raise ValueError(f"Unsupported segment codec: {self.codec}")
+        self.bitrate = bitrate or settings.segment_bitrate
+        self.segment_duration = self.segment_duration_for_budget(
+            settings.segment_target_bytes
+        )
+        # 無音除去の結果（process_audio_file で設定）
+        self.timestamp_map: Optional[TimestampMap] = None
+        self.silence_removed = 0.0
+        # 入力の ffprobe 結果（probe で取得）
+        self._probe: Optional[dict] = None
     
-    def __init__(self):
-        self.temp_dir = tempfile.mkdtemp()
+    @property
+    def segment_extension(self) -> str:
+        """セグメントファイルの拡張子"""
+        return SEGMENT_CODECS[self.codec]['extension']
     
+    def segment_output_args(self) -> dict:
+        """
+        セグメント出力用のFFmpegオプション
+        
+        Returns:
+            dict: ffmpeg.output に渡すキーワード引数
+        """
+        codec = SEGMENT_CODECS[self.codec]
+        args = {'acodec': codec['acodec'], 'ac': CHANNELS, 'ar': str(SAMPLE_RATE), **BITEXACT_ARGS}
+        if codec['lossy']:
+            args['audio_bitrate'] = self.bitrate
+        return args
+    
+    def segment_duration_for_budget(self, target_bytes: int) -> int:
+        """
+        1リクエストあたりのバイト予算からセグメント長を算出
+        
+        Args:
+            target_bytes: セグメント1つあたりの目標サイズ（bytes）
+            
+        Returns:
+            int: セグメント長（秒）
+        """
+        duration = int(target_bytes / segment_byte_rate(self.codec, self.bitrate))
+        if settings.max_audio_duration:
+            duration = min(duration, settings.max_audio_duration)
+        return max(duration, 1)
+    
+    @timed_stage("ffmpeg_convert")
     def convert_to_wav(self, input_path: str, output_path: str) -> bool:
         """
         音声/動画ファイルをWAVに変換
@@ -31,13 +757,13 @@ class AudioProcessor:
             (
                 ffmpeg
                 .input(input_path)
-                .output(output_path, acodec='pcm_s16le', ac=1, ar='16000')
+                .output(output_path, acodec='pcm_s16le', ac=CHANNELS, ar=str(SAMPLE_RATE))
                 .overwrite_output()
                 .run(quiet=True)
             )
             return True
         except ffmpeg.Error as e:
-            print(f"FFmpeg error: {e}")
+            celery_logger.error(f"FFmpeg error: input={input_path} detail={ffmpeg_error_detail(e)}")
             return False
     
     def get_audio_duration(self, file_path: str) -> float:
@@ -57,47 +783,410 @@ class AudioProcessor:
         except (ffmpeg.Error, KeyError, ValueError):
             return 0.0
     
-    def split_audio(self, input_path: str, max_duration: int = MAX_DURATION) -> List[str]:
+    @timed_stage("ffmpeg_split")
+    def split_audio(self, input_path: str, max_duration: Optional[int] = None) -> List[str]:
         """
-        音声ファイルを指定時間で分割
+        音声ファイルを指定時間で分割し、セグメント形式でエンコード
         
         Args:
             input_path: 入力ファイルパス
-            max_duration: 最大時間（秒）
+            max_duration: 最大時間（秒）、省略時はバイト予算から算出した長さ
             
         Returns:
             List[str]: 分割されたファイルパスのリスト
         """
+        max_duration = max_duration or self.segment_duration
         duration = self.get_audio_duration(input_path)
-        if duration <= max_duration:
-            return [input_path]
         
         segments = []
-        num_segments = int(duration // max_duration) + 1
+        num_segments = max(1, math.ceil(duration / max_duration))
         
         for i in range(num_segments):
             start_time = i * max_duration
             segment_path = os.path.join(
                 self.temp_dir, 
-                f"segment_{i:03d}.wav"
+                f"segment_{i:03d}{self.segment_extension}"
             )
             
             try:
                 (
                     ffmpeg
                     .input(input_path, ss=start_time, t=max_duration)
-                    .output(segment_path, acodec='pcm_s16le', ac=1, ar='16000')
+                    .output(segment_path, **self.segment_output_args())
                     .overwrite_output()
                     .run(quiet=True)
                 )
                 segments.append(segment_path)
             except ffmpeg.Error as e:
-                print(f"Segment {i} error: {e}")
+                celery_logger.error(f"FFmpeg error: segment={i} detail={ffmpeg_error_detail(e)}")
                 continue
         
         return segments
     
-    def process_audio_file(self, input_path: str) -> Tuple[List[str], float]:
+    @staticmethod
+    def _parse_progress_duration(progress: bytes) -> float:
+        """
+        FFmpegの -progress 出力から処理済みの長さを取得
+        
+        Args:
+            progress: -progress pipe:1 の出力
+            
+        Returns:
+            float: 長さ（秒）、取得できない場合は0.0
+        """
+        duration_us = 0
+        for line in progress.decode('utf-8', errors='ignore').splitlines():
+            key, _, value = line.partition('=')
+            # out_time_ms も実際にはマイクロ秒単位
+            if key in ('out_time_us', 'out_time_ms') and value.strip().isdigit():
+                duration_us = max(duration_us, int(value))
+        return duration_us / 1_000_000
+    
+    @timed_stage("ffmpeg_convert_split")
+    def convert_and_split(
+        self,
+        input_path: str,
+        max_duration: Optional[int] = None
+    ) -> Tuple[List[str], float]:
+        """
+        1回のデコードで変換と分割を同時に行う（segment muxer使用）
+        
+        Args:
+            input_path: 入力ファイルパス
+            max_duration: 最大時間（秒）、省略時はバイト予算から算出した長さ
+            
+        Returns:
+            Tuple[List[str], float]: (分割されたファイルパス, 総時間)
+        """
+        max_duration = max_duration or self.segment_duration
+        pattern = os.path.join(self.temp_dir, f"segment_%03d{self.segment_extension}")
+        
+        try:
+            progress, _ = (
+                ffmpeg
+                .input(input_path)
+                .output(
+                    pattern,
+                    **self.segment_output_args(),
+                    f='segment',
+                    segment_time=max_duration,
+                    reset_timestamps=1
+                )
+                .global_args('-progress', 'pipe:1', '-nostats')
+                .overwrite_output()
+                .run(capture_stdout=True, capture_stderr=True)
+            )
+        except ffmpeg.Error as e:
+            celery_logger.error(f"FFmpeg error: input={input_path} detail={ffmpeg_error_detail(e)}")
+            return [], 0.0
+        
+        segments = sorted(glob.glob(
+            os.path.join(self.temp_dir, f"segment_*{self.segment_extension}")
+        ))
+        
+        # デコード時の進捗出力から総時間を取得（取得できない場合のみprobe）
+        total_duration = self._parse_progress_duration(progress)
+        if total_duration <= 0 and segments:
+            total_duration = sum(self.get_audio_duration(path) for path in segments)
+        
+        return segments, total_duration
+    
+    @timed_stage("ffmpeg_silencedetect")
+    def detect_silences(self, input_path: str) -> Tuple[List[Tuple[float, float]], float]:
+        """
+        silencedetect で無音区間を検出（総時間も同じデコードから取得）
+        
+        Args:
+            input_path: 入力ファイルパス
+            
+        Returns:
+            Tuple[List[Tuple[float, float]], float]: (無音区間, 総時間)
+        """
+        try:
+            progress, log = (
+                ffmpeg
+                .input(input_path)
+                .audio
+                .filter(
+                    'silencedetect',
+                    noise=f'{settings.silence_threshold_db}dB',
+                    d=settings.silence_min_duration
+                )
+                .output('-', format='null')
+                .global_args('-progress', 'pipe:1', '-nostats')
+                .run(capture_stdout=True, capture_stderr=True)
+            )
+        except ffmpeg.Error as e:
+            celery_logger.error(f"FFmpeg error: input={input_path} detail={ffmpeg_error_detail(e)}")
+            return [], 0.0
+        
+        total_duration = self._parse_progress_duration(progress)
+        return parse_silencedetect(log, total_duration), total_duration
+    
+    @timed_stage("ffmpeg_encode")
+    def encode_segments(
+        self,
+        input_path: str,
+        boundaries: List[float],
+        total_duration: float,
+        overlap: float = 0.0,
+        filter_expression: Optional[str] = None
+    ) -> List[AudioSegment]:
+        """
+        分割点に従って1回のデコードで全セグメントを出力
+        
+        各セグメントを個別の出力として指定するため、重なり（overlap）を持たせる
+        ことができる。
+        
+        Args:
+            input_path: 入力ファイルパス
+            boundaries: 分割点（秒）
+            total_duration: 総時間（秒）
+            overlap: 次のセグメントと重ねる時間（秒）
+            filter_expression: 分割前に適用するフィルタ（無音除去用）
+            
+        Returns:
+            List[AudioSegment]: 分割されたセグメント
+        """
+        edges = [0.0] + list(boundaries) + [total_duration]
+        segments = []
+        for i, (start, end) in enumerate(zip(edges, edges[1:])):
+            segments.append(AudioSegment(
+                index=i,
+                path=os.path.join(self.temp_dir, f"segment_{i:03d}{self.segment_extension}"),
+                start=start,
+                end=min(end + overlap, total_duration) if i < len(edges) - 2 else end
+            ))
+        
+        output_args = self.segment_output_args()
+        if filter_expression:
+            # 区間数が多いとコマンドライン長を超えるためスクリプトファイル経由で渡す
+            script_path = os.path.join(self.temp_dir, "filter.txt")
+            with open(script_path, 'w') as f:
+                f.write(filter_expression)
+            output_args['filter_script:a'] = script_path
+        
+        stream = ffmpeg.input(input_path).audio
+        outputs = [
+            stream.output(
+                segment.path,
+                ss=segment.start,
+                t=segment.duration,
+                **output_args
+            )
+            for segment in segments
+        ]
+        
+        try:
+            ffmpeg.merge_outputs(*outputs).overwrite_output().run(quiet=True)
+        except ffmpeg.Error as e:
+            celery_logger.error(f"FFmpeg error: input={input_path} detail={ffmpeg_error_detail(e)}")
+            return []
+        
+        return segments
+    
+    @timed_stage("ffmpeg_stream")
+    def stream_audio_file(self, input_path: str) -> Tuple[List[AudioSegment], float]:
+        """
+        1回のデコードをパイプで受け取り、無音除去・分割・エンコードをメモリ上で行う
+        
+        デコード結果やフィルタ用のファイルを作らず、保持するPCMは分割位置を探す
+        範囲（silence_search_window）と無音除去の判定分に限られる。
+        
+        Args:
+            input_path: 入力ファイルパス（URLも可）
+            
+        Returns:
+            Tuple[List[AudioSegment], float]: (処理済みセグメント, 総時間)
+        """
+        overlap = settings.segment_overlap if settings.segment_on_silence else 0.0
+        output_args = self.segment_output_args()
+        segmenter = StreamSegmenter(
+            lambda index: SegmentEncoder(
+                os.path.join(self.temp_dir, f"segment_{index:03d}{self.segment_extension}"),
+                output_args
+            ),
+            # 重なり分だけ分割間隔を短くしてバイト予算内に収める
+            max(self.segment_duration - overlap, 1.0),
+            overlap,
+            settings.silence_search_window if settings.segment_on_silence else 0.0,
+            settings.silence_min_duration
+        )
+        trimmer = (
+            SilenceTrimmer(settings.trim_min_silence, settings.trim_padding)
+            if settings.trim_silence else None
+        )
+        
+        chunks = decode_pcm_chunks(
+            input_path, max(align_bytes(settings.stream_chunk_seconds * BYTES_PER_SECOND), VAD_FRAME_BYTES)
+        )
+        frames = vad_frames(chunks, settings.silence_threshold_db)
+        try:
+            processed = 0
+            for frame, silent in (trimmer.process(frames) if trimmer else frames):
+                segmenter.feed(frame, silent)
+                processed += len(frame)
+            segments = segmenter.finish()
+        except (ffmpeg.Error, OSError) as e:
+            for encoder in segmenter.encoders:
+                encoder.abort()
+            detail = ffmpeg_error_detail(e) if isinstance(e, ffmpeg.Error) else str(e)
+            celery_logger.error(f"FFmpeg error: input={input_path} detail={detail}")
+            return [], 0.0
+        finally:
+            chunks.close()
+        
+        total_duration = (trimmer.position if trimmer else processed) / BYTES_PER_SECOND
+        if trimmer:
+            self.timestamp_map = TimestampMap(trimmer.spans)
+        elif settings.segment_on_silence:
+            self.timestamp_map = TimestampMap.identity(total_duration)
+        if self.timestamp_map:
+            self.silence_removed = self.timestamp_map.removed_seconds(total_duration)
+        return segments, total_duration
+    
+    def probe(self, input_path: str) -> Optional[dict]:
+        """
+        入力の ffprobe 結果（作業ディレクトリに保存し、再実行時も再利用）
+        
+        Args:
+            input_path: 入力ファイルパス（URLも可）
+            
+        Returns:
+            Optional[dict]: ffprobe の結果、失敗した場合はNone
+        """
+        if self._probe is not None:
+            return self._probe
+        
+        path = os.path.join(self.temp_dir, PROBE_FILE)
+        try:
+            with open(path) as f:
+                self._probe = json.load(f)
+            return self._probe
+        except (OSError, ValueError):
+            pass
+        
+        try:
+            self._probe = ffmpeg.probe(input_path)
+        except ffmpeg.Error as e:
+            celery_logger.warning(f"Probe failed: input={input_path} detail={ffmpeg_error_detail(e)}")
+            return None
+        with open(path + '.tmp', 'w') as f:
+            json.dump(self._probe, f)
+        os.replace(path + '.tmp', path)
+        return self._probe
+    
+    def stream_copy_plan(self, input_path: str) -> Optional[StreamCopyPlan]:
+        """
+        動画コンテナの音声トラックをそのまま切り出せるか判定
+        
+        APIが受け付けるコーデックで、ビットレートが上限以下（セグメントが短くなり
+        すぎない）の場合のみ対象とする。無音除去・無音位置での分割はデコードが
+        必要なため対象外。
+        
+        Args:
+            input_path: 入力ファイルパス
+            
+        Returns:
+            Optional[StreamCopyPlan]: 切り出し条件、再エンコードする場合はNone
+        """
+        if not settings.stream_copy_audio or settings.trim_silence or settings.segment_on_silence:
+            return None
+        probe = self.probe(input_path)
+        if not probe:
+            return None
+        
+        streams = probe.get('streams', [])
+        # カバー画像（attached_pic）は映像として扱わない
+        has_video = any(
+            stream.get('codec_type') == 'video'
+            and not (stream.get('disposition') or {}).get('attached_pic')
+            for stream in streams
+        )
+        audio = next((stream for stream in streams if stream.get('codec_type') == 'audio'), None)
+        if not has_video or audio is None or audio.get('codec_name') not in STREAM_COPY_CODECS:
+            return None
+        
+        bit_rate = stream_bit_rate(audio)
+        try:
+            duration = float(probe['format']['duration'])
+        except (KeyError, ValueError):
+            return None
+        if not bit_rate or bit_rate > settings.stream_copy_max_bitrate or duration <= 0:
+            return None
+        
+        extension, segment_format = STREAM_COPY_CODECS[audio['codec_name']]
+        return StreamCopyPlan(audio['codec_name'], extension, segment_format, bit_rate, duration)
+    
+    @timed_stage("ffmpeg_copy_split")
+    def copy_and_split(self, input_path: str, plan: StreamCopyPlan) -> List[AudioSegment]:
+        """
+        音声トラックを再エンコードせずに分割（-vn -c:a copy）
+        
+        パケット単位で切るため、セグメントがバイト予算を超えた場合は使わない。
+        
+        Args:
+            input_path: 入力ファイルパス
+            plan: 切り出し条件
+            
+        Returns:
+            List[AudioSegment]: 分割されたセグメント（失敗時は空）
+        """
+        segment_duration = max(
+            int(settings.segment_target_bytes / (plan.bit_rate / 8 * CONTAINER_OVERHEAD)), 1
+        )
+        if settings.max_audio_duration:
+            segment_duration = min(segment_duration, settings.max_audio_duration)
+        pattern = os.path.join(self.temp_dir, f"segment_%03d{plan.extension}")
+        
+        try:
+            (
+                ffmpeg
+                .input(input_path)
+                .output(
+                    pattern,
+                    map='0:a:0',
+                    vn=None,
+                    acodec='copy',
+                    **BITEXACT_ARGS,
+                    f='segment',
+                    segment_format=plan.segment_format,
+                    segment_time=segment_duration,
+                    reset_timestamps=1
+                )
+                .overwrite_output()
+                .run(quiet=True)
+            )
+        except ffmpeg.Error as e:
+            celery_logger.error(f"FFmpeg error: input={input_path} detail={ffmpeg_error_detail(e)}")
+            return []
+        
+        paths = sorted(glob.glob(os.path.join(self.temp_dir, f"segment_*{plan.extension}")))
+        if not paths or any(os.path.getsize(path) > settings.segment_target_bytes for path in paths):
+            for path in paths:
+                os.remove(path)
+            return []
+        return self._fixed_segments(paths, plan.duration, segment_duration)
+    
+    def _fixed_segments(
+        self,
+        paths: List[str],
+        total_duration: float,
+        segment_duration: Optional[float] = None
+    ) -> List[AudioSegment]:
+        """固定長で分割したファイルパスを AudioSegment に変換"""
+        segment_duration = segment_duration or self.segment_duration
+        return [
+            AudioSegment(
+                index=i,
+                path=path,
+                start=i * segment_duration,
+                end=min((i + 1) * segment_duration, total_duration)
+            )
+            for i, path in enumerate(paths)
+        ]
+    
+    def process_audio_file(self, input_path: str) -> Tuple[List[AudioSegment], float]:
         """
         音声ファイルを処理（変換・分割）
         
@@ -105,8 +1194,68 @@ class AudioProcessor:
             input_path: 入力ファイルパス
             
         Returns:
-            Tuple[List[str], float]: (処理済みファイルパス, 総時間)
+            Tuple[List[AudioSegment], float]: (処理済みセグメント, 総時間)
         """
+        # 動画の音声トラックがそのまま使える場合はデコードせずに切り出す
+        plan = self.stream_copy_plan(input_path)
+        if plan:
+            segments = self.copy_and_split(input_path, plan)
+            if segments:
+                celery_logger.info(
+                    f"Audio track copied: codec={plan.codec} bit_rate={plan.bit_rate} "
+                    f"segments={len(segments)}"
+                )
+                return segments, plan.duration
+            celery_logger.info(f"Audio track copy not usable, re-encoding: codec={plan.codec}")
+        
+        if settings.audio_streaming:
+            return self.stream_audio_file(input_path)
+        
+        if settings.segment_on_silence or settings.trim_silence:
+            silences, total_duration = self.detect_silences(input_path)
+            if total_duration <= 0:
+                return [], 0.0
+            
+            # 長い無音を除去（元の時刻への対応表を保持）
+            if settings.trim_silence:
+                self.timestamp_map = TimestampMap.from_silences(
+                    silences,
+                    total_duration,
+                    settings.trim_min_silence,
+                    settings.trim_padding
+                )
+            else:
+                self.timestamp_map = TimestampMap.identity(total_duration)
+            self.silence_removed = self.timestamp_map.removed_seconds(total_duration)
+            processed_duration = self.timestamp_map.processed_duration
+            if processed_duration <= 0:
+                return [], total_duration
+            
+            # 無音位置で分割（重なり分だけ分割間隔を短くしてバイト予算内に収める）
+            overlap = settings.segment_overlap if settings.segment_on_silence else 0.0
+            cut_candidates = [
+                (self.timestamp_map.to_processed(start), self.timestamp_map.to_processed(end))
+                for start, end in silences
+            ] if settings.segment_on_silence else []
+            boundaries = choose_boundaries(
+                processed_duration,
+                max(self.segment_duration - overlap, 1.0),
+                cut_candidates,
+                settings.silence_search_window
+            )
+            segments = self.encode_segments(
+                input_path,
+                boundaries,
+                processed_duration,
+                overlap,
+                self.timestamp_map.filter_expression() if settings.trim_silence else None
+            )
+            return segments, total_duration
+        
+        if self.single_pass:
+            paths, total_duration = self.convert_and_split(input_path)
+            return self._fixed_segments(paths, total_duration), total_duration
+        
         # 一時WAVファイルパス
         temp_wav = os.path.join(self.temp_dir, "converted.wav")
         
@@ -120,6 +1269,89 @@ class AudioProcessor:
         # 分割
         segments = self.split_audio(temp_wav)
         
+        return self._fixed_segments(segments, total_duration), total_duration
+    
+    def save_manifest(self, segments: List[AudioSegment], total_duration: float) -> None:
+        """
+        分割結果を作業ディレクトリに保存
+        
+        Args:
+            segments: 処理済みセグメント
+            total_duration: 総時間（秒）
+        """
+        manifest = {
+            'codec': self.codec,
+            'bitrate': self.bitrate,
+            'total_duration': total_duration,
+            'silence_removed': self.silence_removed,
+            'spans': self.timestamp_map.spans if self.timestamp_map else None,
+            'segments': [
+                {
+                    'index': segment.index,
+                    'path': os.path.basename(segment.path),
+                    'start': segment.start,
+                    'end': segment.end
+                }
+                for segment in segments
+            ],
+        }
+        # 書き込み途中で終了しても壊れたファイルを読まないよう置き換えで保存
+        path = os.path.join(self.temp_dir, MANIFEST_FILE)
+        with open(path + '.tmp', 'w') as f:
+            json.dump(manifest, f)
+        os.replace(path + '.tmp', path)
+    
+    def load_manifest(self) -> Optional[Tuple[List[AudioSegment], float]]:
+        """
+        保存済みの分割結果を読み込み（条件が変わった・ファイルが欠けている場合はNone）
+        
+        Returns:
+            Optional[Tuple[List[AudioSegment], float]]: (処理済みセグメント, 総時間)
+        """
+        path = os.path.join(self.temp_dir, MANIFEST_FILE)
+        try:
+            with open(path) as f:
+                manifest = json.load(f)
+        except (OSError, ValueError):
+            return None
+        
+        if manifest.get('codec') != self.codec or manifest.get('bitrate') != self.bitrate:
+            return None
+        
+        segments = [
+            AudioSegment(
+                index=item['index'],
+                path=os.path.join(self.temp_dir, item['path']),
+                start=item['start'],
+                end=item['end']
+            )
+            for item in manifest['segments']
+        ]
+        if not segments or not all(os.path.exists(segment.path) for segment in segments):
+            return None
+        
+        spans = manifest.get('spans')
+        self.timestamp_map = TimestampMap([tuple(span) for span in spans]) if spans else None
+        self.silence_removed = manifest.get('silence_removed', 0.0)
+        return segments, manifest['total_duration']
+    
+    def load_or_process(self, input_path: str) -> Tuple[List[AudioSegment], float]:
+        """
+        作業ディレクトリに前回の分割結果があれば再利用し、なければ処理して保存
+        
+        Args:
+            input_path: 入力ファイルパス
+            
+        Returns:
+            Tuple[List[AudioSegment], float]: (処理済みセグメント, 総時間)
+        """
+        resumed = self.load_manifest()
+        if resumed:
+            return resumed
+        
+        segments, total_duration = self.process_audio_file(input_path)
+        if segments:
+            self.save_manifest(segments, total_duration)
         return segments, total_duration
     
     def cleanup(self) -> None:
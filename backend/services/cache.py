@@ -0,0 +1,234 @@
+"""
+文字起こし結果キャッシュ - コンテンツハッシュをキーに重複アップロードの処理を省略
+"""
+import json
+import hashlib
+from datetime import datetime, timedelta
+from typing import Optional
+
+import redis
+from sqlmodel import Session, select, func
+
+from config import settings
+from models import TranscriptionCacheEntry
+from utils.logger import celery_logger
+
+
+# ヒット/ミス数のカウンタ（全プロセス共通でRedisに保持）
+HITS_KEY = "transcribe:cache:hits"
+MISSES_KEY = "transcribe:cache:misses"
+
+
+def file_hash(path: str, chunk_size: int = 1024 * 1024) -> str:
+    """
+    ファイル内容のSHA-256を計算
+
+    Args:
+        path: ファイルパス
+        chunk_size: 1回に読み込むバイト数
+
+    Returns:
+        str: 16進数のハッシュ値
+    """
+    digest = hashlib.sha256()
+    with open(path, 'rb') as f:
+        for chunk in iter(lambda: f.read(chunk_size), b''):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+class TranscriptionCache:
+    """文字起こし結果キャッシュ"""
+
+    def __init__(self, redis_url: Optional[str] = None):
+        self.enabled = settings.cache_enabled
+        self._redis = redis.Redis.from_url(redis_url or settings.redis_url)
+
+    @staticmethod
+    def transcript_key(content_hash: str, model_id: str) -> str:
+        """
+        アップロード全体のキャッシュキー（結果に影響する処理条件を含む）
+
+        Args:
+            content_hash: アップロードファイルのSHA-256
+            model_id: 文字起こしエンジンのモデル識別子
+
+        Returns:
+            str: キャッシュキー
+        """
+        options = {
+            'model': model_id,
+            'codec': settings.segment_codec,
+            'bitrate': settings.segment_bitrate,
+            'target_bytes': settings.segment_target_bytes,
+            'max_duration': settings.max_audio_duration,
+            'on_silence': settings.segment_on_silence,
+            'overlap': settings.segment_overlap,
+            'trim_silence': settings.trim_silence,
+            'trim_min_silence': settings.trim_min_silence,
+            'trim_padding': settings.trim_padding,
+            'timestamps': 'segment',
+        }
+        encoded = json.dumps(options, sort_keys=True).encode('utf-8')
+        return f"transcript:{content_hash}:{hashlib.sha256(encoded).hexdigest()[:16]}"
+
+    @staticmethod
+    def segment_key(segment_hash: str, model_id: str) -> str:
+        """
+        セグメント単位のキャッシュキー
+
+        Args:
+            segment_hash: エンコード済みセグメントのSHA-256（bitexact で出力するため入力が同じなら一致）
+            model_id: 文字起こしエンジンのモデル識別子
+
+        Returns:
+            str: キャッシュキー
+        """
+        return f"segment:{segment_hash}:{model_id}:timed"
+
+    def _count(self, key: str) -> None:
+        """ヒット/ミス数を加算（Redisが使えない場合は無視）"""
+        try:
+            self._redis.incr(key)
+        except redis.RedisError as e:
+            celery_logger.warning(f"Cache counter update failed: {e}")
+
+    def get(self, session: Session, key: str) -> Optional[TranscriptionCacheEntry]:
+        """
+        キャッシュを取得
+
+        Args:
+            session: データベースセッション
+            key: キャッシュキー
+
+        Returns:
+            Optional[TranscriptionCacheEntry]: キャッシュエントリ（期限切れ・未登録はNone）
+        """
+        if not self.enabled:
+            return None
+
+        entry = session.get(TranscriptionCacheEntry, key)
+        expires_before = datetime.now() - timedelta(days=settings.cache_max_age_days)
+        if entry is None or entry.created_at < expires_before:
+            self._count(MISSES_KEY)
+            return None
+
+        entry.hit_count += 1
+        entry.last_accessed_at = datetime.now()
+        session.add(entry)
+        session.commit()
+        self._count(HITS_KEY)
+        return entry
+
+    def put(
+        self,
+        session: Session,
+        key: str,
+        text: str,
+        duration: Optional[float] = None,
+        segments_json: Optional[str] = None
+    ) -> None:
+        """
+        キャッシュを保存し、上限を超えた分を削除
+
+        Args:
+            session: データベースセッション
+            key: キャッシュキー
+            text: 文字起こし結果
+            duration: 音声の長さ（秒）
+            segments_json: タイムスタンプ付きセグメント（JSON）
+        """
+        if not self.enabled:
+            return
+
+        entry = session.get(TranscriptionCacheEntry, key) or TranscriptionCacheEntry(
+            key=key, transcription_text=text
+        )
+        entry.transcription_text = text
+        entry.segments_json = segments_json
+        entry.duration = duration
+        entry.size = len(text.encode('utf-8')) + len((segments_json or '').encode('utf-8'))
+        entry.created_at = datetime.now()
+        entry.last_accessed_at = entry.created_at
+        session.add(entry)
+        session.commit()
+
+        self.evict(session)
+
+    def evict(self, session: Session) -> int:
+        """
+        期限切れのエントリを削除し、合計サイズが上限を超えていれば
+        最終アクセスが古い順に削除
+
+        Args:
+            session: データベースセッション
+
+        Returns:
+            int: 削除したエントリ数
+        """
+        removed = 0
+        expires_before = datetime.now() - timedelta(days=settings.cache_max_age_days)
+        for entry in session.exec(
+            select(TranscriptionCacheEntry)
+            .where(TranscriptionCacheEntry.created_at < expires_before)
+        ):
+            session.delete(entry)
+            removed += 1
+
+        total_size = session.exec(
+            select(func.coalesce(func.sum(TranscriptionCacheEntry.size), 0))
+            .where(TranscriptionCacheEntry.created_at >= expires_before)
+        ).one()
+
+        if total_size > settings.cache_max_bytes:
+            lru_entries = session.exec(
+                select(TranscriptionCacheEntry)
+                .where(TranscriptionCacheEntry.created_at >= expires_before)
+                .order_by(TranscriptionCacheEntry.last_accessed_at)
+            )
+            for entry in lru_entries:
+                if total_size <= settings.cache_max_bytes:
+                    break
+                total_size -= entry.size
+                session.delete(entry)
+                removed += 1
+
+        if removed:
+            session.commit()
+        return removed
+
+    def stats(self, session: Session) -> dict:
+        """
+        キャッシュの統計情報
+
+        Args:
+            session: データベースセッション
+
+        Returns:
+            dict: ヒット/ミス数、エントリ数、合計サイズ
+        """
+        try:
+            hits, misses = self._redis.mget(HITS_KEY, MISSES_KEY)
+        except redis.RedisError:
+            hits, misses = None, None
+
+        entries, total_size = session.exec(
+            select(
+                func.count(TranscriptionCacheEntry.key),
+                func.coalesce(func.sum(TranscriptionCacheEntry.size), 0)
+            )
+        ).one()
+
+        return {
+            'enabled': self.enabled,
+            'hits': int(hits or 0),
+            'misses': int(misses or 0),
+            'entries': entries,
+            'size': total_size,
+            'max_bytes': settings.cache_max_bytes,
+            'max_age_days': settings.cache_max_age_days,
+        }
+
+
+# プロセス共通のキャッシュインスタンス
+transcription_cache = TranscriptionCache()
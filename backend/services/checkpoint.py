@@ -0,0 +1,139 @@
+"""
+ジョブのチェックポイント - セグメント単位の途中結果を保存し、再実行時に完了済みを省略
+"""
+import os
+import shutil
+import time
+from typing import Dict, List
+
+from sqlmodel import Session, select, delete, func
+
+from config import settings
+from models import SegmentCheckpoint
+from services.audio import AudioSegment
+from services.transcription import SegmentResult
+from utils.logger import celery_logger
+
+
+# 分割位置の比較に使う許容誤差（秒）
+BOUNDARY_TOLERANCE = 0.001
+
+
+def job_work_dir(task_id: str) -> str:
+    """タスクの作業ディレクトリ（分割済みセグメントを再実行まで残す）"""
+    return os.path.join(settings.checkpoint_dir, task_id)
+
+
+def load_checkpoints(
+    session: Session,
+    task_id: str,
+    segments: List[AudioSegment]
+) -> Dict[int, SegmentResult]:
+    """
+    完了済みセグメントの結果を取得
+
+    分割位置が前回と異なるセグメント（処理条件が変わった場合など）は使わない。
+
+    Args:
+        session: データベースセッション
+        task_id: タスクID
+        segments: 今回の分割結果
+
+    Returns:
+        Dict[int, SegmentResult]: セグメント番号ごとの結果
+    """
+    by_index = {segment.index: segment for segment in segments}
+    results = {}
+    for checkpoint in session.exec(
+        select(SegmentCheckpoint).where(SegmentCheckpoint.task_id == task_id)
+    ):
+        segment = by_index.get(checkpoint.segment_index)
+        if segment is None:
+            continue
+        if (abs(segment.start - checkpoint.start) > BOUNDARY_TOLERANCE
+                or abs(segment.end - checkpoint.end) > BOUNDARY_TOLERANCE):
+            continue
+        results[segment.index] = SegmentResult.from_json(
+            checkpoint.transcription_text, checkpoint.segments_json
+        )
+    return results
+
+
+def save_checkpoint(
+    session: Session,
+    task_id: str,
+    segment: AudioSegment,
+    result: SegmentResult
+) -> None:
+    """
+    セグメントの結果を保存（同じセグメントの再保存は上書き）
+
+    Args:
+        session: データベースセッション
+        task_id: タスクID
+        segment: 文字起こししたセグメント
+        result: 文字起こし結果
+    """
+    checkpoint = session.get(SegmentCheckpoint, (task_id, segment.index)) or SegmentCheckpoint(
+        task_id=task_id, segment_index=segment.index, start=segment.start,
+        end=segment.end, transcription_text=result.text
+    )
+    checkpoint.start = segment.start
+    checkpoint.end = segment.end
+    checkpoint.transcription_text = result.text
+    checkpoint.segments_json = result.to_json()
+    session.add(checkpoint)
+    session.commit()
+
+
+def clear_checkpoints(session: Session, task_id: str) -> None:
+    """
+    タスクのチェックポイントと作業ディレクトリを削除
+
+    Args:
+        session: データベースセッション
+        task_id: タスクID
+    """
+    session.exec(delete(SegmentCheckpoint).where(SegmentCheckpoint.task_id == task_id))
+    session.commit()
+    shutil.rmtree(job_work_dir(task_id), ignore_errors=True)
+
+
+def remove_stale_work_dirs() -> int:
+    """
+    一定時間更新のない作業ディレクトリ（再実行されなかったジョブ）を削除
+
+    Returns:
+        int: 削除したディレクトリ数
+    """
+    if not os.path.isdir(settings.checkpoint_dir):
+        return 0
+
+    removed = 0
+    expires_before = time.time() - settings.checkpoint_max_age_hours * 3600
+    for name in os.listdir(settings.checkpoint_dir):
+        path = os.path.join(settings.checkpoint_dir, name)
+        try:
+            if os.path.isdir(path) and os.path.getmtime(path) < expires_before:
+                shutil.rmtree(path)
+                removed += 1
+        except OSError as e:
+            celery_logger.warning(f"Work directory cleanup failed: path={path} error={e}")
+    return removed
+
+
+def count_checkpoints(session: Session, task_id: str) -> int:
+    """
+    完了済みセグメント数
+
+    Args:
+        session: データベースセッション
+        task_id: タスクID
+
+    Returns:
+        int: 保存済みのセグメント数
+    """
+    return session.exec(
+        select(func.count()).select_from(SegmentCheckpoint)
+        .where(SegmentCheckpoint.task_id == task_id)
+    ).one()
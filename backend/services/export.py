@@ -0,0 +1,375 @@
+"""
+文字起こし結果のエクスポート - DBからのストリーミングダウンロードと字幕形式への変換
+"""
+import json
+import zlib
+from datetime import datetime
+from typing import AsyncIterator, List, Optional, Tuple
+from urllib.parse import quote
+
+from fastapi.concurrency import run_in_threadpool
+from sqlalchemy import LargeBinary, cast
+from sqlmodel import select, func
+
+from config import settings
+from database import get_async_db_session
+from models import TranscriptionRecord, TranscriptSegment
+from utils.exceptions import RangeNotSatisfiableError
+
+try:
+    import brotli
+except ImportError:  # brotli は任意の依存関係
+    brotli = None
+
+
+# 字幕形式ごとの (Content-Type, 拡張子)
+SUBTITLE_FORMATS = {
+    'srt': ('application/x-subrip; charset=utf-8', '.srt'),
+    'vtt': ('text/vtt; charset=utf-8', '.vtt'),
+    'json': ('application/json', '.json'),
+}
+
+
+def transcript_etag(
+    record_id: int,
+    completed_at: Optional[datetime],
+    length: int,
+    encoding: Optional[str] = None
+) -> str:
+    """
+    文字起こし結果のETag（完了時刻とバイト数から作成し、本文を読まずに判定できる）
+
+    Args:
+        record_id: レコードID
+        completed_at: 完了時刻
+        length: UTF-8 のバイト数
+        encoding: Content-Encoding（圧縮形式ごとに別の表現として扱う）
+
+    Returns:
+        str: ETag ヘッダー値
+    """
+    version = int(completed_at.timestamp() * 1000) if completed_at else 0
+    tag = f"{record_id}-{version}-{length}"
+    if encoding:
+        tag = f"{tag}-{encoding}"
+    return f'"{tag}"'
+
+
+def etag_matches(if_none_match: Optional[str], etag: str) -> bool:
+    """
+    If-None-Match ヘッダーがETagに一致するか（弱い比較）
+
+    Args:
+        if_none_match: If-None-Match ヘッダー値
+        etag: 現在のETag
+
+    Returns:
+        bool: 一致すればTrue
+    """
+    if not if_none_match:
+        return False
+    if if_none_match.strip() == '*':
+        return True
+    candidates = [tag.strip() for tag in if_none_match.split(',')]
+    return any(tag.removeprefix('W/') == etag for tag in candidates)
+
+
+def parse_range(range_header: Optional[str], size: int) -> Optional[Tuple[int, int]]:
+    """
+    Range ヘッダー（単一のバイト範囲のみ対応）を解析
+
+    Args:
+        range_header: Range ヘッダー値
+        size: 全体のバイト数
+
+    Returns:
+        Optional[Tuple[int, int]]: (開始, 終了) の両端を含むバイト位置。
+        ヘッダーがない・解釈できない場合はNone（全体を返す）
+
+    Raises:
+        RangeNotSatisfiableError: 範囲が全体の外にある場合
+    """
+    if not range_header or not range_header.startswith('bytes='):
+        return None
+    spec = range_header[len('bytes='):].strip()
+    if ',' in spec or '-' not in spec:
+        return None
+
+    first, last = (part.strip() for part in spec.split('-', 1))
+    try:
+        if not first:
+            # 末尾からのバイト数指定（bytes=-500）
+            suffix = int(last)
+            if suffix <= 0 or size == 0:
+                raise RangeNotSatisfiableError()
+            return max(0, size - suffix), size - 1
+        start = int(first)
+        end = int(last) if last else size - 1
+    except ValueError:
+        return None
+
+    if start >= size or end < start:
+        raise RangeNotSatisfiableError()
+    return start, min(end, size - 1)
+
+
+def negotiate_encoding(accept_encoding: Optional[str]) -> Optional[str]:
+    """
+    Accept-Encoding から圧縮形式を選択（br > gzip、brotli未導入時はgzipのみ）
+
+    Args:
+        accept_encoding: Accept-Encoding ヘッダー値
+
+    Returns:
+        Optional[str]: "br" / "gzip"、圧縮しない場合はNone
+    """
+    if not accept_encoding or not settings.download_compression:
+        return None
+
+    accepted = {}
+    for item in accept_encoding.split(','):
+        name, _, params = item.strip().partition(';')
+        quality = 1.0
+        params = params.strip()
+        if params.startswith('q='):
+            try:
+                quality = float(params[2:])
+            except ValueError:
+                quality = 0.0
+        accepted[name.strip().lower()] = quality
+
+    for encoding in ('br', 'gzip'):
+        if encoding == 'br' and brotli is None:
+            continue
+        if accepted.get(encoding, accepted.get('*', 0.0)) > 0:
+            return encoding
+    return None
+
+
+def content_disposition(filename: str) -> str:
+    """日本語ファイル名にも対応した Content-Disposition ヘッダー値"""
+    ascii_name = filename.encode('ascii', errors='replace').decode('ascii').replace('"', '')
+    return f"attachment; filename=\"{ascii_name}\"; filename*=UTF-8''{quote(filename)}"
+
+
+class StreamCompressor:
+    """ストリーミング圧縮（gzip / br、None の場合は無圧縮）"""
+
+    def __init__(self, encoding: Optional[str]):
+        self.encoding = encoding
+        if encoding == 'gzip':
+            self._compressor = zlib.compressobj(6, zlib.DEFLATED, 16 + zlib.MAX_WBITS)
+        elif encoding == 'br':
+            self._compressor = brotli.Compressor(quality=5)
+        else:
+            self._compressor = None
+
+    def compress(self, data: bytes) -> bytes:
+        if self._compressor is None:
+            return data
+        if self.encoding == 'br':
+            return self._compressor.process(data)
+        return self._compressor.compress(data)
+
+    def flush(self) -> bytes:
+        if self._compressor is None:
+            return b''
+        if self.encoding == 'br':
+            return self._compressor.finish()
+        return self._compressor.flush()
+
+
+def transcript_bytes(dialect: str):
+    """
+    本文を UTF-8 のバイト列として扱うSQL式（length/substr がバイト単位になる）
+
+    Args:
+        dialect: DBの方言名
+
+    Returns:
+        SQL式
+    """
+    if dialect == 'postgresql':
+        return func.convert_to(TranscriptionRecord.transcription_text, 'UTF8')
+    return cast(TranscriptionRecord.transcription_text, LargeBinary)
+
+
+async def load_transcript_info(record_id: int):
+    """
+    本文は読まずにダウンロード用のメタデータとバイト数を取得
+
+    Args:
+        record_id: レコードID
+
+    Returns:
+        original_filename, status, completed_at, size（UTF-8 のバイト数）の行。
+        レコードがなければNone
+    """
+    async with get_async_db_session() as session:
+        result = await session.exec(
+            select(
+                TranscriptionRecord.original_filename,
+                TranscriptionRecord.status,
+                TranscriptionRecord.completed_at,
+                func.length(transcript_bytes(session.bind.dialect.name)).label('size')
+            )
+            .where(TranscriptionRecord.id == record_id)
+        )
+        return result.first()
+
+
+async def load_transcript_range(record_id: int, start: int, end: int) -> bytes:
+    """
+    本文の指定バイト範囲だけをDBから取得（Range リクエスト用）
+
+    Args:
+        record_id: レコードID
+        start: 開始バイト位置
+        end: 終了バイト位置（この位置を含む）
+
+    Returns:
+        bytes: 範囲のバイト列
+    """
+    async with get_async_db_session() as session:
+        data = transcript_bytes(session.bind.dialect.name)
+        result = await session.exec(
+            select(func.substr(data, start + 1, end - start + 1))
+            .where(TranscriptionRecord.id == record_id)
+        )
+        return bytes(result.first() or b"")
+
+
+async def iter_transcript(record_id: int, encoding: Optional[str] = None) -> AsyncIterator[bytes]:
+    """
+    文字起こし結果を一定文字数ずつ（圧縮して）ストリーミング
+
+    本文は1回のクエリで取得し（チャンクごとの substr() はオフセットの走査が毎回先頭から
+    になるため使わない）、エンコードと圧縮はチャンクごとにスレッドプールで行う。
+    そのため応答中は本文全体（str）をメモリに保持する（エンコード・圧縮後のデータは
+    チャンク単位）。本文の長さに依存しないメモリで読む必要がある場合は Range リクエスト
+    （load_transcript_range、指定範囲のみ取得）を使う。
+
+    Args:
+        record_id: レコードID
+        encoding: Content-Encoding
+
+    Yields:
+        bytes: レスポンスボディのチャンク
+    """
+    chunk_chars = settings.download_chunk_chars
+    compressor = StreamCompressor(encoding)
+
+    async with get_async_db_session() as session:
+        result = await session.exec(
+            select(TranscriptionRecord.transcription_text)
+            .where(TranscriptionRecord.id == record_id)
+        )
+        text = result.first() or ""
+
+    for offset in range(0, len(text), chunk_chars):
+        chunk = await run_in_threadpool(
+            compressor.compress, text[offset:offset + chunk_chars].encode('utf-8')
+        )
+        if chunk:
+            yield chunk
+
+    tail = compressor.flush()
+    if tail:
+        yield tail
+
+
+def format_timestamp(ms: int, decimal_separator: str = '.') -> str:
+    """
+    ミリ秒を HH:MM:SS.mmm 形式に変換
+
+    Args:
+        ms: ミリ秒
+        decimal_separator: 秒とミリ秒の区切り（SRTは","、VTTは"."）
+
+    Returns:
+        str: タイムスタンプ
+    """
+    ms = max(0, ms)
+    hours, ms = divmod(ms, 3600 * 1000)
+    minutes, ms = divmod(ms, 60 * 1000)
+    seconds, ms = divmod(ms, 1000)
+    return f"{hours:02d}:{minutes:02d}:{seconds:02d}{decimal_separator}{ms:03d}"
+
+
+def format_srt(segments: List[TranscriptSegment]) -> str:
+    """セグメントをSRT形式に変換"""
+    blocks = [
+        f"{number}\n"
+        f"{format_timestamp(segment.start_ms, ',')} --> {format_timestamp(segment.end_ms, ',')}\n"
+        f"{segment.text}\n"
+        for number, segment in enumerate(segments, start=1)
+    ]
+    return "\n".join(blocks)
+
+
+def format_vtt(segments: List[TranscriptSegment]) -> str:
+    """セグメントをWebVTT形式に変換"""
+    blocks = [
+        f"{format_timestamp(segment.start_ms)} --> {format_timestamp(segment.end_ms)}\n"
+        f"{segment.text}\n"
+        for segment in segments
+    ]
+    return "\n".join(["WEBVTT\n", *blocks])
+
+
+def format_segments_json(segments: List[TranscriptSegment]) -> str:
+    """セグメントをJSON形式に変換（時刻は秒）"""
+    return json.dumps(
+        [
+            {'start': segment.start_ms / 1000, 'end': segment.end_ms / 1000, 'text': segment.text}
+            for segment in segments
+        ],
+        ensure_ascii=False
+    )
+
+
+def format_subtitles(segments: List[TranscriptSegment], fmt: str) -> str:
+    """
+    セグメントを指定の形式に変換
+
+    Args:
+        segments: 開始時刻順のセグメント
+        fmt: "srt" / "vtt" / "json"
+
+    Returns:
+        str: 変換結果
+    """
+    if fmt == 'srt':
+        return format_srt(segments)
+    if fmt == 'vtt':
+        return format_vtt(segments)
+    return format_segments_json(segments)
+
+
+async def load_segments(
+    record_id: int,
+    start: Optional[float] = None,
+    end: Optional[float] = None
+) -> List[TranscriptSegment]:
+    """
+    タイムスタンプ付きセグメントを取得（指定した時間範囲に重なるもののみ）
+
+    Args:
+        record_id: レコードID
+        start: 範囲の開始（秒）
+        end: 範囲の終了（秒）
+
+    Returns:
+        List[TranscriptSegment]: 開始時刻順のセグメント
+    """
+    query = select(TranscriptSegment).where(TranscriptSegment.record_id == record_id)
+    if start is not None:
+        query = query.where(TranscriptSegment.end_ms > int(start * 1000))
+    if end is not None:
+        query = query.where(TranscriptSegment.start_ms < int(end * 1000))
+
+    async with get_async_db_session() as session:
+        result = await session.exec(
+            query.order_by(TranscriptSegment.start_ms, TranscriptSegment.seq)
+        )
+        return list(result.all())
@@ -0,0 +1,177 @@
+"""
+メトリクス - ジョブの処理段階ごとの所要時間とAPIレイテンシを Prometheus 形式で収集
+
+gunicorn や Celery の prefork のように複数プロセスで動かす場合は、環境変数
+PROMETHEUS_MULTIPROC_DIR にプロセス間で共有するディレクトリを指定する。
+"""
+import glob
+import os
+import time
+from contextlib import contextmanager
+from contextvars import ContextVar
+from functools import wraps
+from typing import Optional
+
+from prometheus_client import (
+    CONTENT_TYPE_LATEST, REGISTRY, CollectorRegistry, Counter, Histogram,
+    generate_latest, multiprocess, start_http_server
+)
+
+from utils.logger import celery_logger
+
+
+MULTIPROC_DIR = os.getenv('PROMETHEUS_MULTIPROC_DIR')
+if MULTIPROC_DIR:
+    os.makedirs(MULTIPROC_DIR, exist_ok=True)
+
+# 数ms のDB更新から数十分の長時間ジョブまで
+STAGE_BUCKETS = (
+    0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60, 120, 300, 600, 1800, 3600
+)
+HTTP_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60)
+
+STAGE_SECONDS = Histogram(
+    'transcribe_stage_duration_seconds',
+    'Time spent in each stage of a transcription job',
+    ['stage'],
+    buckets=STAGE_BUCKETS
+)
+QUEUE_WAIT_SECONDS = Histogram(
+    'transcribe_queue_wait_seconds',
+    'Time between enqueueing a task and a worker starting it',
+    ['queue'],
+    buckets=STAGE_BUCKETS
+)
+API_CALL_SECONDS = Histogram(
+    'transcribe_api_call_duration_seconds',
+    'Latency of a single transcription request to the engine',
+    ['backend', 'outcome'],
+    buckets=STAGE_BUCKETS
+)
+JOBS_TOTAL = Counter(
+    'transcribe_jobs_total',
+    'Finished transcription jobs',
+    ['status']
+)
+HTTP_REQUEST_SECONDS = Histogram(
+    'transcribe_http_request_duration_seconds',
+    'API request latency until the response starts',
+    ['method', 'route', 'status'],
+    buckets=HTTP_BUCKETS
+)
+
+# スパンのログに付けるタスクID（タスク内のスレッドには contextvars.copy_context で引き継ぐ）
+current_task_id: ContextVar[Optional[str]] = ContextVar('current_task_id', default=None)
+
+
+@contextmanager
+def stage_timer(stage: str):
+    """
+    処理段階の所要時間をヒストグラムに記録し、スパンとしてログに出力
+
+    Args:
+        stage: 段階名（ffmpeg_convert, transcribe_segment, db_commit など）
+    """
+    started = time.perf_counter()
+    outcome = 'ok'
+    try:
+        yield
+    except BaseException:
+        outcome = 'error'
+        raise
+    finally:
+        elapsed = time.perf_counter() - started
+        STAGE_SECONDS.labels(stage=stage).observe(elapsed)
+        celery_logger.info(
+            f"Span: stage={stage} task_id={current_task_id.get()} "
+            f"elapsed={elapsed:.3f}s outcome={outcome}"
+        )
+
+
+def timed_stage(stage: str):
+    """メソッド全体を stage_timer で計測するデコレーター"""
+    def decorator(func):
+        @wraps(func)
+        def wrapper(*args, **kwargs):
+            with stage_timer(stage):
+                return func(*args, **kwargs)
+        return wrapper
+    return decorator
+
+
+@contextmanager
+def api_call_timer(backend: str):
+    """
+    文字起こしリクエスト1回のレイテンシを記録（失敗時は例外クラス名を outcome とする）
+
+    Args:
+        backend: 文字起こしエンジン名
+    """
+    started = time.perf_counter()
+    outcome = 'ok'
+    try:
+        yield
+    except Exception as e:
+        outcome = type(e).__name__
+        raise
+    finally:
+        API_CALL_SECONDS.labels(backend=backend, outcome=outcome)\
+            .observe(time.perf_counter() - started)
+
+
+def observe_queue_wait(queue: Optional[str], enqueued_at: Optional[float]) -> None:
+    """
+    キュー投入からワーカーが受け取るまでの待ち時間を記録
+
+    Args:
+        queue: キュー名
+        enqueued_at: 投入時刻（time.time()、ワーカー間で比較するため壁時計）
+    """
+    if enqueued_at is None:
+        return
+    wait = max(0.0, time.time() - enqueued_at)
+    QUEUE_WAIT_SECONDS.labels(queue=queue or 'unknown').observe(wait)
+    celery_logger.info(
+        f"Span: stage=queue_wait task_id={current_task_id.get()} queue={queue} elapsed={wait:.3f}s"
+    )
+
+
+def metrics_registry() -> CollectorRegistry:
+    """公開するレジストリ（マルチプロセス時は全プロセスの値を集計）"""
+    if not MULTIPROC_DIR:
+        return REGISTRY
+    registry = CollectorRegistry()
+    multiprocess.MultiProcessCollector(registry)
+    return registry
+
+
+def render_metrics() -> tuple:
+    """
+    /metrics のレスポンス本文
+
+    Returns:
+        tuple: (本文, Content-Type)
+    """
+    return generate_latest(metrics_registry()), CONTENT_TYPE_LATEST
+
+
+def start_metrics_server(port: int) -> None:
+    """
+    Celery ワーカーのメトリクスを公開するHTTPサーバーを起動（fork前の親プロセスで呼ぶ）
+
+    前回の起動時に残ったプロセスごとの値は集計に混ざらないよう削除する。
+
+    Args:
+        port: 待ち受けポート
+    """
+    if MULTIPROC_DIR:
+        for path in glob.glob(os.path.join(MULTIPROC_DIR, '*.db')):
+            os.remove(path)
+    start_http_server(port, registry=metrics_registry())
+    celery_logger.info(f"Metrics server started: port={port} multiprocess={bool(MULTIPROC_DIR)}")
+
+
+def mark_process_dead(pid: int) -> None:
+    """終了した子プロセスの値を集計対象から外す（マルチプロセス時のみ）"""
+    if MULTIPROC_DIR:
+        multiprocess.mark_process_dead(pid)
@@ -0,0 +1,128 @@
+"""
+OpenAI クライアント管理 - プロセスごとに1つのクライアントと接続プールを共有
+"""
+import os
+import threading
+from importlib.util import find_spec
+from typing import Optional
+
+import httpx
+from openai import OpenAI
+
+from config import settings
+from utils.logger import celery_logger
+
+
+class ConnectionStats:
+    """HTTP接続の再利用状況（新規接続数とリクエスト数）"""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.requests = 0
+        self.new_connections = 0
+
+    def record_request(self) -> None:
+        with self._lock:
+            self.requests += 1
+
+    def record_connection(self) -> None:
+        with self._lock:
+            self.new_connections += 1
+
+    def reset(self) -> None:
+        with self._lock:
+            self.requests = 0
+            self.new_connections = 0
+
+    def snapshot(self) -> dict:
+        """リクエスト数、新規接続数、既存接続を再利用した割合"""
+        with self._lock:
+            requests, connections = self.requests, self.new_connections
+        reused = max(0, requests - connections)
+        return {
+            'requests': requests,
+            'new_connections': connections,
+            'reused': reused,
+            'reuse_ratio': reused / requests if requests else 0.0,
+        }
+
+
+class TracedTransport(httpx.HTTPTransport):
+    """httpcore の trace 拡張で新規接続を数えるトランスポート"""
+
+    def __init__(self, stats: ConnectionStats, **kwargs):
+        super().__init__(**kwargs)
+        self._stats = stats
+
+    def _trace(self, event_name: str, info: dict) -> None:
+        if event_name == "connection.connect_tcp.complete":
+            self._stats.record_connection()
+
+    def handle_request(self, request: httpx.Request) -> httpx.Response:
+        self._stats.record_request()
+        request.extensions["trace"] = self._trace
+        return super().handle_request(request)
+
+
+# プロセス共通の接続統計
+connection_stats = ConnectionStats()
+
+_client: Optional[OpenAI] = None
+_client_key: Optional[str] = None
+_client_pid: Optional[int] = None
+_client_lock = threading.Lock()
+
+
+def build_http_client() -> httpx.Client:
+    """
+    keep-alive 接続プール付きの HTTP クライアントを作成
+
+    h2 パッケージがあれば HTTP/2 で1接続に多重化する。
+    """
+    http2 = settings.openai_http2 and find_spec("h2") is not None
+    limits = httpx.Limits(
+        max_connections=settings.openai_max_connections,
+        max_keepalive_connections=settings.openai_max_connections,
+        keepalive_expiry=settings.openai_keepalive_expiry
+    )
+    return httpx.Client(
+        transport=TracedTransport(connection_stats, http2=http2, limits=limits),
+        timeout=httpx.Timeout(settings.openai_timeout, connect=10.0)
+    )
+
+
+def get_openai_client(api_key: Optional[str] = None) -> OpenAI:
+    """
+    プロセス共通の OpenAI クライアントを取得（初回のみ作成）
+
+    fork 後の子プロセスでは親の接続を使わないよう作り直す。
+
+    Args:
+        api_key: APIキー（省略時は環境変数 OPENAI_API_KEY）
+
+    Returns:
+        OpenAI: OpenAI クライアント
+    """
+    global _client, _client_key, _client_pid
+    api_key = api_key or os.getenv('OPENAI_API_KEY')
+    if not api_key:
+        raise ValueError("OPENAI_API_KEY environment variable is not set")
+
+    with _client_lock:
+        if _client is None or _client_key != api_key or _client_pid != os.getpid():
+            # リトライは呼び出し側で共通のレート制限と合わせて行う
+            _client = OpenAI(api_key=api_key, max_retries=0, http_client=build_http_client())
+            _client_key = api_key
+            _client_pid = os.getpid()
+        return _client
+
+
+def init_openai_client() -> None:
+    """ワーカープロセス起動時にクライアントを作成（キー未設定の場合は初回使用時に再試行）"""
+    global _client
+    _client = None
+    connection_stats.reset()
+    try:
+        get_openai_client()
+    except ValueError as e:
+        celery_logger.warning(f"OpenAI client not initialised: {e}")
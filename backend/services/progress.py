@@ -0,0 +1,115 @@
+"""
+進捗通知サービス - Redis pub/sub でタスクの進捗をクライアントへプッシュ
+"""
+import json
+from typing import AsyncIterator, Awaitable, Callable, Optional
+
+import redis
+import redis.asyncio as aioredis
+
+from config import settings
+from utils.logger import celery_logger
+
+
+CHANNEL_PREFIX = "transcribe:progress:"
+LAST_EVENT_PREFIX = "transcribe:progress:last:"
+LAST_EVENT_TTL = 60 * 60  # 1時間
+
+# 完了/失敗のイベントでストリームを終了する
+FINAL_STATUSES = {"completed", "failed"}
+
+_redis_client: Optional[redis.Redis] = None
+
+
+def progress_channel(task_id: str) -> str:
+    """タスクの進捗チャンネル名"""
+    return f"{CHANNEL_PREFIX}{task_id}"
+
+
+def _get_redis() -> redis.Redis:
+    """プロセス共通のRedisクライアント"""
+    global _redis_client
+    if _redis_client is None:
+        _redis_client = redis.Redis.from_url(settings.redis_url)
+    return _redis_client
+
+
+def publish_progress(task_id: str, event: dict) -> None:
+    """
+    進捗イベントを配信（最新のイベントは途中から購読したクライアント用に保持）
+
+    Args:
+        task_id: タスクID
+        event: イベント内容（status は必須）
+    """
+    payload = json.dumps({"task_id": task_id, **event}, default=str)
+    try:
+        client = _get_redis()
+        client.setex(f"{LAST_EVENT_PREFIX}{task_id}", LAST_EVENT_TTL, payload)
+        client.publish(progress_channel(task_id), payload)
+    except redis.RedisError as e:
+        # 通知の失敗で文字起こし自体を失敗させない
+        celery_logger.warning(f"Progress publish failed: task_id={task_id} error={e}")
+
+
+def format_sse(event: dict, event_type: str = "progress") -> str:
+    """
+    Server-Sent Events の形式に変換
+
+    Args:
+        event: イベント内容
+        event_type: イベント種別
+
+    Returns:
+        str: SSEメッセージ
+    """
+    return f"event: {event_type}\ndata: {json.dumps(event, default=str)}\n\n"
+
+
+async def stream_progress(
+    task_id: str,
+    snapshot: Callable[[], Awaitable[dict]],
+    is_disconnected: Callable[[], Awaitable[bool]]
+) -> AsyncIterator[str]:
+    """
+    タスクの進捗をSSEとして配信するジェネレーター
+
+    購読を開始してから現在の状態を取得するため、その間のイベントを取りこぼさない。
+
+    Args:
+        task_id: タスクID
+        snapshot: 現在の状態を返す関数（購読開始時に1回だけ呼ぶ）
+        is_disconnected: クライアント切断を判定する関数
+
+    Yields:
+        str: SSEメッセージ
+    """
+    client = aioredis.Redis.from_url(settings.redis_url)
+    pubsub = client.pubsub()
+    await pubsub.subscribe(progress_channel(task_id))
+
+    try:
+        last_event = await client.get(f"{LAST_EVENT_PREFIX}{task_id}")
+        current = json.loads(last_event) if last_event else await snapshot()
+        yield format_sse(current)
+        if current.get("status") in FINAL_STATUSES:
+            return
+
+        while not await is_disconnected():
+            message = await pubsub.get_message(
+                ignore_subscribe_messages=True,
+                timeout=settings.sse_keepalive_seconds
+            )
+            if message is None:
+                # プロキシによる切断を防ぐためのコメント行
+                yield ": keepalive\n\n"
+                continue
+
+            event = json.loads(message["data"])
+            yield format_sse(event)
+            if event.get("status") in FINAL_STATUSES:
+                break
+    finally:
+        await pubsub.unsubscribe(progress_channel(task_id))
+        await pubsub.close()
+        await client.close()
@@ -0,0 +1,207 @@
+"""
+APIレート制限 - Redis のトークンバケットで全ワーカー共通の送信ペースを制御
+"""
+import random
+import time
+from typing import Optional
+
+import redis
+
+from config import settings
+from utils.logger import celery_logger
+
+
+BUCKET_PREFIX = "transcribe:ratelimit:"
+# 429 を受けた後に全ワーカーで送信を止める期限
+PAUSE_KEY = "transcribe:ratelimit:paused_until"
+
+# 複数バケットをまとめて確認し、全て足りる場合のみ消費する。
+# KEYS: PAUSE_KEY, バケット1, バケット2, ...
+# ARGV: バケットごとに (容量, 毎秒の補充量, 要求量)
+# 戻り値: 待つべき秒数（文字列、0 なら取得成功）
+TOKEN_BUCKET_SCRIPT = """
+local now_parts = redis.call('TIME')
+local now = tonumber(now_parts[1]) + tonumber(now_parts[2]) / 1000000
+
+local paused_until = tonumber(redis.call('GET', KEYS[1]) or '0')
+if paused_until > now then
+    return tostring(paused_until - now)
+end
+
+local wait = 0
+local states = {}
+for i = 2, #KEYS do
+    local base = (i - 2) * 3
+    local capacity = tonumber(ARGV[base + 1])
+    local rate = tonumber(ARGV[base + 2])
+    local requested = math.min(tonumber(ARGV[base + 3]), capacity)
+    local state = redis.call('HMGET', KEYS[i], 'tokens', 'updated')
+    local tokens = tonumber(state[1]) or capacity
+    local updated = tonumber(state[2]) or now
+    tokens = math.min(capacity, tokens + math.max(0, now - updated) * rate)
+    if tokens < requested then
+        wait = math.max(wait, (requested - tokens) / rate)
+    end
+    states[i] = {tokens, requested, capacity / rate}
+end
+
+if wait > 0 then
+    return tostring(wait)
+end
+
+for i = 2, #KEYS do
+    local tokens, requested, ttl = unpack(states[i])
+    redis.call('HSET', KEYS[i], 'tokens', tokens - requested, 'updated', now)
+    redis.call('EXPIRE', KEYS[i], math.ceil(ttl) + 60)
+end
+return '0'
+"""
+
+
+class RateLimiter:
+    """
+    全ワーカー共通のレート制限（リクエスト数/分、音声秒数/分）
+
+    Redis が使えない場合は制限せずに送信する（リトライで吸収する）。
+    """
+
+    def __init__(
+        self,
+        name: str,
+        requests_per_minute: Optional[int] = None,
+        audio_seconds_per_minute: Optional[float] = None,
+        redis_url: Optional[str] = None
+    ):
+        self.name = name
+        self.requests_per_minute = requests_per_minute
+        self.audio_seconds_per_minute = audio_seconds_per_minute
+        self._redis = redis.Redis.from_url(redis_url or settings.redis_url)
+        self._script = self._redis.register_script(TOKEN_BUCKET_SCRIPT)
+
+    @property
+    def enabled(self) -> bool:
+        return bool(self.requests_per_minute or self.audio_seconds_per_minute)
+
+    def _buckets(self, audio_seconds: float) -> list:
+        """(キー, 容量, 毎秒の補充量, 要求量) のリスト"""
+        buckets = []
+        if self.requests_per_minute:
+            buckets.append((
+                f"{BUCKET_PREFIX}{self.name}:requests",
+                self.requests_per_minute, self.requests_per_minute / 60, 1
+            ))
+        if self.audio_seconds_per_minute and audio_seconds > 0:
+            buckets.append((
+                f"{BUCKET_PREFIX}{self.name}:audio_seconds",
+                self.audio_seconds_per_minute, self.audio_seconds_per_minute / 60, audio_seconds
+            ))
+        return buckets
+
+    def try_acquire(self, audio_seconds: float = 0.0) -> float:
+        """
+        トークンの取得を1回試行
+
+        Args:
+            audio_seconds: 送信する音声の長さ（秒）
+
+        Returns:
+            float: 0 なら取得成功、それ以外は次に試行するまでの秒数
+        """
+        buckets = self._buckets(audio_seconds)
+        if not buckets:
+            return 0.0
+        args = []
+        for _, capacity, rate, requested in buckets:
+            args.extend([capacity, rate, requested])
+        try:
+            return float(self._script(keys=[PAUSE_KEY] + [key for key, *_ in buckets], args=args))
+        except redis.RedisError as e:
+            celery_logger.warning(f"Rate limiter unavailable, sending without limit: {e}")
+            return 0.0
+
+    def acquire(self, audio_seconds: float = 0.0) -> float:
+        """
+        トークンを取得できるまで待機（待機時間には揺らぎを加えて同時再開を避ける）
+
+        Args:
+            audio_seconds: 送信する音声の長さ（秒）
+
+        Returns:
+            float: 待機した秒数
+        """
+        waited = 0.0
+        while True:
+            wait = self.try_acquire(audio_seconds)
+            if wait <= 0:
+                return waited
+            delay = wait + random.uniform(0, min(wait, 1.0))
+            time.sleep(delay)
+            waited += delay
+
+    def pause(self, seconds: float) -> None:
+        """
+        429 を受けたとき全ワーカーの送信を一時停止
+
+        Args:
+            seconds: 停止する秒数
+        """
+        if seconds <= 0:
+            return
+        try:
+            seconds_now, micros = self._redis.time()
+            until = seconds_now + micros / 1_000_000 + seconds
+            current = float(self._redis.get(PAUSE_KEY) or 0)
+            if until > current:
+                self._redis.set(PAUSE_KEY, until, px=int(seconds * 1000) + 1000)
+        except redis.RedisError as e:
+            celery_logger.warning(f"Rate limiter pause failed: {e}")
+
+
+def backoff_delay(attempt: int, retry_after: Optional[float] = None) -> float:
+    """
+    リトライまでの待機時間（上限付き指数バックオフ + full jitter、Retry-After を優先）
+
+    Args:
+        attempt: 何回目のリトライか（0始まり）
+        retry_after: サーバーが指定した待機秒数
+
+    Returns:
+        float: 待機秒数
+    """
+    cap = min(settings.api_backoff_max, settings.api_backoff_base * (2 ** attempt))
+    delay = random.uniform(0, cap)
+    if retry_after is not None:
+        # 指定時刻に全ワーカーが一斉に再送しないよう少しずらす
+        delay = retry_after + random.uniform(0, settings.api_backoff_base)
+    return delay
+
+
+def parse_retry_after(headers) -> Optional[float]:
+    """
+    レスポンスヘッダーから待機秒数を取得（retry-after-ms / retry-after の秒数形式）
+
+    Args:
+        headers: レスポンスヘッダー
+
+    Returns:
+        Optional[float]: 待機秒数（指定がない場合はNone）
+    """
+    if headers is None:
+        return None
+    for name, scale in (('retry-after-ms', 0.001), ('retry-after', 1.0)):
+        value = headers.get(name)
+        if value is None:
+            continue
+        try:
+            return max(0.0, float(value) * scale)
+        except ValueError:
+            continue
+    return None
+
+
+# OpenAI 文字起こしAPI用（プロセス共通）
+transcription_rate_limiter = RateLimiter(
+    "openai",
+    requests_per_minute=settings.rate_limit_requests_per_minute,
+    audio_seconds_per_minute=settings.rate_limit_audio_seconds_per_minute
+)
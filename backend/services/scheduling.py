@@ -0,0 +1,68 @@
+"""
+ジョブのスケジューリング - 音声の推定時間でキューと優先度を振り分け
+"""
+from dataclasses import dataclass
+from typing import Optional
+
+import ffmpeg
+
+from config import settings
+from utils.logger import api_logger
+
+
+# Redis ブローカーの優先度（0 が最も高い）
+PRIORITY_STEPS = list(range(10))
+DEFAULT_PRIORITY = 5
+
+# 時間を取得できない場合に使う平均ビットレート（bytes/秒、128kbps相当）
+FALLBACK_BYTES_PER_SECOND = 128 * 1000 / 8
+
+
+@dataclass
+class JobRoute:
+    """ジョブの投入先"""
+    queue: str
+    priority: int
+    estimated_duration: Optional[float]
+
+
+def estimate_duration(path: str, file_size: int) -> Optional[float]:
+    """
+    音声の長さを推定（ffprobe でヘッダーのみ確認、失敗時や ffprobe がない場合はファイルサイズから概算）
+
+    Args:
+        path: ファイルパス
+        file_size: ファイルサイズ（bytes）
+
+    Returns:
+        Optional[float]: 推定時間（秒）
+    """
+    try:
+        probe = ffmpeg.probe(path)
+        duration = float(probe['format']['duration'])
+        if duration > 0:
+            return duration
+    except (ffmpeg.Error, OSError, KeyError, ValueError) as e:
+        api_logger.warning(f"Duration probe failed, estimating from size: path={path} error={e}")
+    return file_size / FALLBACK_BYTES_PER_SECOND if file_size else None
+
+
+def route_job(duration: Optional[float]) -> JobRoute:
+    """
+    推定時間からキューと優先度を決定
+
+    短いジョブは専用キューに入れ、長いジョブの後ろで待たないようにする。
+    同じキュー内でも短いものほど優先度を高くする。
+
+    Args:
+        duration: 推定時間（秒）
+
+    Returns:
+        JobRoute: 投入先キューと優先度
+    """
+    if duration is None:
+        return JobRoute(settings.queue_long, DEFAULT_PRIORITY, None)
+
+    queue = settings.queue_short if duration <= settings.short_job_max_seconds else settings.queue_long
+    priority = min(int(duration // settings.priority_step_seconds), PRIORITY_STEPS[-1])
+    return JobRoute(queue, priority, duration)
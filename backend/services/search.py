@@ -0,0 +1,267 @@
+"""
+全文検索サービス - SQLite FTS5 / PostgreSQL pg_trgm による文字起こし結果の検索
+"""
+from dataclasses import dataclass
+from datetime import datetime
+from typing import List
+
+from sqlalchemy import text
+from sqlalchemy.engine import Engine
+from sqlalchemy.exc import OperationalError, SQLAlchemyError
+from sqlmodel import Session
+from sqlmodel.ext.asyncio.session import AsyncSession
+
+from models import TranscriptionRecord, TaskStatus
+from utils.logger import db_logger
+
+
+FTS_TABLE = "transcription_fts"
+TRGM_INDEX = "ix_transcriptionrecord_text_trgm"
+
+# スニペットとして返す前後の文字数
+SNIPPET_CONTEXT = 40
+# trigram（FTS5 / pg_trgm）で検索できる最短の検索語。これより短い語は全件走査で探す
+MIN_TRIGRAM_QUERY = 3
+
+
+@dataclass
+class SearchHit:
+    """検索結果1件"""
+    id: int
+    original_filename: str
+    created_at: datetime
+    snippet: str
+    rank: float
+
+
+class SearchIndex:
+    """
+    文字起こし結果の全文検索インデックス
+
+    SQLite では trigram トークナイザの FTS5 テーブル（日本語の部分一致に対応）を使い、
+    完了したレコードを1件ずつ追加する。PostgreSQL では pg_trgm の GIN インデックスを
+    使うため、レコードの更新と同時にインデックスも更新される。
+    """
+
+    def __init__(self):
+        self._ready = set()
+
+    def ensure(self, engine: Engine) -> None:
+        """
+        検索インデックスを作成（既にあれば何もしない）
+
+        FTS5 テーブルを新規作成した場合のみ、既存の完了済みレコードを1回だけ登録する。
+
+        Args:
+            engine: 同期エンジン
+        """
+        if engine.url in self._ready:
+            return
+
+        dialect = engine.dialect.name
+        with engine.begin() as connection:
+            if dialect == "sqlite":
+                exists = connection.execute(
+                    text("SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = :name"),
+                    {"name": FTS_TABLE}
+                ).first()
+                if not exists:
+                    self._create_fts_table(connection)
+                    connection.execute(
+                        text(
+                            f"INSERT INTO {FTS_TABLE}(rowid, original_filename, transcription_text) "
+                            f"SELECT id, original_filename, transcription_text "
+                            f"FROM transcriptionrecord WHERE status = :status"
+                        ),
+                        {"status": TaskStatus.COMPLETED.name}
+                    )
+                    db_logger.info(f"Full-text index {FTS_TABLE} created")
+            elif dialect == "postgresql":
+                connection.execute(text("CREATE EXTENSION IF NOT EXISTS pg_trgm"))
+                connection.execute(text(
+                    f"CREATE INDEX IF NOT EXISTS {TRGM_INDEX} ON transcriptionrecord "
+                    f"USING gin (transcription_text gin_trgm_ops)"
+                ))
+
+        self._ready.add(engine.url)
+
+    @staticmethod
+    def _create_fts_table(connection) -> None:
+        """FTS5 テーブル作成（trigram 非対応の古いSQLiteでは unicode61 を使用）"""
+        try:
+            connection.execute(text(
+                f"CREATE VIRTUAL TABLE {FTS_TABLE} "
+                f"USING fts5(original_filename, transcription_text, tokenize='trigram')"
+            ))
+        except OperationalError:
+            connection.execute(text(
+                f"CREATE VIRTUAL TABLE {FTS_TABLE} "
+                f"USING fts5(original_filename, transcription_text)"
+            ))
+
+    def index_record(self, session: Session, record: TranscriptionRecord) -> None:
+        """
+        完了したレコードをインデックスに追加（再実行時は置き換え）
+
+        コミットは呼び出し側で行い、レコードの完了と同じトランザクションで確定する。
+        インデックスの更新に失敗してもジョブは失敗させず、セーブポイントまで戻してログに残す。
+
+        Args:
+            session: データベースセッション
+            record: 完了したレコード（コミット前）
+        """
+        engine = session.get_bind()
+        try:
+            self.ensure(engine)
+            if engine.dialect.name != "sqlite":
+                return
+
+            with session.begin_nested():
+                session.execute(text(f"DELETE FROM {FTS_TABLE} WHERE rowid = :id"), {"id": record.id})
+                session.execute(
+                    text(
+                        f"INSERT INTO {FTS_TABLE}(rowid, original_filename, transcription_text) "
+                        f"VALUES (:id, :filename, :text)"
+                    ),
+                    {"id": record.id, "filename": record.original_filename, "text": record.transcription_text}
+                )
+        except SQLAlchemyError as e:
+            db_logger.warning(f"Search index update failed: record_id={record.id} error={e}")
+
+    async def search(self, session: AsyncSession, query: str, limit: int = 20) -> List[SearchHit]:
+        """
+        文字起こし結果を検索し、関連度順にスニペット付きで返す
+
+        trigram では3文字未満の検索語（日本語の2文字の単語など）が一致しない・インデックスを
+        使えないため、短い検索語は全件走査で部分一致を探し、新しい順に返す。
+
+        Args:
+            session: 非同期データベースセッション
+            query: 検索語（フレーズとして扱う）
+            limit: 取得件数
+
+        Returns:
+            List[SearchHit]: 検索結果
+        """
+        dialect = session.bind.dialect.name
+        if len(query) < MIN_TRIGRAM_QUERY:
+            return await self._scan(session, dialect, query, limit)
+        if dialect == "sqlite":
+            # 検索語全体を1つのフレーズとして扱う
+            phrase = '"' + query.replace('"', '""') + '"'
+            result = await session.execute(
+                text(
+                    f"SELECT r.id, r.original_filename, r.created_at, "
+                    f"snippet({FTS_TABLE}, 1, '[', ']', '…', 32) AS snippet, "
+                    f"bm25({FTS_TABLE}) AS rank "
+                    f"FROM {FTS_TABLE} JOIN transcriptionrecord r ON r.id = {FTS_TABLE}.rowid "
+                    f"WHERE {FTS_TABLE} MATCH :query "
+                    f"ORDER BY rank LIMIT :limit"
+                ),
+                {"query": phrase, "limit": limit}
+            )
+            # bm25 は小さいほど関連度が高いため符号を反転
+            return [
+                SearchHit(
+                    id=row.id,
+                    original_filename=row.original_filename,
+                    created_at=_as_datetime(row.created_at),
+                    snippet=row.snippet,
+                    rank=-row.rank
+                )
+                for row in result
+            ]
+
+        # PostgreSQL: pg_trgm インデックスを使った部分一致、出現回数で順位付け
+        pattern = "%" + query.replace("\\", "\\\\").replace("%", "\\%").replace("_", "\\_") + "%"
+        result = await session.execute(
+            text(
+                "SELECT id, original_filename, created_at, "
+                "substr(transcription_text, "
+                "greatest(strpos(lower(transcription_text), lower(CAST(:query AS TEXT))) - :context, 1), "
+                ":snippet_length) AS snippet, "
+                "(length(transcription_text) - length(replace(lower(transcription_text), "
+                "lower(CAST(:query AS TEXT)), ''))) / greatest(length(CAST(:query AS TEXT)), 1) AS rank "
+                "FROM transcriptionrecord "
+                "WHERE status = :status AND transcription_text ILIKE :pattern "
+                "ORDER BY rank DESC, created_at DESC LIMIT :limit"
+            ),
+            {
+                "query": query,
+                "pattern": pattern,
+                "status": TaskStatus.COMPLETED.name,
+                "context": SNIPPET_CONTEXT,
+                "snippet_length": SNIPPET_CONTEXT * 2 + len(query),
+                "limit": limit,
+            }
+        )
+        return [
+            SearchHit(
+                id=row.id,
+                original_filename=row.original_filename,
+                created_at=row.created_at,
+                snippet=row.snippet,
+                rank=float(row.rank)
+            )
+            for row in result
+        ]
+
+
+    @staticmethod
+    async def _scan(session: AsyncSession, dialect: str, query: str, limit: int) -> List[SearchHit]:
+        """
+        インデックスを使わずに本文を走査して部分一致を探す（短い検索語用、完了日時の新しい順）
+
+        Args:
+            session: 非同期データベースセッション
+            dialect: DBの方言名
+            query: 検索語
+            limit: 取得件数
+
+        Returns:
+            List[SearchHit]: 検索結果（順位はすべて0）
+        """
+        if dialect == "sqlite":
+            position = "instr(lower(transcription_text), lower(:query))"
+            greatest = "max"
+        else:
+            position = "strpos(lower(transcription_text), lower(CAST(:query AS TEXT)))"
+            greatest = "greatest"
+        result = await session.execute(
+            text(
+                f"SELECT id, original_filename, created_at, "
+                f"substr(transcription_text, {greatest}({position} - :context, 1), :snippet_length) "
+                f"AS snippet "
+                f"FROM transcriptionrecord "
+                f"WHERE status = :status AND {position} > 0 "
+                f"ORDER BY completed_at DESC, id DESC LIMIT :limit"
+            ),
+            {
+                "query": query,
+                "status": TaskStatus.COMPLETED.name,
+                "context": SNIPPET_CONTEXT,
+                "snippet_length": SNIPPET_CONTEXT * 2 + len(query),
+                "limit": limit,
+            }
+        )
+        return [
+            SearchHit(
+                id=row.id,
+                original_filename=row.original_filename,
+                created_at=_as_datetime(row.created_at),
+                snippet=row.snippet,
+                rank=0.0
+            )
+            for row in result
+        ]
+
+
+def _as_datetime(value) -> datetime:
+    """SQLite の生SQLでは日時が文字列で返るため変換"""
+    if isinstance(value, datetime):
+        return value
+    return datetime.fromisoformat(value)
+
+
+# プロセス共通の検索インデックス
+search_index = SearchIndex()
@@ -0,0 +1,237 @@
+"""
+オブジェクトストレージ - S3互換ストレージ（MinIO など）への直接アップロード
+
+クライアントは署名付きURLでパートごとに直接アップロードし、APIはバイトを中継しない。
+ワーカーは処理時に発行した署名付きGET URLを FFmpeg に渡してストリーミングで読む。
+"""
+import math
+import os
+from datetime import datetime, timedelta, timezone
+from typing import Dict, List, Optional
+
+import boto3
+from botocore.config import Config
+from botocore.exceptions import BotoCoreError, ClientError
+
+from config import settings
+from utils.exceptions import FileProcessingError
+from utils.logger import celery_logger
+
+
+# ジョブに渡す入力パスのスキーム（ローカルファイルと区別する）
+OBJECT_URI_PREFIX = "s3://"
+UPLOAD_KEY_PREFIX = "uploads/"
+
+# S3 のマルチパートアップロードの制限
+MIN_PART_SIZE = 5 * 1024 * 1024
+MAX_PARTS = 10000
+
+
+class ObjectStorage:
+    """
+    S3互換ストレージのクライアント
+
+    署名付きURLはブラウザから届くエンドポイント（s3_public_endpoint_url）で署名し、
+    サーバー内部の操作は s3_endpoint_url を使う。
+    """
+
+    def __init__(self):
+        self._client = None
+        self._public_client = None
+
+    @staticmethod
+    def _build_client(endpoint_url: Optional[str]):
+        return boto3.client(
+            's3',
+            endpoint_url=endpoint_url,
+            region_name=settings.s3_region,
+            aws_access_key_id=settings.s3_access_key_id,
+            aws_secret_access_key=settings.s3_secret_access_key,
+            # MinIO はパス形式のURLのみ対応
+            config=Config(signature_version='s3v4', s3={'addressing_style': 'path'})
+        )
+
+    @property
+    def client(self):
+        if self._client is None:
+            self._client = self._build_client(settings.s3_endpoint_url)
+        return self._client
+
+    @property
+    def public_client(self):
+        if self._public_client is None:
+            self._public_client = self._build_client(
+                settings.s3_public_endpoint_url or settings.s3_endpoint_url
+            )
+        return self._public_client
+
+    def ensure_bucket(self) -> None:
+        """バケットがなければ作成（ブラウザからのPUTに必要なCORSは運用側で設定する）"""
+        try:
+            self.client.head_bucket(Bucket=settings.s3_bucket)
+        except ClientError:
+            self.client.create_bucket(Bucket=settings.s3_bucket)
+            celery_logger.info(f"Bucket created: bucket={settings.s3_bucket}")
+
+    @staticmethod
+    def part_size_for(size: int) -> int:
+        """パート数が上限を超えないパートサイズ"""
+        return max(settings.s3_part_size, MIN_PART_SIZE, math.ceil(size / MAX_PARTS))
+
+    def create_upload(self, key: str, size: int, content_type: Optional[str] = None) -> dict:
+        """
+        マルチパートアップロードを開始し、パートごとの署名付きURLを発行
+
+        Args:
+            key: オブジェクトキー
+            size: ファイルサイズ（bytes）
+            content_type: Content-Type
+
+        Returns:
+            dict: upload_id, part_size, parts（part_number と url）
+        """
+        params = {'Bucket': settings.s3_bucket, 'Key': key}
+        if content_type:
+            params['ContentType'] = content_type
+        upload_id = self.client.create_multipart_upload(**params)['UploadId']
+
+        part_size = self.part_size_for(size)
+        parts = [
+            {
+                'part_number': part_number,
+                'url': self.public_client.generate_presigned_url(
+                    'upload_part',
+                    Params={
+                        'Bucket': settings.s3_bucket,
+                        'Key': key,
+                        'UploadId': upload_id,
+                        'PartNumber': part_number
+                    },
+                    ExpiresIn=settings.s3_presign_expiry
+                )
+            }
+            for part_number in range(1, max(1, math.ceil(size / part_size)) + 1)
+        ]
+        return {'upload_id': upload_id, 'part_size': part_size, 'parts': parts}
+
+    def complete_upload(self, key: str, upload_id: str, parts: List[Dict]) -> int:
+        """
+        マルチパートアップロードを完了
+
+        Args:
+            key: オブジェクトキー
+            upload_id: アップロードID
+            parts: part_number と etag のリスト
+
+        Returns:
+            int: オブジェクトのサイズ（bytes）
+        """
+        self.client.complete_multipart_upload(
+            Bucket=settings.s3_bucket,
+            Key=key,
+            UploadId=upload_id,
+            MultipartUpload={'Parts': [
+                {'PartNumber': part['part_number'], 'ETag': part['etag']}
+                for part in sorted(parts, key=lambda part: part['part_number'])
+            ]}
+        )
+        return self.client.head_object(Bucket=settings.s3_bucket, Key=key)['ContentLength']
+
+    def abort_upload(self, key: str, upload_id: str) -> None:
+        """完了前のマルチパートアップロードを破棄"""
+        try:
+            self.client.abort_multipart_upload(
+                Bucket=settings.s3_bucket, Key=key, UploadId=upload_id
+            )
+        except ClientError:
+            pass
+
+    def abort_stale_uploads(self, max_age_seconds: int) -> int:
+        """
+        完了されずに残ったマルチパートアップロードを破棄
+
+        Args:
+            max_age_seconds: 開始からの経過秒数
+
+        Returns:
+            int: 破棄した数
+        """
+        expires_before = datetime.now(timezone.utc) - timedelta(seconds=max_age_seconds)
+        aborted = 0
+        paginator = self.client.get_paginator('list_multipart_uploads')
+        for page in paginator.paginate(Bucket=settings.s3_bucket, Prefix=UPLOAD_KEY_PREFIX):
+            for upload in page.get('Uploads', []):
+                if upload['Initiated'] < expires_before:
+                    self.abort_upload(upload['Key'], upload['UploadId'])
+                    aborted += 1
+        return aborted
+
+    def presigned_get_url(self, key: str) -> str:
+        """ワーカーが FFmpeg で読むための署名付きGET URL（内部エンドポイント）"""
+        return self.client.generate_presigned_url(
+            'get_object',
+            Params={'Bucket': settings.s3_bucket, 'Key': key},
+            ExpiresIn=settings.s3_presign_expiry
+        )
+
+    def delete(self, key: str) -> None:
+        """オブジェクトを削除"""
+        self.client.delete_object(Bucket=settings.s3_bucket, Key=key)
+
+
+object_storage = ObjectStorage()
+
+
+def upload_key(task_id: str, extension: str) -> str:
+    """タスクのアップロード先オブジェクトキー"""
+    return f"{UPLOAD_KEY_PREFIX}{task_id}{extension}"
+
+
+def object_uri(key: str) -> str:
+    """ジョブに渡す入力パス（s3://バケット/キー）"""
+    return f"{OBJECT_URI_PREFIX}{settings.s3_bucket}/{key}"
+
+
+def is_object_uri(path: str) -> bool:
+    return path.startswith(OBJECT_URI_PREFIX)
+
+
+def _uri_key(uri: str) -> str:
+    return uri[len(OBJECT_URI_PREFIX):].split('/', 1)[1]
+
+
+def resolve_input(path: str) -> str:
+    """
+    FFmpeg に渡す入力（オブジェクトは署名付きURL、ローカルファイルはそのまま）
+
+    キューで待つ間に期限切れにならないよう、署名は処理開始時に行う。
+
+    Args:
+        path: ローカルファイルパスまたは s3:// URI
+
+    Returns:
+        str: FFmpeg の入力
+    """
+    if not is_object_uri(path):
+        return path
+    try:
+        return object_storage.presigned_get_url(_uri_key(path))
+    except (BotoCoreError, ClientError) as e:
+        raise FileProcessingError(f"Object storage unavailable: {e}")
+
+
+def remove_input(path: str) -> None:
+    """
+    ジョブの入力を削除（オブジェクトまたはローカルファイル）
+
+    Args:
+        path: ローカルファイルパスまたは s3:// URI
+    """
+    if not is_object_uri(path):
+        if os.path.exists(path):
+            os.remove(path)
+        return
+    try:
+        object_storage.delete(_uri_key(path))
+    except (BotoCoreError, ClientError) as e:
+        celery_logger.warning(f"Object delete failed: uri={path} error={e}")
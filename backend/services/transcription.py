@@ -0,0 +1,326 @@
+"""
+文字起こしサービス - 文字起こしエンジン（OpenAI API / ローカル faster-whisper）と
+タイムスタンプ付きセグメントの保持・時刻の変換
+"""
+import os
+import json
+import time
+import threading
+from abc import ABC, abstractmethod
+from dataclasses import dataclass, field, asdict
+from typing import Dict, List, Optional
+
+import openai
+from sqlmodel import Session, delete
+
+from config import settings
+from models import TranscriptSegment
+from services.audio import AudioSegment, TimestampMap
+from services.metrics import STAGE_SECONDS, api_call_timer
+from services.openai_client import get_openai_client
+from services.rate_limit import RateLimiter, transcription_rate_limiter, backoff_delay, parse_retry_after
+from utils.exceptions import (
+    FileProcessingError, OpenAIAPIError, QuotaExceededError, RateLimitError
+)
+from utils.logger import celery_logger
+
+
+@dataclass
+class TimedText:
+    """タイムスタンプ付きの文字列（秒）"""
+    start: float
+    end: float
+    text: str
+
+
+@dataclass
+class SegmentResult:
+    """1セグメントの文字起こし結果（時刻はセグメント先頭からの秒）"""
+    text: str
+    segments: List[TimedText] = field(default_factory=list)
+
+    def to_json(self) -> str:
+        return json.dumps([asdict(item) for item in self.segments], ensure_ascii=False)
+
+    @classmethod
+    def from_json(cls, text: str, segments_json: Optional[str]) -> 'SegmentResult':
+        items = json.loads(segments_json) if segments_json else []
+        return cls(text=text, segments=[TimedText(**item) for item in items])
+
+
+def timeline_to_json(timeline: List[TimedText]) -> str:
+    """タイムラインをJSON文字列に変換（キャッシュ保存用）"""
+    return json.dumps([asdict(item) for item in timeline], ensure_ascii=False)
+
+
+def timeline_from_json(segments_json: Optional[str]) -> List[TimedText]:
+    """JSON文字列からタイムラインを復元"""
+    return [TimedText(**item) for item in json.loads(segments_json)] if segments_json else []
+
+
+def build_timeline(
+    audio_segments: List[AudioSegment],
+    results: List[SegmentResult],
+    timestamp_map: Optional[TimestampMap] = None,
+    overlap: float = 0.0
+) -> List[TimedText]:
+    """
+    セグメントごとの結果を元ファイル上の時刻に揃えて1本のタイムラインにする
+
+    各結果の時刻にセグメントの開始位置を足し、無音除去していれば対応表で元の時刻に
+    戻す。セグメントが重なっている場合は重なり区間の中央を境に前後どちらか一方の
+    結果だけを残す。
+
+    Args:
+        audio_segments: 分割されたセグメント（時刻は処理後の音声上）
+        results: セグメント順の文字起こし結果
+        timestamp_map: 無音除去の対応表
+        overlap: セグメントの重なり（秒）
+
+    Returns:
+        List[TimedText]: 元ファイル上の時刻のタイムライン
+    """
+    timeline = []
+    for i, (audio_segment, result) in enumerate(zip(audio_segments, results)):
+        # 重なり区間の中央より前/後の発話だけを採用
+        keep_from = audio_segment.start + overlap / 2 if i > 0 else float('-inf')
+        keep_until = (
+            audio_segments[i + 1].start + overlap / 2
+            if i + 1 < len(audio_segments) else float('inf')
+        )
+        for item in result.segments:
+            start = audio_segment.start + item.start
+            end = audio_segment.start + item.end
+            if not keep_from <= start < keep_until:
+                continue
+            if timestamp_map:
+                start = timestamp_map.to_original(start)
+                end = timestamp_map.to_original(end)
+            timeline.append(TimedText(start=start, end=max(start, end), text=item.text.strip()))
+    return timeline
+
+
+def store_timeline(session: Session, record_id: int, timeline: List[TimedText]) -> None:
+    """
+    タイムラインを TranscriptSegment テーブルに保存（既存の行は置き換え）
+
+    コミットは呼び出し側で行い、レコードの完了と同じトランザクションで確定する
+    （完了したレコードのタイムラインが未保存の状態を作らない）。
+
+    Args:
+        session: データベースセッション
+        record_id: レコードID
+        timeline: 元ファイル上の時刻のタイムライン
+    """
+    session.exec(delete(TranscriptSegment).where(TranscriptSegment.record_id == record_id))
+    session.add_all([
+        TranscriptSegment(
+            record_id=record_id,
+            seq=seq,
+            start_ms=int(round(item.start * 1000)),
+            end_ms=int(round(item.end * 1000)),
+            text=item.text
+        )
+        for seq, item in enumerate(timeline)
+    ])
+
+
+class TranscriptionBackend(ABC):
+    """文字起こしエンジンの共通インターフェース"""
+
+    name: str = ""
+
+    @property
+    @abstractmethod
+    def model_id(self) -> str:
+        """結果に影響するモデル・設定の識別子（キャッシュキーに使用）"""
+
+    @property
+    def max_concurrency(self) -> int:
+        """1タスク内で同時に処理するセグメント数"""
+        return settings.transcription_concurrency
+
+    def load(self) -> None:
+        """モデルの事前読み込み（必要なエンジンのみ）"""
+
+    @abstractmethod
+    def transcribe(self, segment_path: str, audio_seconds: float = 0.0) -> SegmentResult:
+        """
+        1セグメントを文字起こし
+
+        Args:
+            segment_path: セグメントファイルパス
+            audio_seconds: セグメントの長さ（秒）
+
+        Returns:
+            SegmentResult: 文字起こし結果（時刻はセグメント先頭からの秒）
+        """
+
+
+class OpenAIBackend(TranscriptionBackend):
+    """
+    OpenAI 文字起こしAPI
+
+    送信前に全ワーカー共通のレート制限を待ち、429・タイムアウト・5xx は
+    指数バックオフ（Retry-After があればそれに従う）でリトライする。
+    """
+
+    name = "openai"
+
+    def __init__(
+        self,
+        api_key: Optional[str] = None,
+        rate_limiter: Optional[RateLimiter] = transcription_rate_limiter
+    ):
+        self.api_key = api_key
+        self.rate_limiter = rate_limiter
+
+    @property
+    def model_id(self) -> str:
+        # 既存のキャッシュキーと互換にするためモデル名のみ
+        return settings.openai_model
+
+    def transcribe(self, segment_path: str, audio_seconds: float = 0.0) -> SegmentResult:
+        openai_client = get_openai_client(self.api_key)
+        for attempt in range(settings.api_max_retries + 1):
+            if self.rate_limiter:
+                waited = self.rate_limiter.acquire(audio_seconds)
+                STAGE_SECONDS.labels(stage='rate_limit_wait').observe(waited)
+            try:
+                with open(segment_path, 'rb') as audio_file, api_call_timer(self.name):
+                    response = openai_client.audio.transcriptions.create(
+                        model=settings.openai_model,
+                        file=audio_file,
+                        response_format="verbose_json",
+                        timestamp_granularities=["segment"]
+                    )
+                break
+            except openai.RateLimitError as e:
+                # クォータ不足は待っても回復しないためリトライしない
+                if e.code == "insufficient_quota" or "insufficient_quota" in str(e):
+                    raise QuotaExceededError()
+                if attempt >= settings.api_max_retries:
+                    raise RateLimitError()
+                delay = backoff_delay(attempt, parse_retry_after(e.response.headers))
+                # 他のワーカーも同じ制限に当たるため全体で送信を止める
+                if self.rate_limiter:
+                    self.rate_limiter.pause(delay)
+            except (openai.APITimeoutError, openai.APIConnectionError, openai.InternalServerError) as e:
+                if attempt >= settings.api_max_retries:
+                    raise OpenAIAPIError(f"OpenAI API error: {str(e)}")
+                response_headers = getattr(getattr(e, 'response', None), 'headers', None)
+                delay = backoff_delay(attempt, parse_retry_after(response_headers))
+            except Exception as e:
+                raise OpenAIAPIError(f"OpenAI API error: {str(e)}")
+
+            celery_logger.warning(
+                f"Transcription request retry: segment={os.path.basename(segment_path)} "
+                f"attempt={attempt + 1}/{settings.api_max_retries} delay={delay:.1f}s"
+            )
+            time.sleep(delay)
+
+        # SDK のバージョンによって segments は dict のまま返る
+        segments = getattr(response, 'segments', None) or []
+        return SegmentResult(
+            text=response.text,
+            segments=[
+                TimedText(**{key: _field(item, key) for key in ('start', 'end', 'text')})
+                for item in segments
+            ]
+        )
+
+
+def _field(item, name: str):
+    """オブジェクト/dict どちらの形式のセグメントからも値を取得"""
+    return item[name] if isinstance(item, dict) else getattr(item, name)
+
+
+class FasterWhisperBackend(TranscriptionBackend):
+    """
+    ローカルCPUの faster-whisper（CTranslate2）
+
+    モデルはプロセスごとに1回だけ読み込んで保持する。faster-whisper は任意の依存関係。
+    """
+
+    name = "faster-whisper"
+
+    def __init__(self):
+        self._model = None
+        self._lock = threading.Lock()
+
+    @property
+    def model_id(self) -> str:
+        return (
+            f"{self.name}:{settings.local_whisper_model}:{settings.local_whisper_compute_type}:"
+            f"{settings.local_whisper_language or 'auto'}:beam{settings.local_whisper_beam_size}"
+        )
+
+    @property
+    def max_concurrency(self) -> int:
+        return settings.local_whisper_workers
+
+    def load(self) -> None:
+        with self._lock:
+            if self._model is not None:
+                return
+            try:
+                from faster_whisper import WhisperModel
+            except ImportError:
+                raise FileProcessingError(
+                    "faster-whisper is not installed (pip install faster-whisper)"
+                )
+            started = time.perf_counter()
+            self._model = WhisperModel(
+                settings.local_whisper_model,
+                device=settings.local_whisper_device,
+                compute_type=settings.local_whisper_compute_type,
+                cpu_threads=settings.local_whisper_cpu_threads,
+                num_workers=settings.local_whisper_workers
+            )
+            celery_logger.info(
+                f"Local model loaded: model={settings.local_whisper_model} "
+                f"compute_type={settings.local_whisper_compute_type} "
+                f"elapsed={time.perf_counter() - started:.1f}s"
+            )
+
+    def transcribe(self, segment_path: str, audio_seconds: float = 0.0) -> SegmentResult:
+        self.load()
+        with api_call_timer(self.name):
+            segments, _ = self._model.transcribe(
+                segment_path,
+                language=settings.local_whisper_language,
+                beam_size=settings.local_whisper_beam_size
+            )
+            # segments はジェネレーターのため、ここで推論が実行される
+            timed = [TimedText(start=item.start, end=item.end, text=item.text) for item in segments]
+        return SegmentResult(text="".join(item.text for item in timed).strip(), segments=timed)
+
+
+# 利用可能なエンジン
+BACKENDS = {
+    OpenAIBackend.name: OpenAIBackend,
+    FasterWhisperBackend.name: FasterWhisperBackend,
+}
+
+_backends: Dict[str, TranscriptionBackend] = {}
+
+
+def get_backend(name: Optional[str] = None) -> TranscriptionBackend:
+    """
+    プロセス共通の文字起こしエンジンを取得
+
+    Args:
+        name: エンジン名（省略時は設定の既定値）
+
+    Returns:
+        TranscriptionBackend: 文字起こしエンジン
+
+    Raises:
+        ValueError: 未対応のエンジン名
+    """
+    name = name or settings.transcription_backend
+    if name not in BACKENDS:
+        raise ValueError(f"Unsupported transcription backend: {name}")
+    if name not in _backends:
+        _backends[name] = BACKENDS[name]()
+    return _backends[name]
@@ -0,0 +1,218 @@
+"""
+アップロード処理サービス - multipart の受信とディスクへの書き込みを同時に行う
+"""
+import os
+import time
+import hashlib
+import tempfile
+from dataclasses import dataclass, field
+from typing import Callable, Dict, List, Optional, Tuple
+
+from fastapi import Request
+from fastapi.concurrency import run_in_threadpool
+from multipart.multipart import MultipartParser, parse_options_header
+
+from utils.exceptions import FileProcessingError, FileSizeError
+
+
+# ファイル以外のフォーム項目の上限（bytes）
+MAX_FIELD_SIZE = 64 * 1024
+
+
+@dataclass
+class UploadStats:
+    """アップロード結果の統計情報"""
+    path: str
+    size: int  # bytes
+    elapsed: float  # seconds
+    chunks: int
+    sha256: str  # content hash
+
+    @property
+    def throughput(self) -> float:
+        """スループット（bytes/sec）"""
+        if self.elapsed <= 0:
+            return 0.0
+        return self.size / self.elapsed
+
+
+@dataclass
+class MultipartUpload:
+    """受信したファイルとフォーム項目"""
+    file: UploadStats
+    filename: str
+    fields: Dict[str, str] = field(default_factory=dict)
+
+
+def _write_chunk(temp_file, digest, data: bytes) -> None:
+    """チャンクの書き込みとハッシュ計算（スレッドプールで実行）"""
+    temp_file.write(data)
+    digest.update(data)
+
+
+def _discard(temp_file) -> None:
+    """書きかけのファイルを削除"""
+    temp_file.close()
+    try:
+        os.unlink(temp_file.name)
+    except OSError:
+        pass
+
+
+async def receive_multipart_upload(
+    request: Request,
+    file_field: str,
+    on_file: Callable[[str], str],
+    prefix: str,
+    max_size: int,
+    chunk_size: int,
+    directory: str = None
+) -> MultipartUpload:
+    """
+    multipart/form-data のボディを受信しながら解析し、ファイル部分を一時ファイルへ書き込む
+
+    Starlette のフォーム解析（全体をスプールしてから渡す）を使わないため、ファイルは
+    1回だけディスクに書かれ、受信済みバイト数が上限を超えた時点で中断できる。
+    ディスクへの書き込みはスレッドプールで行い、イベントループを止めない。
+
+    Args:
+        request: リクエスト
+        file_field: ファイルのフォーム項目名
+        on_file: ファイル名を受け取った時点で呼ぶ検証関数（一時ファイルの拡張子を返す）
+        prefix: 一時ファイルのプレフィックス
+        max_size: 最大ファイルサイズ（bytes）
+        chunk_size: まとめて書き込むバイト数
+        directory: 保存先ディレクトリ
+
+    Returns:
+        MultipartUpload: 保存先パス、転送統計、コンテンツハッシュ、フォーム項目
+
+    Raises:
+        FileSizeError: ファイルサイズが上限を超えた場合
+        FileProcessingError: multipart として解析できない、またはファイルがない場合
+    """
+    content_type, params = parse_options_header(request.headers.get('content-type', ''))
+    boundary = params.get(b'boundary')
+    if content_type != b'multipart/form-data' or not boundary:
+        raise FileProcessingError("Expected multipart/form-data with a file")
+
+    # パーサーのコールバックは同期のため、イベントを溜めて受信ループで処理する
+    events: List[Tuple[str, bytes]] = []
+    header_field = bytearray()
+    header_value = bytearray()
+
+    def on_header_field(data: bytes, start: int, end: int) -> None:
+        header_field.extend(data[start:end])
+
+    def on_header_value(data: bytes, start: int, end: int) -> None:
+        header_value.extend(data[start:end])
+
+    def on_header_end() -> None:
+        if header_field.lower() == b'content-disposition':
+            events.append(('disposition', bytes(header_value)))
+        header_field.clear()
+        header_value.clear()
+
+    parser = MultipartParser(boundary, {
+        'on_part_begin': lambda: events.append(('begin', b'')),
+        'on_header_field': on_header_field,
+        'on_header_value': on_header_value,
+        'on_header_end': on_header_end,
+        'on_headers_finished': lambda: events.append(('headers', b'')),
+        'on_part_data': lambda data, start, end: events.append(('data', data[start:end])),
+        'on_part_end': lambda: events.append(('end', b'')),
+    })
+
+    temp_file = None
+    filename: Optional[str] = None
+    fields: Dict[str, str] = {}
+    name: Optional[str] = None
+    part_filename: Optional[str] = None
+    value = bytearray()
+    buffer = bytearray()
+    in_file = False
+    size = 0
+    chunks = 0
+    digest = hashlib.sha256()
+    started = time.perf_counter()
+
+    async def flush() -> None:
+        nonlocal chunks
+        if buffer:
+            await run_in_threadpool(_write_chunk, temp_file, digest, bytes(buffer))
+            buffer.clear()
+            chunks += 1
+
+    async def handle(events_batch: List[Tuple[str, bytes]]) -> None:
+        nonlocal temp_file, filename, name, part_filename, in_file, size
+        for kind, data in events_batch:
+            if kind == 'begin':
+                name, part_filename = None, None
+                value.clear()
+            elif kind == 'disposition':
+                _, options = parse_options_header(data)
+                name = options.get(b'name', b'').decode('utf-8', errors='replace')
+                raw_filename = options.get(b'filename')
+                part_filename = (
+                    raw_filename.decode('utf-8', errors='replace') if raw_filename is not None else None
+                )
+            elif kind == 'headers':
+                in_file = name == file_field and part_filename is not None and temp_file is None
+                if in_file:
+                    # 拡張子などの検証はボディを受信する前に行う
+                    suffix = on_file(part_filename)
+                    filename = part_filename
+                    temp_file = await run_in_threadpool(
+                        tempfile.NamedTemporaryFile,
+                        delete=False, suffix=suffix, prefix=prefix, dir=directory
+                    )
+            elif kind == 'data':
+                if in_file:
+                    size += len(data)
+                    if size > max_size:
+                        raise FileSizeError(
+                            f"File too large. Maximum size is {max_size // (1024 * 1024)}MB"
+                        )
+                    buffer.extend(data)
+                    if len(buffer) >= chunk_size:
+                        await flush()
+                elif name is not None and part_filename is None:
+                    value.extend(data)
+                    if len(value) > MAX_FIELD_SIZE:
+                        raise FileProcessingError(f"Form field too large: {name}")
+            elif kind == 'end':
+                if in_file:
+                    await flush()
+                    in_file = False
+                elif name is not None and part_filename is None:
+                    fields[name] = value.decode('utf-8', errors='replace')
+
+    try:
+        async for chunk in request.stream():
+            parser.write(chunk)
+            batch, events[:] = events[:], []
+            await handle(batch)
+        parser.finalize()
+        batch, events[:] = events[:], []
+        await handle(batch)
+
+        if temp_file is None:
+            raise FileProcessingError(f"Missing file field: {file_field}")
+        await run_in_threadpool(temp_file.close)
+    except BaseException:
+        # 途中で失敗した場合は書きかけのファイルを削除
+        if temp_file is not None:
+            await run_in_threadpool(_discard, temp_file)
+        raise
+
+    return MultipartUpload(
+        file=UploadStats(
+            path=temp_file.name,
+            size=size,
+            elapsed=time.perf_counter() - started,
+            chunks=chunks,
+            sha256=digest.hexdigest()
+        ),
+        filename=filename,
+        fields=fields
+    )
@@ -2,12 +2,40 @@
 Celery タスク定義
 """
 import os
-from celery import Celery
-from openai import OpenAI
-from typing import List
+import time
+import contextvars
+from difflib import SequenceMatcher
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from celery import Celery, chord
+from celery.exceptions import Ignore
+from celery.signals import worker_init, worker_process_init, worker_process_shutdown
+from typing import List, Optional
+from config import settings
+from database import db_manager, WORKER_PROCESS
+from sqlmodel import select
 from models import get_session, TranscriptionRecord, TaskStatus
-from services.audio import AudioProcessor
-from datetime import datetime
+from services.audio import AudioProcessor, AudioSegment
+from services.cache import transcription_cache, file_hash
+from services.checkpoint import (
+    job_work_dir, load_checkpoints, save_checkpoint, clear_checkpoints, count_checkpoints,
+    remove_stale_work_dirs
+)
+from services.metrics import (
+    JOBS_TOTAL, current_task_id, mark_process_dead, observe_queue_wait, stage_timer,
+    start_metrics_server
+)
+from services.progress import publish_progress
+from services.openai_client import init_openai_client, connection_stats
+from services.scheduling import PRIORITY_STEPS, DEFAULT_PRIORITY
+from services.search import search_index
+from services.storage import object_storage, remove_input, resolve_input
+from services.transcription import (
+    OpenAIBackend, SegmentResult, build_timeline, get_backend, store_timeline,
+    timeline_to_json, timeline_from_json
+)
+from utils.exceptions import TranscribeAppException
+from utils.logger import celery_logger
+from datetime import datetime, timedelta
 
 # Celery設定
 celery_app = Celery(
@@ -16,48 +44,277 @@ celery_app = Celery(
     backend='redis://redis:6379/0'
 )
 
-# OpenAI クライアント初期化は関数内で行う
-def get_openai_client():
-    """OpenAI クライアントを取得"""
-    api_key = os.getenv('OPENAI_API_KEY')
-    if not api_key:
-        raise ValueError("OPENAI_API_KEY environment variable is not set")
-    return OpenAI(api_key=api_key)
+# ワーカーが途中で停止してもジョブを失わないよう、完了後にACKして未完了分は再配信する。
+# 長時間のジョブが実行中に再配信されないよう可視性タイムアウトを延ばす。
+# 文字起こしは推定時間で short/long キューに振り分け（main.upload_audio）、
+# キュー内では短いジョブほど優先度を高くする（Redis では 0 が最優先）。
+# 複数キューは既定のラウンドロビンで取り出す（宣言順に取り出すと、親ジョブが届き続ける間
+# transcribe_segments のサブタスクが取り出されず、chord が完了しない）。
+celery_app.conf.update(
+    task_acks_late=True,
+    task_reject_on_worker_lost=True,
+    worker_prefetch_multiplier=1,
+    task_default_queue=settings.queue_short,
+    task_queue_max_priority=PRIORITY_STEPS[-1],
+    task_default_priority=DEFAULT_PRIORITY,
+    broker_transport_options={
+        'visibility_timeout': settings.task_visibility_timeout,
+        'priority_steps': PRIORITY_STEPS,
+        'sep': ':',
+    },
+)
+
+@worker_init.connect
+def init_worker_metrics(**kwargs) -> None:
+    """ワーカー起動時（fork前）にメトリクスのHTTPサーバーを起動"""
+    if settings.worker_metrics_port:
+        start_metrics_server(settings.worker_metrics_port)
+
+
+@worker_process_init.connect
+def init_worker_process(**kwargs) -> None:
+    """
+    prefork子プロセス起動時に親から引き継いだDB接続を破棄し、ワーカー用のプールと
+    APIクライアントを作成。ローカルエンジンが既定の場合はモデルを読み込んでおく
+    """
+    db_manager.configure(WORKER_PROCESS)
+    init_openai_client()
+    try:
+        get_backend().load()
+    except (TranscribeAppException, ValueError) as e:
+        celery_logger.warning(f"Transcription backend not preloaded: {e}")
+
+
+@worker_process_shutdown.connect
+def shutdown_worker_process(pid=None, **kwargs) -> None:
+    """終了した子プロセスのメトリクスを集計から外す"""
+    mark_process_dead(pid or os.getpid())
+
+
+# 重複除去の判定に使う文字数
+OVERLAP_CHARS_PER_SECOND = 25
+OVERLAP_MIN_MATCH = 5
+
+
+def join_transcriptions(transcriptions: List[str], overlap: float = 0.0) -> str:
+    """
+    セグメントごとの文字起こし結果を結合
+    
+    セグメントが重なっている場合、前のセグメントの末尾と次のセグメントの先頭で
+    最も長く一致する部分を探し、重複した文字列を取り除いて結合する。
+    
+    Args:
+        transcriptions: セグメント順の文字起こし結果
+        overlap: セグメントの重なり（秒）
+        
+    Returns:
+        str: 結合した文字起こし結果
+    """
+    if overlap <= 0:
+        return "\n".join(transcriptions)
+    
+    # 重なり区間に含まれうる最大文字数
+    window = max(int(overlap * OVERLAP_CHARS_PER_SECOND), OVERLAP_MIN_MATCH)
+    merged = ""
+    for text in transcriptions:
+        text = text.strip()
+        if not merged:
+            merged = text
+            continue
+        
+        tail_start = max(0, len(merged) - window)
+        tail = merged[tail_start:]
+        head = text[:window]
+        match = SequenceMatcher(None, tail, head, autojunk=False)\
+            .find_longest_match(0, len(tail), 0, len(head))
+        
+        if match.size >= OVERLAP_MIN_MATCH:
+            merged = merged[:tail_start + match.a + match.size] + text[match.b + match.size:]
+        else:
+            merged = merged + "\n" + text
+    return merged
+
+
+def transcribe_segment(backend, segment: AudioSegment) -> SegmentResult:
+    """
+    1セグメントを文字起こし（所要時間を transcribe_segment として記録）
+    
+    Args:
+        backend: 文字起こしエンジン
+        segment: セグメント
+        
+    Returns:
+        SegmentResult: 文字起こし結果
+    """
+    with stage_timer('transcribe_segment'):
+        return backend.transcribe(segment.path, segment.duration)
+
+
+def report_progress(task, task_id: str, meta: dict) -> None:
+    """
+    Celeryの状態を更新し、購読中のクライアントへ進捗を配信
+    
+    セグメントのサブタスクからも呼ぶため、状態は常にジョブのタスクIDに保存する。
+    
+    Args:
+        task: 実行中のCeleryタスク
+        task_id: タスクID
+        meta: 進捗情報（status はメッセージ、progress は0-100）
+    """
+    task.update_state(task_id=task_id, state='PROCESSING', meta=meta)
+    event = {key: value for key, value in meta.items() if key != 'status'}
+    publish_progress(task_id, {'status': 'processing', 'message': meta.get('status'), **event})
 
 
-@celery_app.task(bind=True)
-def transcribe_audio_task(self, file_path: str, task_id: str, original_filename: str, file_size: int) -> dict:
+def fail_job(session, task_id: str, file_path: str, error_msg: str) -> dict:
     """
-    音声文字起こしタスク
+    ジョブを失敗として終了（途中結果・作業ディレクトリ・アップロードファイルを削除）
     
     Args:
+        session: データベースセッション
+        task_id: タスクID
         file_path: 音声ファイルパス
+        error_msg: エラーメッセージ
+        
+    Returns:
+        dict: タスク結果
+    """
+    record = session.exec(
+        select(TranscriptionRecord).where(TranscriptionRecord.task_id == task_id)
+    ).first()
+    if record and record.status == TaskStatus.COMPLETED:
+        # 重複実行されたサブタスクの失敗で完了済みのジョブを上書きしない
+        return {'status': 'completed', 'record_id': record.id}
+    if record:
+        record.status = TaskStatus.FAILED
+        record.error_message = error_msg
+        session.commit()
+    JOBS_TOTAL.labels(status='failed').inc()
+    
+    clear_checkpoints(session, task_id)
+    remove_input(file_path)
+    
+    publish_progress(task_id, {
+        'status': 'failed',
+        'message': 'Transcription failed',
+        'error': error_msg
+    })
+    
+    return {
+        'status': 'failed',
+        'error': error_msg
+    }
+
+
+@celery_app.task(bind=True, acks_late=True, reject_on_worker_lost=True)
+def transcribe_audio_task(
+    self,
+    file_path: str,
+    task_id: str,
+    original_filename: str,
+    file_size: int,
+    content_hash: Optional[str] = None,
+    engine: Optional[str] = None,
+    enqueued_at: Optional[float] = None
+) -> dict:
+    """
+    音声文字起こしタスク（前処理）
+    
+    変換・分割したセグメントを共有の作業ディレクトリに置き、未処理のセグメントが
+    多い場合はセグメントごとのサブタスク（どのワーカーでも実行できる）に分けて
+    finalize_transcription_task で結合する。少ない場合はこのタスク内で並列に処理する。
+    
+    分割結果とセグメントごとの結果を保存しながら進めるため、ワーカー停止後に
+    再配信された場合は完了済みのセグメントを省略して再開する。
+    
+    Args:
+        file_path: 音声ファイルパス（直接アップロードの場合は s3:// URI）
         task_id: タスクID
         original_filename: 元のファイル名
         file_size: ファイルサイズ
+        content_hash: アップロードファイルのSHA-256（キャッシュキー）
+        engine: 文字起こしエンジン名（省略時は設定の既定値）
+        enqueued_at: キューに投入した時刻（待ち時間の計測用）
         
     Returns:
         dict: タスク結果
     """
+    current_task_id.set(task_id)
+    observe_queue_wait((self.request.delivery_info or {}).get('routing_key'), enqueued_at)
     session = get_session()
-    audio_processor = AudioProcessor()
+    audio_processor = AudioProcessor(work_dir=job_work_dir(task_id))
     
     try:
-        # データベースレコード作成
-        record = TranscriptionRecord(
-            filename=os.path.basename(file_path),
-            original_filename=original_filename,
-            transcription_text="",
-            task_id=task_id,
-            status=TaskStatus.PROCESSING,
-            file_size=file_size
-        )
-        session.add(record)
+        # 再配信された場合は前回のレコードを引き継ぐ
+        record = session.exec(
+            select(TranscriptionRecord).where(TranscriptionRecord.task_id == task_id)
+        ).first()
+        if record and record.status == TaskStatus.COMPLETED:
+            # 完了後・ACK前に停止した場合は結果をそのまま返す
+            clear_checkpoints(session, task_id)
+            return {
+                'status': 'completed',
+                'transcription': record.transcription_text,
+                'duration': record.duration,
+                'record_id': record.id
+            }
+        
+        if record:
+            celery_logger.info(f"Resuming task: task_id={task_id} record_id={record.id}")
+            record.status = TaskStatus.PROCESSING
+            record.error_message = None
+        else:
+            # データベースレコード作成
+            record = TranscriptionRecord(
+                filename=os.path.basename(file_path),
+                original_filename=original_filename,
+                transcription_text="",
+                task_id=task_id,
+                status=TaskStatus.PROCESSING,
+                file_size=file_size
+            )
+            session.add(record)
         session.commit()
         
-        # 音声ファイル処理
-        self.update_state(state='PROCESSING', meta={'status': 'Processing audio file'})
-        segments, total_duration = audio_processor.process_audio_file(file_path)
+        backend = get_backend(engine)
+        
+        # 同じ内容のファイルが処理済みであればキャッシュから完了
+        cache_key = (
+            transcription_cache.transcript_key(content_hash, backend.model_id)
+            if content_hash else None
+        )
+        cached = transcription_cache.get(session, cache_key) if cache_key else None
+        if cached:
+            record.transcription_text = cached.transcription_text
+            record.duration = cached.duration
+            record.status = TaskStatus.COMPLETED
+            record.completed_at = datetime.now()
+            search_index.index_record(session, record)
+            store_timeline(session, record.id, timeline_from_json(cached.segments_json))
+            session.commit()
+            JOBS_TOTAL.labels(status='cached').inc()
+            
+            clear_checkpoints(session, task_id)
+            remove_input(file_path)
+            
+            publish_progress(task_id, {
+                'status': 'completed',
+                'message': 'Transcription completed successfully',
+                'duration': cached.duration,
+                'record_id': record.id
+            })
+            
+            return {
+                'status': 'completed',
+                'transcription': cached.transcription_text,
+                'duration': cached.duration,
+                'record_id': record.id
+            }
+        
+        # 音声ファイル処理（前回の分割結果が残っていれば再利用）
+        report_progress(self, task_id, {'status': 'Processing audio file', 'progress': 0})
+        # オブジェクトストレージの入力は署名付きURLで FFmpeg が直接読む
+        segments, total_duration = audio_processor.load_or_process(resolve_input(file_path))
         
         if not segments:
             raise Exception("Audio processing failed")
@@ -65,78 +322,372 @@ def transcribe_audio_task(self, file_path: str, task_id: str, original_filename:
         record.duration = total_duration
         session.commit()
         
-        # 各セグメントを文字起こし
-        transcriptions = []
+        if audio_processor.silence_removed > 0:
+            celery_logger.info(
+                f"Silence trimmed: task_id={task_id} "
+                f"removed={audio_processor.silence_removed:.1f}s of {total_duration:.1f}s"
+            )
+        
         total_segments = len(segments)
         
-        for i, segment_path in enumerate(segments):
-            self.update_state(
-                state='PROCESSING', 
-                meta={
-                    'status': f'Transcribing segment {i+1}/{total_segments}',
-                    'progress': int((i / total_segments) * 100)
-                }
+        # 前回の実行で完了したセグメントとセグメント単位のキャッシュを確認し、
+        # 未処理のものだけ文字起こしする（キャッシュの結果もチェックポイントに保存し、
+        # 結合時はチェックポイントだけを読む）
+        checkpoints = load_checkpoints(session, task_id, segments)
+        if checkpoints:
+            celery_logger.info(
+                f"Checkpoints loaded: task_id={task_id} "
+                f"segments={len(checkpoints)}/{total_segments}"
             )
+        segment_keys = [
+            transcription_cache.segment_key(file_hash(segment.path), backend.model_id)
+            for segment in segments
+        ]
+        pending = []
+        for i, segment_key in enumerate(segment_keys):
+            if i in checkpoints:
+                continue
+            cached_segment = transcription_cache.get(session, segment_key)
+            if cached_segment:
+                save_checkpoint(session, task_id, segments[i], SegmentResult.from_json(
+                    cached_segment.transcription_text, cached_segment.segments_json
+                ))
+            else:
+                pending.append(i)
+        completed_before = total_segments - len(pending)
+        
+        report_progress(
+            self,
+            task_id,
+            {
+                'status': f'Transcribing {total_segments} segments',
+                'progress': int((completed_before / total_segments) * 100),
+                'silence_removed': audio_processor.silence_removed
+            }
+        )
+        
+        if len(pending) >= settings.fanout_min_segments:
+            # セグメントごとのサブタスクに分けてクラスタ全体で処理し、最後に結合
+            priority = (self.request.delivery_info or {}).get('priority')
+            enqueued = time.time()
+            header = [
+                transcribe_segment_task.s(
+                    task_id,
+                    segments[i].index,
+                    segments[i].path,
+                    segments[i].start,
+                    segments[i].end,
+                    segment_keys[i],
+                    total_segments,
+                    engine,
+                    enqueued_at=enqueued
+                ).set(queue=settings.queue_segments, priority=priority)
+                for i in pending
+            ]
+            body = finalize_transcription_task.s(task_id, file_path, content_hash, engine)\
+                .set(queue=settings.queue_segments, priority=priority)\
+                .on_error(fail_transcription_task.s(task_id, file_path))
+            chord(header)(body)
+            celery_logger.info(
+                f"Fan-out: task_id={task_id} segments={len(pending)}/{total_segments}"
+            )
+            # 状態と結果はサブタスクと finalize が更新するため、ここでは保存しない
+            raise Ignore()
+        
+        # 未処理が少ない場合はこのタスク内で並列に文字起こし
+        # （スパンのログにタスクIDが付くようスレッドごとにコンテキストを引き継ぐ）
+        max_workers = max(1, min(backend.max_concurrency, len(pending)))
+        with ThreadPoolExecutor(max_workers=max_workers) as executor:
+            futures = {
+                executor.submit(
+                    contextvars.copy_context().run, transcribe_segment, backend, segments[i]
+                ): i
+                for i in pending
+            }
             
             try:
-                openai_client = get_openai_client()
-                with open(segment_path, 'rb') as audio_file:
-                    transcript = openai_client.audio.transcriptions.create(
-                        model="whisper-1",
-                        file=audio_file,
-                        response_format="text"
+                for completed, future in enumerate(as_completed(futures), start=completed_before + 1):
+                    i = futures[future]
+                    result = future.result()
+                    with stage_timer('checkpoint_commit'):
+                        save_checkpoint(session, task_id, segments[i], result)
+                        transcription_cache.put(
+                            session, segment_keys[i], result.text, segments[i].duration,
+                            segments_json=result.to_json()
+                        )
+                    report_progress(
+                        self,
+                        task_id,
+                        {
+                            'status': f'Transcribed segment {i+1}/{total_segments} '
+                                      f'({completed}/{total_segments} done)',
+                            'progress': int((completed / total_segments) * 100)
+                        }
                     )
-                    transcriptions.append(transcript)
-            except Exception as e:
-                if "insufficient_quota" in str(e):
-                    raise Exception("OpenAI API quota exceeded")
-                elif "rate_limit_exceeded" in str(e):
-                    raise Exception("OpenAI API rate limit exceeded")
-                else:
-                    raise Exception(f"OpenAI API error: {str(e)}")
+            except Exception:
+                # 1セグメントでも失敗したら未着手のセグメントは実行しない
+                for future in futures:
+                    future.cancel()
+                raise
+        
+        if pending and isinstance(backend, OpenAIBackend):
+            stats = connection_stats.snapshot()
+            celery_logger.info(
+                f"OpenAI connections: task_id={task_id} requests={stats['requests']} "
+                f"new={stats['new_connections']} reuse_ratio={stats['reuse_ratio']:.2f}"
+            )
+        
+        return finalize_transcription(task_id, file_path, content_hash, engine)
+    
+    except Ignore:
+        raise
+        
+    except Exception as e:
+        # エラー時の処理
+        return fail_job(session, task_id, file_path, str(e))
+    
+    finally:
+        session.close()
+
+
+@celery_app.task(bind=True, acks_late=True, reject_on_worker_lost=True)
+def transcribe_segment_task(
+    self,
+    task_id: str,
+    index: int,
+    segment_path: str,
+    start: float,
+    end: float,
+    segment_key: str,
+    total_segments: int,
+    engine: Optional[str] = None,
+    enqueued_at: Optional[float] = None
+) -> int:
+    """
+    1セグメントの文字起こしサブタスク（結果はチェックポイントに保存）
+    
+    Args:
+        task_id: ジョブのタスクID
+        index: セグメント番号
+        segment_path: 共有の作業ディレクトリ上のセグメントファイルパス
+        start: セグメント開始（秒、処理後の音声上）
+        end: セグメント終了（秒、処理後の音声上）
+        segment_key: セグメント単位のキャッシュキー
+        total_segments: ジョブ全体のセグメント数
+        engine: 文字起こしエンジン名
+        enqueued_at: キューに投入した時刻（待ち時間の計測用）
+        
+    Returns:
+        int: セグメント番号
+    """
+    current_task_id.set(task_id)
+    observe_queue_wait((self.request.delivery_info or {}).get('routing_key'), enqueued_at)
+    session = get_session()
+    segment = AudioSegment(index=index, path=segment_path, start=start, end=end)
+    
+    try:
+        # 再配信・重複実行の場合は保存済みの結果を使う
+        if load_checkpoints(session, task_id, [segment]):
+            return index
+        
+        result = transcribe_segment(get_backend(engine), segment)
+        with stage_timer('checkpoint_commit'):
+            save_checkpoint(session, task_id, segment, result)
+            transcription_cache.put(
+                session, segment_key, result.text, segment.duration,
+                segments_json=result.to_json()
+            )
+        
+        completed = count_checkpoints(session, task_id)
+        report_progress(
+            self,
+            task_id,
+            {
+                'status': f'Transcribed segment {index+1}/{total_segments} '
+                          f'({completed}/{total_segments} done)',
+                'progress': int((completed / total_segments) * 100)
+            }
+        )
+        return index
+    
+    finally:
+        session.close()
+
+
+@celery_app.task(bind=True, acks_late=True, reject_on_worker_lost=True)
+def finalize_transcription_task(
+    self,
+    segment_indexes: List[int],
+    task_id: str,
+    file_path: str,
+    content_hash: Optional[str] = None,
+    engine: Optional[str] = None
+) -> dict:
+    """
+    全セグメントの完了後に結果を結合してレコードを完了にする（chord のコールバック）
+    
+    Args:
+        segment_indexes: 完了したサブタスクのセグメント番号
+        task_id: ジョブのタスクID
+        file_path: 音声ファイルパス
+        content_hash: アップロードファイルのSHA-256（キャッシュキー）
+        engine: 文字起こしエンジン名
+        
+    Returns:
+        dict: タスク結果
+    """
+    current_task_id.set(task_id)
+    result = finalize_transcription(task_id, file_path, content_hash, engine)
+    # /status が参照するジョブのタスクIDに最終結果を保存
+    celery_app.backend.store_result(task_id, result, 'SUCCESS')
+    return result
+
+
+@celery_app.task
+def fail_transcription_task(request, exc, traceback, task_id: str, file_path: str) -> dict:
+    """
+    サブタスクが失敗した場合のエラーハンドラ（chord のコールバックの link_error）
+    
+    Args:
+        request: 失敗したタスクのリクエスト
+        exc: 例外
+        traceback: トレースバック
+        task_id: ジョブのタスクID
+        file_path: 音声ファイルパス
+        
+    Returns:
+        dict: タスク結果
+    """
+    current_task_id.set(task_id)
+    session = get_session()
+    try:
+        return fail_job(session, task_id, file_path, str(exc))
+    finally:
+        session.close()
+
+
+def finalize_transcription(
+    task_id: str,
+    file_path: str,
+    content_hash: Optional[str] = None,
+    engine: Optional[str] = None
+) -> dict:
+    """
+    チェックポイントからセグメントの結果を集めて結合し、レコードを完了にする
+    
+    Args:
+        task_id: ジョブのタスクID
+        file_path: 音声ファイルパス
+        content_hash: アップロードファイルのSHA-256（キャッシュキー）
+        engine: 文字起こしエンジン名
+        
+    Returns:
+        dict: タスク結果
+    """
+    session = get_session()
+    audio_processor = AudioProcessor(work_dir=job_work_dir(task_id))
+    
+    try:
+        record = session.exec(
+            select(TranscriptionRecord).where(TranscriptionRecord.task_id == task_id)
+        ).first()
+        if record is None:
+            raise Exception("Transcription record not found")
+        if record.status == TaskStatus.COMPLETED:
+            return {
+                'status': 'completed',
+                'transcription': record.transcription_text,
+                'duration': record.duration,
+                'record_id': record.id
+            }
+        
+        manifest = audio_processor.load_manifest()
+        if manifest is None:
+            raise Exception("Audio segments not found")
+        segments, total_duration = manifest
+        
+        checkpoints = load_checkpoints(session, task_id, segments)
+        missing = [segment.index for segment in segments if segment.index not in checkpoints]
+        if missing:
+            raise Exception(f"Segments not transcribed: {missing}")
+        results = [checkpoints[segment.index] for segment in segments]
         
         # 結果を結合
-        full_transcription = "\n".join(transcriptions)
+        overlap = settings.segment_overlap if settings.segment_on_silence else 0.0
+        full_transcription = join_transcriptions([result.text for result in results], overlap)
+        timeline = build_timeline(segments, results, audio_processor.timestamp_map, overlap)
         
         # データベース更新
-        record.transcription_text = full_transcription
-        record.status = TaskStatus.COMPLETED
-        record.completed_at = datetime.now()
-        session.commit()
+        with stage_timer('db_commit'):
+            record.transcription_text = full_transcription
+            record.duration = total_duration
+            record.status = TaskStatus.COMPLETED
+            record.completed_at = datetime.now()
+            search_index.index_record(session, record)
+            store_timeline(session, record.id, timeline)
+            session.commit()
+            
+            if content_hash:
+                transcription_cache.put(
+                    session,
+                    transcription_cache.transcript_key(content_hash, get_backend(engine).model_id),
+                    full_transcription,
+                    total_duration,
+                    segments_json=timeline_to_json(timeline)
+                )
+        JOBS_TOTAL.labels(status='completed').inc()
         
         # クリーンアップ
-        audio_processor.cleanup()
-        if os.path.exists(file_path):
-            os.remove(file_path)
+        with stage_timer('cleanup'):
+            clear_checkpoints(session, task_id)
+            remove_input(file_path)
+        
+        publish_progress(task_id, {
+            'status': 'completed',
+            'message': 'Transcription completed successfully',
+            'duration': total_duration,
+            'record_id': record.id
+        })
         
         return {
             'status': 'completed',
             'transcription': full_transcription,
             'duration': total_duration,
+            'silence_removed': audio_processor.silence_removed,
             'record_id': record.id
         }
-        
+    
     except Exception as e:
-        # エラー時の処理
-        error_msg = str(e)
-        if record:
-            record.status = TaskStatus.FAILED
-            record.error_message = error_msg
-            session.commit()
-        
-        audio_processor.cleanup()
-        if os.path.exists(file_path):
-            os.remove(file_path)
-        
-        return {
-            'status': 'failed',
-            'error': error_msg
-        }
+        return fail_job(session, task_id, file_path, str(e))
     
     finally:
         session.close()
 
 
+def expire_pending_uploads(max_age_seconds: int) -> None:
+    """
+    完了されなかった直接アップロードのレコードを失敗にする
+
+    Args:
+        max_age_seconds: presign からの経過秒数
+    """
+    session = get_session()
+    try:
+        stale = session.exec(
+            select(TranscriptionRecord).where(
+                TranscriptionRecord.upload_id.is_not(None),
+                TranscriptionRecord.status == TaskStatus.PENDING,
+                TranscriptionRecord.created_at < datetime.now() - timedelta(seconds=max_age_seconds)
+            )
+        ).all()
+        for record in stale:
+            record.status = TaskStatus.FAILED
+            record.error_message = "Upload was not completed"
+        session.commit()
+    finally:
+        session.close()
+
+
 @celery_app.task
 def cleanup_old_files() -> None:
     """古いファイルのクリーンアップタスク"""
@@ -151,4 +702,16 @@ def cleanup_old_files() -> None:
             try:
                 os.remove(file_path)
             except OSError:
-                pass
\ No newline at end of file
+                pass
+    
+    # 再実行されなかったジョブの作業ディレクトリ
+    remove_stale_work_dirs()
+    
+    # 完了されなかった直接アップロード
+    if settings.object_storage_enabled:
+        try:
+            # 署名付きURLの期限が切れたものは続行できない
+            object_storage.abort_stale_uploads(settings.s3_presign_expiry)
+            expire_pending_uploads(settings.s3_presign_expiry)
+        except Exception as e:
+            celery_logger.warning(f"Stale upload cleanup failed: {e}")
\ No newline at end of file
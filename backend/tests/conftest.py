@@ -0,0 +1,11 @@
+import os
+import sys
+import tempfile
+
+# backend/ をインポートパスに追加（アプリは backend/ を作業ディレクトリとして動く）
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+# 設定の必須項目（テストではAPIを呼ばない）
+os.environ.setdefault('OPENAI_API_KEY', 'test')
+# 作業ディレクトリのDBを使わない
+os.environ.setdefault('DATABASE_URL', f"sqlite:///{os.path.join(tempfile.gettempdir(), 'transcribe_test.db')}")
@@ -0,0 +1,235 @@
+"""
+レート制限（Redis のトークンバケット）とリトライ待機時間のテスト
+
+トークンバケットのテストは Redis が必要（TEST_REDIS_URL、既定は redis://localhost:6379/15）。
+接続できない場合はスキップする。
+"""
+import os
+import uuid
+
+import httpx
+import openai
+import pytest
+import redis
+
+from config import settings
+from services import rate_limit, transcription
+from services.rate_limit import PAUSE_KEY, RateLimiter, backoff_delay, parse_retry_after
+from services.transcription import OpenAIBackend
+from utils.exceptions import QuotaExceededError, RateLimitError
+
+
+TEST_REDIS_URL = os.getenv('TEST_REDIS_URL', 'redis://localhost:6379/15')
+
+
+class TestBackoffDelay:
+    def test_full_jitter_is_capped(self, monkeypatch):
+        monkeypatch.setattr(settings, 'api_backoff_base', 1.0)
+        monkeypatch.setattr(settings, 'api_backoff_max', 10.0)
+        monkeypatch.setattr(rate_limit.random, 'uniform', lambda low, high: high)
+
+        assert [backoff_delay(attempt) for attempt in range(6)] == [1, 2, 4, 8, 10, 10]
+
+    def test_full_jitter_lower_bound(self, monkeypatch):
+        monkeypatch.setattr(rate_limit.random, 'uniform', lambda low, high: low)
+
+        assert backoff_delay(3) == 0
+
+    def test_retry_after_takes_precedence(self, monkeypatch):
+        monkeypatch.setattr(settings, 'api_backoff_base', 0.5)
+        monkeypatch.setattr(settings, 'api_backoff_max', 1.0)
+
+        for _ in range(20):
+            assert 30.0 <= backoff_delay(0, retry_after=30.0) <= 30.5
+
+    def test_zero_retry_after(self, monkeypatch):
+        monkeypatch.setattr(settings, 'api_backoff_base', 0.5)
+
+        assert 0.0 <= backoff_delay(4, retry_after=0.0) <= 0.5
+
+
+class TestParseRetryAfter:
+    @pytest.mark.parametrize('headers, expected', [
+        ({'retry-after': '7'}, 7.0),
+        ({'retry-after': '1.5'}, 1.5),
+        ({'retry-after-ms': '250'}, 0.25),
+        # retry-after-ms の方が精度が高いため優先する
+        ({'retry-after-ms': '250', 'retry-after': '7'}, 0.25),
+        # 解釈できない retry-after-ms は無視して retry-after を使う
+        ({'retry-after-ms': 'soon', 'retry-after': '7'}, 7.0),
+        ({'retry-after': '-3'}, 0.0),
+        # HTTP-date 形式には対応しない（指数バックオフになる）
+        ({'retry-after': 'Wed, 21 Oct 2015 07:28:00 GMT'}, None),
+        ({}, None),
+        (None, None),
+    ])
+    def test_parse(self, headers, expected):
+        if headers is not None:
+            headers = httpx.Headers(headers)
+
+        assert parse_retry_after(headers) == expected
+
+    def test_header_names_are_case_insensitive(self):
+        assert parse_retry_after(httpx.Headers({'Retry-After-Ms': '100'})) == 0.1
+
+
+def rate_limit_error(code=None, headers=None):
+    request = httpx.Request('POST', 'https://api.openai.com/v1/audio/transcriptions')
+    response = httpx.Response(429, request=request, headers=headers or {})
+    body = {'code': code, 'message': 'Rate limit reached'}
+    return openai.RateLimitError('Rate limit reached', response=response, body=body)
+
+
+class FakeTranscriptions:
+    """create の呼び出しごとに用意した例外または結果を返す"""
+
+    def __init__(self, outcomes):
+        self.outcomes = list(outcomes)
+        self.calls = 0
+
+    def create(self, **kwargs):
+        self.calls += 1
+        outcome = self.outcomes.pop(0)
+        if isinstance(outcome, Exception):
+            raise outcome
+        return outcome
+
+
+class TestOpenAIBackendRetry:
+    @pytest.fixture
+    def segment_path(self, tmp_path):
+        path = tmp_path / 'segment.ogg'
+        path.write_bytes(b'audio')
+        return str(path)
+
+    @pytest.fixture
+    def sleeps(self, monkeypatch):
+        sleeps = []
+        monkeypatch.setattr(transcription.time, 'sleep', sleeps.append)
+        return sleeps
+
+    def backend(self, monkeypatch, outcomes):
+        transcriptions = FakeTranscriptions(outcomes)
+        client = type('Client', (), {})()
+        client.audio = type('Audio', (), {})()
+        client.audio.transcriptions = transcriptions
+        monkeypatch.setattr(transcription, 'get_openai_client', lambda api_key=None: client)
+        return OpenAIBackend(rate_limiter=None), transcriptions
+
+    def test_insufficient_quota_fails_fast(self, monkeypatch, segment_path, sleeps):
+        backend, transcriptions = self.backend(
+            monkeypatch, [rate_limit_error('insufficient_quota', {'retry-after': '1'})]
+        )
+
+        with pytest.raises(QuotaExceededError):
+            backend.transcribe(segment_path)
+        assert transcriptions.calls == 1
+        assert sleeps == []
+
+    def test_rate_limit_waits_for_retry_after(self, monkeypatch, segment_path, sleeps):
+        response = type('Response', (), {'text': 'hello', 'segments': []})()
+        backend, transcriptions = self.backend(
+            monkeypatch, [rate_limit_error(headers={'retry-after-ms': '1500'}), response]
+        )
+
+        result = backend.transcribe(segment_path)
+
+        assert result.text == 'hello'
+        assert transcriptions.calls == 2
+        assert len(sleeps) == 1
+        assert 1.5 <= sleeps[0] <= 1.5 + settings.api_backoff_base
+
+    def test_rate_limit_gives_up_after_max_retries(self, monkeypatch, segment_path, sleeps):
+        monkeypatch.setattr(settings, 'api_max_retries', 2)
+        backend, transcriptions = self.backend(monkeypatch, [rate_limit_error()] * 3)
+
+        with pytest.raises(RateLimitError):
+            backend.transcribe(segment_path)
+        assert transcriptions.calls == 3
+        assert len(sleeps) == 2
+
+
+def test_limiter_without_redis_does_not_block():
+    limiter = RateLimiter(
+        'unreachable', requests_per_minute=1,
+        redis_url='redis://127.0.0.1:1/0?socket_connect_timeout=0.2'
+    )
+
+    assert limiter.try_acquire() == 0.0
+    assert limiter.try_acquire() == 0.0
+
+
+@pytest.fixture
+def redis_client():
+    client = redis.Redis.from_url(TEST_REDIS_URL, socket_connect_timeout=0.5)
+    try:
+        client.ping()
+    except redis.RedisError:
+        pytest.skip(f"Redis is not available at {TEST_REDIS_URL}")
+    client.delete(PAUSE_KEY)
+    yield client
+    client.delete(PAUSE_KEY)
+
+
+@pytest.fixture
+def limiter_factory(redis_client):
+    created = []
+
+    def create(**limits):
+        limiter = RateLimiter(f"test-{uuid.uuid4().hex}", redis_url=TEST_REDIS_URL, **limits)
+        created.append(limiter)
+        return limiter
+
+    yield create
+    for limiter in created:
+        for key in redis_client.scan_iter(f"{rate_limit.BUCKET_PREFIX}{limiter.name}:*"):
+            redis_client.delete(key)
+
+
+class TestTokenBucket:
+    def test_request_bucket(self, limiter_factory):
+        limiter = limiter_factory(requests_per_minute=3)
+
+        assert [limiter.try_acquire() for _ in range(3)] == [0.0, 0.0, 0.0]
+        wait = limiter.try_acquire()
+        # 毎秒 3/60 トークン補充されるため、次の1トークンまで最大20秒
+        assert 0 < wait <= 20
+
+    def test_audio_seconds_bucket(self, limiter_factory):
+        limiter = limiter_factory(audio_seconds_per_minute=60)
+
+        assert limiter.try_acquire(50) == 0.0
+        # 残り約10秒分、毎秒1秒分補充されるため、20秒分には約10秒待つ
+        assert limiter.try_acquire(20) == pytest.approx(10, abs=0.5)
+
+    def test_request_larger_than_capacity_is_capped(self, limiter_factory):
+        limiter = limiter_factory(audio_seconds_per_minute=60)
+
+        assert limiter.try_acquire(600) == 0.0
+
+    def test_buckets_are_consumed_all_or_nothing(self, limiter_factory, redis_client):
+        limiter = limiter_factory(requests_per_minute=10, audio_seconds_per_minute=60)
+
+        assert limiter.try_acquire(50) == 0.0
+        assert limiter.try_acquire(20) > 0
+        # 音声秒数が足りずに失敗した場合はリクエスト数も消費しない
+        tokens = float(redis_client.hget(f"{rate_limit.BUCKET_PREFIX}{limiter.name}:requests", 'tokens'))
+        assert tokens == pytest.approx(9, abs=0.1)
+
+    def test_pause_blocks_all_limiters(self, limiter_factory):
+        limiter = limiter_factory(requests_per_minute=100)
+        other = limiter_factory(requests_per_minute=100)
+
+        limiter.pause(5)
+
+        assert 0 < other.try_acquire() <= 5
+
+    def test_acquire_waits_until_refilled(self, limiter_factory, monkeypatch):
+        limiter = limiter_factory(requests_per_minute=600)  # 毎秒10トークン
+        while limiter.try_acquire() == 0.0:
+            pass
+        monkeypatch.setattr(rate_limit.random, 'uniform', lambda low, high: 0.0)
+
+        waited = limiter.acquire()
+
+        assert 0 < waited <= 0.2
@@ -0,0 +1,46 @@
+"""
+ジョブのスケジューリング（推定時間とキュー振り分け）のテスト
+"""
+import ffmpeg
+import pytest
+
+from config import settings
+from services import scheduling
+from services.scheduling import FALLBACK_BYTES_PER_SECOND, estimate_duration, route_job
+
+
+@pytest.mark.parametrize('error', [
+    FileNotFoundError(2, "No such file or directory: 'ffprobe'"),
+    PermissionError(13, "Permission denied"),
+    ffmpeg.Error('ffprobe', b'', b'Invalid data found when processing input'),
+])
+def test_probe_failure_falls_back_to_size(monkeypatch, error):
+    def probe(path):
+        raise error
+
+    monkeypatch.setattr(scheduling.ffmpeg, 'probe', probe)
+
+    assert estimate_duration('upload.mp3', 1_600_000) == pytest.approx(
+        1_600_000 / FALLBACK_BYTES_PER_SECOND
+    )
+
+
+def test_probe_without_duration_falls_back_to_size(monkeypatch):
+    monkeypatch.setattr(scheduling.ffmpeg, 'probe', lambda path: {'format': {}})
+
+    assert estimate_duration('upload.mp3', 16_000) == pytest.approx(1.0)
+    assert estimate_duration('upload.mp3', 0) is None
+
+
+def test_probe_duration_is_used(monkeypatch):
+    monkeypatch.setattr(scheduling.ffmpeg, 'probe', lambda path: {'format': {'duration': '42.5'}})
+
+    assert estimate_duration('upload.mp3', 1) == 42.5
+
+
+def test_route_job():
+    assert route_job(None).queue == settings.queue_long
+    short = route_job(settings.short_job_max_seconds)
+    assert short.queue == settings.queue_short
+    assert route_job(settings.short_job_max_seconds + 1).queue == settings.queue_long
+    assert route_job(10 ** 9).priority == scheduling.PRIORITY_STEPS[-1]
@@ -0,0 +1,67 @@
+"""
+セグメントキャッシュのキーが同じ入力に対して毎回同じになることの確認
+"""
+import math
+import os
+import shutil
+import struct
+import wave
+
+import ffmpeg
+import pytest
+
+from services.audio import AudioProcessor, SAMPLE_RATE, SEGMENT_CODECS
+from services.cache import file_hash, transcription_cache
+
+
+pytestmark = pytest.mark.skipif(shutil.which('ffmpeg') is None, reason="ffmpeg is not installed")
+
+
+def write_tone(path: str, seconds: float = 2.0) -> None:
+    """440Hz の正弦波を 16bit モノラルの WAV として書き出す"""
+    frames = int(SAMPLE_RATE * seconds)
+    with wave.open(path, 'wb') as wav:
+        wav.setnchannels(1)
+        wav.setsampwidth(2)
+        wav.setframerate(SAMPLE_RATE)
+        wav.writeframes(b''.join(
+            struct.pack('<h', int(8000 * math.sin(2 * math.pi * 440 * i / SAMPLE_RATE)))
+            for i in range(frames)
+        ))
+
+
+def encode(processor: AudioProcessor, input_path: str, output_path: str) -> str:
+    (
+        ffmpeg
+        .input(input_path)
+        .output(output_path, **processor.segment_output_args())
+        .overwrite_output()
+        .run(quiet=True)
+    )
+    return transcription_cache.segment_key(file_hash(output_path), 'model')
+
+
+@pytest.mark.parametrize('codec', sorted(SEGMENT_CODECS))
+def test_encoding_twice_gives_same_key(tmp_path, codec):
+    processor = AudioProcessor(codec=codec, work_dir=str(tmp_path / 'work'))
+    source = str(tmp_path / 'tone.wav')
+    write_tone(source)
+
+    first = encode(processor, source, str(tmp_path / f'first{processor.segment_extension}'))
+    second = encode(processor, source, str(tmp_path / f'second{processor.segment_extension}'))
+
+    assert first == second
+
+
+def test_split_segments_are_reproducible(tmp_path):
+    source = str(tmp_path / 'tone.wav')
+    write_tone(source, seconds=3.0)
+
+    hashes = []
+    for run in ('a', 'b'):
+        processor = AudioProcessor(codec='opus', work_dir=str(tmp_path / run))
+        segments, _ = processor.convert_and_split(source, max_duration=1)
+        assert segments
+        hashes.append([file_hash(path) for path in segments])
+
+    assert hashes[0] == hashes[1]
@@ -0,0 +1,244 @@
+"""
+ストリーミング処理（SilenceTrimmer / StreamSegmenter）の単体テスト
+
+合成したPCMフレームを使い、ファイル単位の処理（TimestampMap.from_silences /
+choose_boundaries）と同じ位置で除去・分割することを確認する。
+"""
+import os
+import shutil
+
+import ffmpeg
+import pytest
+
+from services.audio import (
+    BYTES_PER_SECOND, VAD_FRAME_BYTES, VAD_FRAME_SAMPLES, SAMPLE_RATE,
+    AudioProcessor, SegmentEncoder, SilenceTrimmer, StreamSegmenter, TimestampMap,
+    choose_boundaries, decode_pcm_chunks
+)
+
+
+FRAME_SECONDS = VAD_FRAME_SAMPLES / SAMPLE_RATE
+
+
+class FakeEncoder:
+    """書き込まれたPCMをメモリに保持するエンコーダー"""
+
+    def __init__(self, index: int):
+        self.path = f"segment_{index:03d}"
+        self.data = bytearray()
+        self.closed = False
+
+    def write(self, pcm: bytes) -> None:
+        assert not self.closed
+        self.data += pcm
+
+    def close(self) -> None:
+        self.closed = True
+
+    def abort(self) -> None:
+        self.closed = True
+
+
+def make_frames(pattern):
+    """
+    (秒数, 無音か) の並びからフレームを作る（フレームごとに内容を変えて位置を判別できるようにする）
+
+    秒数はフレーム長の倍数にする。
+    """
+    frames = []
+    for seconds, silent in pattern:
+        for _ in range(int(round(seconds / FRAME_SECONDS))):
+            value = len(frames) % 251
+            frames.append((bytes([value]) * VAD_FRAME_BYTES, silent))
+    return frames
+
+
+def silences_of(pattern, min_silence=0.0):
+    """パターン中の無音区間（秒）"""
+    silences = []
+    position = 0.0
+    for seconds, silent in pattern:
+        if silent and seconds >= min_silence:
+            silences.append((position, position + seconds))
+        position += seconds
+    return silences
+
+
+def flatten(spans):
+    """[(開始, 終了), ...] を pytest.approx で比較できる平坦なリストに変換"""
+    return [t for span in spans for t in span]
+
+
+def segment(pattern, segment_duration, overlap=0.0, search_window=0.0, min_silence=0.3):
+    """パターンを StreamSegmenter に通し、(セグメント, エンコーダー, 入力PCM) を返す"""
+    frames = make_frames(pattern)
+    encoders = []
+
+    def open_encoder(index):
+        encoder = FakeEncoder(index)
+        encoders.append(encoder)
+        return encoder
+
+    segmenter = StreamSegmenter(open_encoder, segment_duration, overlap, search_window, min_silence)
+    for frame, silent in frames:
+        segmenter.feed(frame, silent)
+    segments = segmenter.finish()
+    return segments, encoders, b''.join(frame for frame, _ in frames)
+
+
+def assert_segments_match_pcm(segments, encoders, pcm):
+    """各エンコーダーに書かれたPCMがセグメントの時間範囲と一致する"""
+    assert len(segments) == len(encoders)
+    for item, encoder in zip(segments, encoders):
+        assert encoder.closed
+        start = int(round(item.start * BYTES_PER_SECOND))
+        end = int(round(item.end * BYTES_PER_SECOND))
+        assert bytes(encoder.data) == pcm[start:end]
+
+
+class TestStreamSegmenter:
+    def test_fixed_cuts_without_silence(self):
+        segments, encoders, pcm = segment([(9.99, False)], segment_duration=3)
+
+        assert flatten((s.start, s.end) for s in segments) == pytest.approx(
+            flatten([(0, 3), (3, 6), (6, 9), (9, 9.99)])
+        )
+        assert_segments_match_pcm(segments, encoders, pcm)
+
+    def test_cuts_match_choose_boundaries(self):
+        pattern = [
+            (4.5, False), (0.6, True), (2.4, False), (0.9, True), (3.0, False),
+            (0.6, True), (5.1, False), (0.45, True), (2.1, False),
+        ]
+        total = sum(seconds for seconds, _ in pattern)
+        segments, encoders, pcm = segment(
+            pattern, segment_duration=6, search_window=3, min_silence=0.3
+        )
+
+        expected = choose_boundaries(total, 6, silences_of(pattern, 0.3), 3)
+        assert [s.start for s in segments[1:]] == pytest.approx(expected, abs=1 / BYTES_PER_SECOND)
+        assert_segments_match_pcm(segments, encoders, pcm)
+
+    def test_short_silences_are_not_cut_points(self):
+        pattern = [(5.1, False), (0.21, True), (5.1, False)]
+        segments, _, _ = segment(pattern, segment_duration=6, search_window=3, min_silence=0.3)
+
+        assert segments[1].start == pytest.approx(6.0)
+
+    def test_overlap_is_drained_into_previous_segment(self):
+        pattern = [(4.5, False), (0.6, True), (4.2, False), (0.6, True), (4.5, False)]
+        total = sum(seconds for seconds, _ in pattern)
+        segments, encoders, pcm = segment(
+            pattern, segment_duration=6, overlap=0.99, search_window=3, min_silence=0.3
+        )
+
+        boundaries = choose_boundaries(total, 6, silences_of(pattern, 0.3), 3)
+        assert [s.start for s in segments[1:]] == pytest.approx(boundaries, abs=1 / BYTES_PER_SECOND)
+        for previous, following in zip(segments, segments[1:]):
+            assert previous.end == pytest.approx(following.start + 0.99, abs=1 / BYTES_PER_SECOND)
+        assert segments[-1].end == pytest.approx(total)
+        assert_segments_match_pcm(segments, encoders, pcm)
+
+    def test_overlap_is_clipped_at_end_of_input(self):
+        segments, encoders, pcm = segment([(6.6, False)], segment_duration=3, overlap=0.99)
+
+        assert segments[-2].end == pytest.approx(6.6)
+        assert_segments_match_pcm(segments, encoders, pcm)
+
+    def test_empty_input(self):
+        segmenter = StreamSegmenter(FakeEncoder, 3, 0.0, 0.0, 0.3)
+
+        assert segmenter.finish() == []
+        assert segmenter.encoders == []
+
+
+class TestSilenceTrimmer:
+    MIN_SILENCE = 0.6
+    PADDING = 0.09
+
+    def trim(self, pattern):
+        frames = make_frames(pattern)
+        trimmer = SilenceTrimmer(self.MIN_SILENCE, self.PADDING)
+        kept = b''.join(frame for frame, _ in trimmer.process(frames))
+        return trimmer, kept, b''.join(frame for frame, _ in frames)
+
+    def expected_spans(self, pattern):
+        total = sum(seconds for seconds, _ in pattern)
+        return TimestampMap.from_silences(
+            silences_of(pattern), total, self.MIN_SILENCE, self.PADDING
+        ).spans
+
+    @pytest.mark.parametrize('pattern', [
+        [(3.0, False)],
+        [(1.5, True), (3.0, False)],
+        [(3.0, False), (1.5, True)],
+        [(2.1, False), (0.3, True), (2.1, False)],
+        [(2.1, False), (0.6, True), (2.1, False)],
+        [(0.9, True), (2.1, False), (1.2, True), (0.6, False), (3.0, True), (1.5, False), (0.9, True)],
+    ])
+    def test_spans_match_from_silences(self, pattern):
+        trimmer, _, _ = self.trim(pattern)
+
+        assert flatten(trimmer.spans) == pytest.approx(flatten(self.expected_spans(pattern)))
+
+    def test_kept_pcm_matches_spans(self):
+        pattern = [(0.9, True), (2.1, False), (1.2, True), (0.6, False), (3.0, True), (1.5, False)]
+        trimmer, kept, pcm = self.trim(pattern)
+
+        expected = b''.join(
+            pcm[int(round(start * BYTES_PER_SECOND)):int(round(end * BYTES_PER_SECOND))]
+            for start, end in trimmer.spans
+        )
+        assert kept == expected
+        assert trimmer.position == len(pcm)
+
+    def test_all_silence(self):
+        trimmer, kept, _ = self.trim([(2.0 - 2.0 % FRAME_SECONDS, True)])
+
+        assert trimmer.spans == []
+        assert kept == b''
+
+    def test_trimmed_stream_segments_like_file_pipeline(self):
+        """無音除去後のPCMを分割しても、各セグメントは除去後の時間範囲と一致する"""
+        pattern = [(1.5, True), (4.2, False), (2.4, True), (4.5, False), (0.45, True), (3.0, False)]
+        trimmer = SilenceTrimmer(self.MIN_SILENCE, self.PADDING)
+        encoders = []
+
+        def open_encoder(index):
+            encoder = FakeEncoder(index)
+            encoders.append(encoder)
+            return encoder
+
+        segmenter = StreamSegmenter(open_encoder, 4, 0.0, 2, 0.3)
+        kept = bytearray()
+        for frame, silent in trimmer.process(make_frames(pattern)):
+            segmenter.feed(frame, silent)
+            kept += frame
+        segments = segmenter.finish()
+
+        timestamp_map = TimestampMap(trimmer.spans)
+        assert segments[-1].end == pytest.approx(timestamp_map.processed_duration)
+        assert_segments_match_pcm(segments, encoders, bytes(kept))
+
+
+@pytest.mark.skipif(shutil.which('ffmpeg') is None, reason="ffmpeg is not installed")
+class TestSegmentEncoder:
+    def test_encodes_piped_pcm(self, tmp_path):
+        processor = AudioProcessor(codec='flac', work_dir=str(tmp_path / 'work'))
+        path = str(tmp_path / 'out.flac')
+        pcm = bytes(range(256)) * (BYTES_PER_SECOND // 256)
+        encoder = SegmentEncoder(path, processor.segment_output_args())
+        # パイプの容量を大きく超える量を書き込んでも止まらない
+        for _ in range(30):
+            encoder.write(pcm)
+        encoder.close()
+
+        assert b''.join(decode_pcm_chunks(path, BYTES_PER_SECOND)) == pcm * 30
+
+    def test_failure_reports_stderr(self, tmp_path):
+        encoder = SegmentEncoder(str(tmp_path / 'out.ogg'), {'acodec': 'no-such-codec'})
+
+        with pytest.raises(ffmpeg.Error) as error:
+            encoder.close()
+        assert error.value.stderr
+        assert not os.path.exists(tmp_path / 'out.ogg')
@@ -0,0 +1,239 @@
+"""
+multipart の受信（receive_multipart_upload）と /upload のテスト
+
+境界の扱い、受信中のサイズ上限、ボディ保存前の拡張子チェック、エラー時の一時ファイル削除を確認する。
+"""
+import hashlib
+import os
+
+import pytest
+from fastapi import FastAPI, HTTPException, Request
+from fastapi.testclient import TestClient
+
+from config import settings
+from services.upload import MAX_FIELD_SIZE, receive_multipart_upload
+from utils.exceptions import FileProcessingError, FileSizeError
+
+
+BOUNDARY = '----test-boundary-7MA4YWxkTrZu0gW'
+CONTENT_TYPE = f'multipart/form-data; boundary={BOUNDARY}'
+
+
+def multipart_body(parts):
+    """
+    multipart/form-data のボディを作る
+
+    Args:
+        parts: (名前, ファイル名またはNone, 内容) のリスト
+    """
+    body = b''
+    for name, filename, content in parts:
+        disposition = f'form-data; name="{name}"'
+        if filename is not None:
+            disposition += f'; filename="{filename}"'
+        body += f'--{BOUNDARY}\r\nContent-Disposition: {disposition}\r\n'.encode('utf-8')
+        if filename is not None:
+            body += b'Content-Type: application/octet-stream\r\n'
+        body += b'\r\n' + content + b'\r\n'
+    return body + f'--{BOUNDARY}--\r\n'.encode('utf-8')
+
+
+def chunked(data, size=7):
+    """Content-Length を付けずに小さな断片で送る（チャンク転送）"""
+    def generate():
+        for offset in range(0, len(data), size):
+            yield data[offset:offset + size]
+    return generate()
+
+
+def check_extension(filename):
+    if not filename.endswith('.mp3'):
+        raise HTTPException(status_code=400, detail="Unsupported file format")
+    return '.mp3'
+
+
+@pytest.fixture
+def upload_dir(tmp_path):
+    directory = tmp_path / 'uploads'
+    directory.mkdir()
+    return directory
+
+
+@pytest.fixture
+def client(upload_dir):
+    """receive_multipart_upload だけを呼ぶアプリ（上限 1000 bytes、書き込み単位 64 bytes）"""
+    app = FastAPI()
+
+    @app.post('/receive')
+    async def receive(request: Request):
+        try:
+            received = await receive_multipart_upload(
+                request, 'file', check_extension, 'upload_test_', 1000, 64, str(upload_dir)
+            )
+        except FileSizeError as e:
+            raise HTTPException(status_code=e.status_code, detail=e.message)
+        except FileProcessingError as e:
+            raise HTTPException(status_code=400, detail=e.message)
+        with open(received.file.path, 'rb') as f:
+            content = f.read()
+        return {
+            'filename': received.filename,
+            'fields': received.fields,
+            'size': received.file.size,
+            'chunks': received.file.chunks,
+            'sha256': received.file.sha256,
+            'content': content.hex(),
+            'path': received.file.path,
+        }
+
+    return TestClient(app)
+
+
+class TestReceiveMultipartUpload:
+    # 境界に似たバイト列や改行を含む内容
+    CONTENT = (b'\r\n--' + BOUNDARY[:-1].encode() + b'\r\n\r\n' + bytes(range(256)) + b'--\r\n') * 2
+
+    @pytest.mark.parametrize('send', ['whole', 'chunked'])
+    def test_file_and_fields(self, client, upload_dir, send):
+        body = multipart_body([
+            ('engine', None, b'openai'),
+            ('file', '会議.mp3', self.CONTENT),
+            ('note', None, 'メモ'.encode('utf-8')),
+        ])
+        content = body if send == 'whole' else chunked(body)
+
+        response = client.post('/receive', content=content, headers={'content-type': CONTENT_TYPE})
+
+        assert response.status_code == 200
+        result = response.json()
+        assert result['filename'] == '会議.mp3'
+        assert result['fields'] == {'engine': 'openai', 'note': 'メモ'}
+        assert bytes.fromhex(result['content']) == self.CONTENT
+        assert result['size'] == len(self.CONTENT)
+        assert result['sha256'] == hashlib.sha256(self.CONTENT).hexdigest()
+        assert result['chunks'] > 1
+        assert os.path.dirname(result['path']) == str(upload_dir)
+        assert result['path'].endswith('.mp3')
+
+    def test_empty_file(self, client):
+        body = multipart_body([('file', 'empty.mp3', b'')])
+
+        response = client.post('/receive', content=body, headers={'content-type': CONTENT_TYPE})
+
+        assert response.status_code == 200
+        assert response.json()['size'] == 0
+
+    @pytest.mark.parametrize('send', ['whole', 'chunked'])
+    def test_size_limit_while_receiving(self, client, upload_dir, send):
+        body = multipart_body([('file', 'large.mp3', b'x' * 1001)])
+        content = body if send == 'whole' else chunked(body, 100)
+
+        response = client.post('/receive', content=content, headers={'content-type': CONTENT_TYPE})
+
+        assert response.status_code == 413
+        assert os.listdir(upload_dir) == []
+
+    def test_exact_size_limit(self, client):
+        body = multipart_body([('file', 'limit.mp3', b'x' * 1000)])
+
+        response = client.post('/receive', content=body, headers={'content-type': CONTENT_TYPE})
+
+        assert response.status_code == 200
+
+    def test_bad_extension_is_rejected_before_storing(self, client, upload_dir, monkeypatch):
+        opened = []
+        monkeypatch.setattr('services.upload.tempfile.NamedTemporaryFile', lambda **kw: opened.append(kw))
+        body = multipart_body([('file', 'notes.txt', b'x' * 500)])
+
+        response = client.post('/receive', content=chunked(body), headers={'content-type': CONTENT_TYPE})
+
+        assert response.status_code == 400
+        assert opened == []
+        assert os.listdir(upload_dir) == []
+
+    def test_missing_file_field(self, client, upload_dir):
+        body = multipart_body([('engine', None, b'openai'), ('other', 'a.mp3', b'data')])
+
+        response = client.post('/receive', content=body, headers={'content-type': CONTENT_TYPE})
+
+        assert response.status_code == 400
+        assert os.listdir(upload_dir) == []
+
+    @pytest.mark.parametrize('content_type', [
+        'application/json', 'multipart/form-data', f'multipart/mixed; boundary={BOUNDARY}'
+    ])
+    def test_not_multipart_form_data(self, client, content_type):
+        body = multipart_body([('file', 'a.mp3', b'data')])
+
+        response = client.post('/receive', content=body, headers={'content-type': content_type})
+
+        assert response.status_code == 400
+
+    def test_oversized_field(self, client, upload_dir):
+        body = multipart_body([
+            ('file', 'a.mp3', b'data'),
+            ('engine', None, b'x' * (MAX_FIELD_SIZE + 1)),
+        ])
+
+        response = client.post('/receive', content=body, headers={'content-type': CONTENT_TYPE})
+
+        assert response.status_code == 400
+        assert os.listdir(upload_dir) == []
+
+
+class TestUploadEndpoint:
+    """/upload のエラー応答（キャッシュ確認やキュー投入の前に終わるもの）"""
+
+    @pytest.fixture
+    def app_client(self, upload_dir, monkeypatch):
+        import main
+
+        monkeypatch.setattr(settings, 'upload_dir', str(upload_dir))
+        monkeypatch.setattr(settings, 'max_file_size', 1000)
+        return TestClient(main.app)
+
+    def test_content_length_over_limit(self, app_client, upload_dir):
+        body = multipart_body([('file', 'large.mp3', b'x' * (2 * 1024 * 1024))])
+
+        response = app_client.post('/upload', content=body, headers={'content-type': CONTENT_TYPE})
+
+        assert response.status_code == 413
+        assert os.listdir(upload_dir) == []
+
+    def test_chunked_body_over_limit(self, app_client, upload_dir):
+        body = multipart_body([('file', 'large.mp3', b'x' * 5000)])
+
+        response = app_client.post(
+            '/upload', content=chunked(body, 512), headers={'content-type': CONTENT_TYPE}
+        )
+
+        assert response.status_code == 413
+        assert os.listdir(upload_dir) == []
+
+    def test_unsupported_format(self, app_client, upload_dir):
+        body = multipart_body([('file', 'notes.txt', b'data')])
+
+        response = app_client.post('/upload', content=body, headers={'content-type': CONTENT_TYPE})
+
+        assert response.status_code == 400
+        assert os.listdir(upload_dir) == []
+
+    def test_unsupported_engine_removes_file(self, app_client, upload_dir):
+        body = multipart_body([('file', 'a.mp3', b'data'), ('engine', None, b'no-such-engine')])
+
+        response = app_client.post('/upload', content=body, headers={'content-type': CONTENT_TYPE})
+
+        assert response.status_code == 400
+        assert os.listdir(upload_dir) == []
+
+    def test_missing_file(self, app_client):
+        body = multipart_body([('engine', None, b'openai')])
+
+        response = app_client.post('/upload', content=body, headers={'content-type': CONTENT_TYPE})
+
+        assert response.status_code == 400
+
+    def test_not_multipart(self, app_client):
+        response = app_client.post('/upload', json={'file': 'a.mp3'})
+
+        assert response.status_code == 400
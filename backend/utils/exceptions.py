@@ -56,4 +56,10 @@ class TaskNotFoundError(TranscribeAppException):
 class DatabaseError(TranscribeAppException):
     """Exception raised for database operations"""
     def __init__(self, message: str = "Database operation failed"):
-        super().__init__(message, status_code=500)
\ No newline at end of file
+        super().__init__(message, status_code=500)
+
+
+class RangeNotSatisfiableError(TranscribeAppException):
+    """Exception raised when a requested byte range is outside the content"""
+    def __init__(self, message: str = "Requested range not satisfiable"):
+        super().__init__(message, status_code=416)
\ No newline at end of file